@@ -6,6 +6,12 @@
 #include <WiFi.h>
 #include <Wire.h>
 
+// Trained model (generated by ml_datasets/export_c_header.py)
+#if __has_include("pm_model.h")
+#include "pm_model.h"
+#define HAS_PM_MODEL 1
+#endif
+
 const char *ssid = "YOUR_WIFI_SSID";
 const char *password = "YOUR_WIFI_PASSWORD";
 const char *ws_host = "YOUR_PC_IP";
@@ -77,6 +83,10 @@ const float PM10_MIN = 2.65;
 const float PM10_MAX = 659.0;
 
 float predictPM25_ML(float temp, float hum, float press) {
+#ifdef HAS_PM_MODEL
+  float pm25, pm10;
+  pm_model_predict(temp, hum, press, &pm25, &pm10);
+#else
   float temp_norm = (temp - TEMP_MIN) / (TEMP_MAX - TEMP_MIN);
   float hum_norm = (hum - HUM_MIN) / (HUM_MAX - HUM_MIN);
   float press_norm = (press - PRESS_MIN) / (PRESS_MAX - PRESS_MIN);
@@ -85,6 +95,7 @@ float predictPM25_ML(float temp, float hum, float press) {
                     0.15 * temp_norm * hum_norm + 0.25;
 
   float pm25 = PM25_MIN + pm25_norm * (PM25_MAX - PM25_MIN);
+#endif
 
   if (pm25 < 0)
     pm25 = 0;
@@ -95,6 +106,10 @@ float predictPM25_ML(float temp, float hum, float press) {
 }
 
 float predictPM10_ML(float temp, float hum, float press) {
+#ifdef HAS_PM_MODEL
+  float pm25, pm10;
+  pm_model_predict(temp, hum, press, &pm25, &pm10);
+#else
   float temp_norm = (temp - TEMP_MIN) / (TEMP_MAX - TEMP_MIN);
   float hum_norm = (hum - HUM_MIN) / (HUM_MAX - HUM_MIN);
   float press_norm = (press - PRESS_MIN) / (PRESS_MAX - PRESS_MIN);
@@ -103,6 +118,7 @@ float predictPM10_ML(float temp, float hum, float press) {
                     0.2 * temp_norm * hum_norm + 0.1;
 
   float pm10 = PM10_MIN + pm10_norm * (PM10_MAX - PM10_MIN);
+#endif
 
   if (pm10 < 0)
     pm10 = 0;
@@ -0,0 +1,248 @@
+"""
+Batch inference PM2.5/PM10 untuk backfill data historis
+
+Membaca CSV temperature/humidity/pressure per chunk, menjalankan model
+TFLite dengan input tensor yang di-resize ke batch besar, dan menulis hasil
+per chunk ke CSV output. Mendukung model float32, dynamic-range dan int8.
+
+Usage:
+    python batch_inference.py --input history.csv --output backfill.csv
+    python batch_inference.py --model models/pm_predictor_quantized.tflite \\
+        --input history.csv --output backfill.csv --batch-size 8192 --keep timestamp
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_pipeline import FEATURES, TARGETS
+
+DEFAULT_MODEL = "models/pm_predictor.tflite"
+DEFAULT_SCALER_X = "models/scaler_X.pkl"
+DEFAULT_SCALER_Y = "models/scaler_y.pkl"
+DEFAULT_BUNDLE = "models/pm_predictor.pmb"
+DEFAULT_BATCH_SIZE = 4096
+DEFAULT_CHUNKSIZE = 200_000
+
+
+def load_scalers(scaler_x_path=DEFAULT_SCALER_X, scaler_y_path=DEFAULT_SCALER_Y,
+                 bundle_path=DEFAULT_BUNDLE):
+    """
+    Load scaler X dan y (hasil train_model.py)
+
+    Dari model bundle .pmb kalau ada dan berasal dari run yang sama dengan
+    pickle di disk (sha256 di manifest `sources`), tanpa sklearn; kalau
+    tidak dari pickle MinMaxScaler (format lama). Bundle dari run lama
+    tidak pernah dipasangkan dengan model baru.
+    """
+    if bundle_path and os.path.exists(bundle_path):
+        from model_bundle import load_bundle, sources_match
+        bundle = load_bundle(bundle_path)
+        if sources_match(bundle, (scaler_x_path, scaler_y_path)):
+            return bundle.scalers()
+        print(f"   ⚠️  {bundle_path} is from another run than the scaler pickles, using pickles")
+    with open(scaler_x_path, 'rb') as f:
+        scaler_X = pickle.load(f)
+    with open(scaler_y_path, 'rb') as f:
+        scaler_y = pickle.load(f)
+    return scaler_X, scaler_y
+
+
+# ==========================================
+# 1. TFLite Predictor
+# ==========================================
+class TFLitePredictor:
+    """
+    Wrapper tf.lite.Interpreter untuk inference batch besar
+
+    Input tensor di-resize sekali ke batch_size; batch terakhir yang lebih
+    kecil di-pad supaya interpreter tidak perlu allocate_tensors ulang.
+    Input/output dalam satuan asli (scaling dilakukan di sini).
+    """
+
+    def __init__(self, model_path=DEFAULT_MODEL, scaler_X=None, scaler_y=None,
+                 batch_size=DEFAULT_BATCH_SIZE, num_threads=None):
+        import tensorflow as tf
+
+        if scaler_X is None or scaler_y is None:
+            scaler_X, scaler_y = load_scalers()
+        self.x_scale = np.asarray(scaler_X.scale_, dtype=np.float32)
+        self.x_min = np.asarray(scaler_X.min_, dtype=np.float32)
+        self.y_scale = np.asarray(scaler_y.scale_, dtype=np.float32)
+        self.y_min = np.asarray(scaler_y.min_, dtype=np.float32)
+
+        self.model_path = model_path
+        self.batch_size = batch_size
+        try:
+            self.interpreter = self._allocate(tf, model_path, num_threads)
+        except RuntimeError:
+            # XNNPACK menolak layer int8 dengan scale degenerate (ReLU mati
+            # di semua sample kalibrasi); kernel builtin tetap bisa jalan
+            self.interpreter = self._allocate(
+                tf, model_path, num_threads,
+                tf.lite.experimental.OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES,
+            )
+
+        self.input_detail = self.interpreter.get_input_details()[0]
+        self.output_detail = self.interpreter.get_output_details()[0]
+        self.kind = self._detect_kind()
+
+    def _allocate(self, tf, model_path, num_threads, resolver=None):
+        kwargs = {'experimental_op_resolver_type': resolver} if resolver else {}
+        interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads, **kwargs)
+        input_detail = interpreter.get_input_details()[0]
+        n_inputs = input_detail['shape_signature'][-1]
+        interpreter.resize_tensor_input(input_detail['index'], [self.batch_size, n_inputs])
+        interpreter.allocate_tensors()
+        return interpreter
+
+    def _detect_kind(self):
+        """'int8' (I/O int8), 'dynamic-range' (I/O float, weights int8) atau 'float32'"""
+        if self.input_detail['dtype'] == np.int8:
+            return 'int8'
+        weight_types = {d['dtype'] for d in self.interpreter.get_tensor_details()}
+        return 'dynamic-range' if np.int8 in weight_types else 'float32'
+
+    def _quantize(self, x):
+        scale, zero_point = self.input_detail['quantization']
+        q = np.round(x / scale + zero_point)
+        return np.clip(q, -128, 127).astype(np.int8)
+
+    def _dequantize(self, q):
+        scale, zero_point = self.output_detail['quantization']
+        return (q.astype(np.float32) - zero_point) * scale
+
+    def predict_scaled(self, X_scaled):
+        """Inference pada input yang sudah di-scale (0-1); output juga scaled"""
+        n = len(X_scaled)
+        out = np.empty((n, len(TARGETS)), dtype=np.float32)
+        batch = np.zeros((self.batch_size, self.input_detail['shape'][-1]), dtype=np.float32)
+        for start in range(0, n, self.batch_size):
+            stop = min(start + self.batch_size, n)
+            batch[:stop - start] = X_scaled[start:stop]
+            batch[stop - start:] = 0
+            x = self._quantize(batch) if self.kind == 'int8' else batch
+            self.interpreter.set_tensor(self.input_detail['index'], x)
+            self.interpreter.invoke()
+            y = self.interpreter.get_tensor(self.output_detail['index'])
+            if self.kind == 'int8':
+                y = self._dequantize(y)
+            out[start:stop] = y[:stop - start]
+        return out
+
+    def predict(self, X):
+        """
+        Prediksi PM2.5/PM10 dari array (n, 3) temperature, humidity, pressure
+
+        Returns:
+            array (n, 2) float32 [pm25, pm10]
+        """
+        X_scaled = np.asarray(X, dtype=np.float32) * self.x_scale + self.x_min
+        return (self.predict_scaled(X_scaled) - self.y_min) / self.y_scale
+
+
+def load_predictor(model_path=DEFAULT_MODEL, batch_size=DEFAULT_BATCH_SIZE, **kwargs):
+    """
+    Buat predictor sesuai format model
+
+    .tflite → TFLitePredictor, .npz / .pmb → NumpyPredictor (forward pass
+    NumPy, biasanya lebih cepat untuk batch besar dan tanpa import TensorFlow),
+    .lut → LutPredictor (lookup table, lihat lut_surrogate.py)
+    """
+    if model_path.endswith('.tflite'):
+        return TFLitePredictor(model_path, batch_size=batch_size, **kwargs)
+    if model_path.endswith('.npz'):
+        from numpy_predictor import NumpyPredictor
+        return NumpyPredictor.load(model_path)
+    if model_path.endswith('.pmb'):
+        from model_bundle import load_bundle
+        return load_bundle(model_path).predictor()
+    if model_path.endswith('.lut'):
+        from lut_surrogate import LutPredictor
+        return LutPredictor.load(model_path)
+    raise ValueError(f"Unsupported model format: {model_path}")
+
+
+# ==========================================
+# 2. Streaming CSV Backfill
+# ==========================================
+def iter_predictions(predictor, input_path, chunksize=DEFAULT_CHUNKSIZE, keep=()):
+    """
+    Yield DataFrame hasil prediksi per chunk
+
+    Baris dengan input NaN menghasilkan prediksi NaN (baris tetap ada,
+    supaya output sejajar dengan input).
+    """
+    columns = list(keep) + [c for c in FEATURES if c not in keep]
+    dtypes = {c: np.float32 for c in FEATURES}
+    for chunk in pd.read_csv(input_path, usecols=columns, dtype=dtypes, chunksize=chunksize):
+        X = chunk[FEATURES].to_numpy(dtype=np.float32)
+        valid = np.isfinite(X).all(axis=1)
+        y = np.full((len(X), len(TARGETS)), np.nan, dtype=np.float32)
+        if valid.any():
+            y[valid] = predictor.predict(X[valid])
+        out = chunk[list(keep) + FEATURES].copy()
+        for i, target in enumerate(TARGETS):
+            out[f'pred_{target}'] = y[:, i]
+        yield out
+
+
+def backfill(predictor, input_path, output_path, chunksize=DEFAULT_CHUNKSIZE, keep=()):
+    """
+    Jalankan prediksi untuk seluruh CSV dan tulis hasilnya secara streaming
+
+    Returns:
+        dict statistik: rows, seconds, rows_per_sec
+    """
+    rows = 0
+    start = time.perf_counter()
+    header = True
+    for out in iter_predictions(predictor, input_path, chunksize, keep):
+        out.to_csv(output_path, mode='w' if header else 'a', header=header, index=False)
+        header = False
+        rows += len(out)
+        elapsed = time.perf_counter() - start
+        print(f"   {rows:,} rows ({rows / elapsed:,.0f} rows/sec)", end="\r")
+    elapsed = time.perf_counter() - start
+    print()
+    return {'rows': rows, 'seconds': elapsed, 'rows_per_sec': rows / elapsed if elapsed else 0.0}
+
+
+# ==========================================
+# Main Function
+# ==========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch PM2.5/PM10 inference for backfilling history")
+    parser.add_argument('--model', default=DEFAULT_MODEL,
+                        help="Model .tflite (float32, dynamic-range atau int8), .npz / .pmb (NumPy) atau .lut (lookup table)")
+    parser.add_argument('--input', required=True, help="CSV dengan temperature, humidity, pressure")
+    parser.add_argument('--output', required=True, help="CSV output")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--threads', type=int, default=None, help="Interpreter threads")
+    parser.add_argument('--keep', default="",
+                        help="Kolom input tambahan yang ikut ditulis, misal timestamp,location")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("Batch PM Inference (Backfill)")
+    print("="*60)
+
+    for path in (args.model, args.input):
+        if not os.path.exists(path):
+            print(f"❌ File not found: {path}")
+            sys.exit(1)
+
+    predictor = load_predictor(args.model, args.batch_size, num_threads=args.threads)
+    print(f"   Model: {args.model} ({predictor.kind})")
+
+    keep = tuple(c for c in args.keep.split(',') if c)
+    stats = backfill(predictor, args.input, args.output, args.chunksize, keep)
+    print(f"   ✅ Saved: {args.output}")
+    print(f"   Rows: {stats['rows']:,} in {stats['seconds']:.2f}s "
+          f"({stats['rows_per_sec']:,.0f} rows/sec)")
@@ -0,0 +1,371 @@
+"""
+Benchmark suite untuk pipeline ML (loading, training, konversi, inference)
+
+Semua benchmark memakai data sintetis dengan jumlah baris yang bisa diatur
+(10k sampai 10M), jadi hasilnya reproducible dan tidak tergantung dataset
+yang sedang ada di processed/. Hasil dibandingkan dengan baseline JSON;
+metric yang lebih buruk dari baseline melebihi toleransi dianggap regresi
+dan script keluar dengan exit code 1 (bisa dipakai sebelum redeploy model).
+
+Metrics:
+    load     rows/sec CSV chunked read, build columnar cache, load cache
+    fit      samples/sec model.fit per epoch (epoch pertama = warmup)
+    convert  detik TFLiteConverter float32 dan int8
+    infer    latency single-sample (p50) dan rows/sec batched untuk
+             Keras, TFLite float32, TFLite int8 dan NumPy forward pass
+
+Usage:
+    python benchmark.py --rows 100000 --save-baseline     # simpan baseline
+    python benchmark.py --rows 100000                     # bandingkan
+    python benchmark.py --rows 10000000 --sections load   # loading saja
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data_pipeline import COLUMNS, iter_chunks, load_xy
+from dataset_cache import build_cache
+from synthetic_data import generate_chunk, load_profiles, location_starts
+
+BASELINE_PATH = "models/benchmark_baseline.json"
+RESULTS_PATH = "models/benchmark_results.json"
+SECTIONS = ('load', 'fit', 'convert', 'infer')
+DEFAULT_TOLERANCE = 0.25
+
+# Arah perbandingan per metric: 'higher' = makin besar makin baik
+METRICS = {
+    'csv_chunks_rows_per_sec': 'higher',
+    'cache_build_rows_per_sec': 'higher',
+    'cache_load_rows_per_sec': 'higher',
+    'fit_samples_per_sec': 'higher',
+    'convert_float_seconds': 'lower',
+    'convert_int8_seconds': 'lower',
+}
+for _engine in ('keras', 'tflite_float', 'tflite_int8', 'numpy'):
+    METRICS[f'{_engine}_single_us_p50'] = 'lower'
+    METRICS[f'{_engine}_batch_rows_per_sec'] = 'higher'
+
+
+# ==========================================
+# 1. Synthetic Data
+# ==========================================
+def write_synthetic_csv(path, rows, seed=0, block=1_000_000):
+    """Tulis CSV sintetis (synthetic_data.py) per blok, memory tetap kecil untuk 10M rows"""
+    profiles = load_profiles()
+    starts = location_starts(rows, profiles)
+    names = np.array(list(profiles))
+    for chunk_index, start in enumerate(range(0, rows, block)):
+        columns = generate_chunk(start, min(block, rows - start), starts, profiles, seed, chunk_index)
+        frame = pd.DataFrame({name: columns[name] for name in COLUMNS})
+        frame['location'] = names[columns['location']]
+        frame.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0,
+                     index=False, float_format='%.3f')
+    return path
+
+
+# ==========================================
+# 2. Benchmarks
+# ==========================================
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def _single_latency_us(fn, x, repeats):
+    """p50 latency (µs) untuk satu sample, setelah beberapa warmup call"""
+    for _ in range(10):
+        fn(x)
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn(x)
+        timings[i] = time.perf_counter() - start
+    return float(np.percentile(timings, 50) * 1e6)
+
+
+def bench_load(csv_path, rows, work_dir):
+    """rows/sec untuk CSV chunked read, build cache dan load cache"""
+    def read_all():
+        return sum(len(X) for X, _ in iter_chunks(csv_path))
+
+    _, csv_seconds = _timed(read_all)
+    cache_dir, build_seconds = _timed(
+        lambda: build_cache(csv_path, cache_root=os.path.join(work_dir, 'cache'), force=True))
+    _, load_seconds = _timed(lambda: load_xy(cache_dir))
+    return {
+        'csv_chunks_rows_per_sec': rows / csv_seconds,
+        'cache_build_rows_per_sec': rows / build_seconds,
+        'cache_load_rows_per_sec': rows / load_seconds,
+    }, cache_dir
+
+
+def bench_fit(model, X, y, epochs, batch_size):
+    """samples/sec model.fit, median epoch setelah epoch pertama (tracing)"""
+    from tensorflow import keras
+
+    class EpochTimer(keras.callbacks.Callback):
+        def on_train_begin(self, logs=None):
+            self.seconds = []
+
+        def on_epoch_begin(self, epoch, logs=None):
+            self._start = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            self.seconds.append(time.perf_counter() - self._start)
+
+    timer = EpochTimer()
+    model.fit(X, y, epochs=epochs, batch_size=batch_size, verbose=0, callbacks=[timer])
+    steady = timer.seconds[1:] or timer.seconds
+    return {'fit_samples_per_sec': len(X) / float(np.median(steady))}
+
+
+def bench_convert(model, X_calib, work_dir):
+    """Waktu konversi TFLite float32 dan int8 (representative dataset asli)"""
+    import tensorflow as tf
+
+    def convert_float():
+        return tf.lite.TFLiteConverter.from_keras_model(model).convert()
+
+    def representative_dataset():
+        for i in range(len(X_calib)):
+            yield [X_calib[i:i + 1]]
+
+    def convert_int8():
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+        return converter.convert()
+
+    float_model, float_seconds = _timed(convert_float)
+    int8_model, int8_seconds = _timed(convert_int8)
+    paths = {}
+    for name, content in (('float', float_model), ('int8', int8_model)):
+        paths[name] = os.path.join(work_dir, f"bench_{name}.tflite")
+        with open(paths[name], 'wb') as f:
+            f.write(content)
+    return {'convert_float_seconds': float_seconds, 'convert_int8_seconds': int8_seconds}, paths
+
+
+def bench_infer(model, tflite_paths, scaler_X, scaler_y, X, repeats, batch_size=4096):
+    """Single-sample p50 latency dan batched rows/sec per engine"""
+    from batch_inference import TFLitePredictor
+    from export_numpy import export_arrays
+    from numpy_predictor import NumpyPredictor
+
+    X_scaled = scaler_X.transform(X).astype(np.float32)
+    x_one = X_scaled[:1]
+    results = {}
+
+    results['keras_single_us_p50'] = _single_latency_us(
+        lambda x: model(x, training=False), x_one, repeats)
+    _, seconds = _timed(lambda: model.predict(X_scaled, batch_size=batch_size, verbose=0))
+    results['keras_batch_rows_per_sec'] = len(X) / seconds
+
+    for name, path in tflite_paths.items():
+        single = TFLitePredictor(path, scaler_X, scaler_y, batch_size=1)
+        batched = TFLitePredictor(path, scaler_X, scaler_y, batch_size=batch_size)
+        results[f'tflite_{name}_single_us_p50'] = _single_latency_us(
+            single.predict_scaled, x_one, repeats)
+        _, seconds = _timed(lambda: batched.predict_scaled(X_scaled))
+        results[f'tflite_{name}_batch_rows_per_sec'] = len(X) / seconds
+
+    arrays = export_arrays(model, scaler_X, scaler_y)
+    n_layers = int(arrays['n_layers'])
+    predictor = NumpyPredictor(
+        [arrays[f'W{i}'] for i in range(n_layers)], [arrays[f'b{i}'] for i in range(n_layers)],
+        arrays['activations'], arrays['x_min'], arrays['x_scale'],
+        arrays['y_min'], arrays['y_scale'],
+    )
+    results['numpy_single_us_p50'] = _single_latency_us(predictor.predict_scaled, x_one, repeats)
+    _, seconds = _timed(lambda: predictor.predict_scaled(X_scaled))
+    results['numpy_batch_rows_per_sec'] = len(X) / seconds
+    return results
+
+
+# ==========================================
+# 3. Baseline Comparison
+# ==========================================
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Bandingkan hasil dengan baseline
+
+    Returns:
+        list of dict per metric: name, value, baseline, change, regression
+    """
+    rows = []
+    for name, value in results.items():
+        if name not in baseline:
+            rows.append({'name': name, 'value': value, 'baseline': None,
+                         'change': None, 'regression': False})
+            continue
+        base = baseline[name]
+        change = (value - base) / base if base else 0.0
+        worse = -change if METRICS[name] == 'higher' else change
+        rows.append({'name': name, 'value': value, 'baseline': base,
+                     'change': change, 'regression': worse > tolerance})
+    return rows
+
+
+def load_baseline(path, rows):
+    """Baseline untuk skala rows tertentu (baseline disimpan per --rows)"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f).get(str(rows), {}).get('metrics')
+
+
+def save_baseline(path, rows, results):
+    baselines = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            baselines = json.load(f)
+    baselines[str(rows)] = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'machine': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'metrics': results,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(baselines, f, indent=2)
+
+
+# ==========================================
+# Main Function
+# ==========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark loading, training, conversion and inference")
+    parser.add_argument('--rows', type=int, default=100_000, help="Jumlah baris sintetis (10k-10M)")
+    parser.add_argument('--sections', default=','.join(SECTIONS),
+                        help=f"Benchmark yang dijalankan, dipisah koma ({','.join(SECTIONS)})")
+    parser.add_argument('--fit-rows', type=int, default=200_000,
+                        help="Maksimum baris untuk benchmark model.fit")
+    parser.add_argument('--fit-epochs', type=int, default=3)
+    parser.add_argument('--fit-batch-size', type=int, default=32)
+    parser.add_argument('--infer-rows', type=int, default=1_000_000,
+                        help="Maksimum baris untuk batched inference")
+    parser.add_argument('--repeats', type=int, default=500, help="Repeats untuk single-sample latency")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="Simpan hasil sebagai baseline untuk --rows ini")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Regresi relatif yang masih diterima (0.25 = 25%%)")
+    parser.add_argument('--output', default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    sections = [s for s in args.sections.split(',') if s]
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        parser.error(f"Unknown sections: {', '.join(sorted(unknown))}")
+
+    print("="*60)
+    print(f"PM Pipeline Benchmark ({args.rows:,} synthetic rows)")
+    print("="*60)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="pm_bench_") as work_dir:
+        print("\n[1/5] Generating synthetic data...")
+        csv_path, seconds = _timed(lambda: write_synthetic_csv(
+            os.path.join(work_dir, "synthetic.csv"), args.rows, args.seed))
+        print(f"   ✅ {args.rows:,} rows in {seconds:.1f}s")
+
+        cache_dir = None
+        if 'load' in sections:
+            print("\n[2/5] Benchmarking dataset loading...")
+            load_results, cache_dir = bench_load(csv_path, args.rows, work_dir)
+            results.update(load_results)
+            for name, value in load_results.items():
+                print(f"   {name:<28}{value:>14,.0f}")
+
+        if {'fit', 'convert', 'infer'} & set(sections):
+            import tensorflow as tf
+            from sklearn.preprocessing import MinMaxScaler
+            from pm_model import build_model
+
+            tf.keras.utils.set_random_seed(args.seed)
+            if cache_dir is None:
+                cache_dir = build_cache(csv_path, cache_root=os.path.join(work_dir, 'cache'))
+            X, y = load_xy(cache_dir)
+            scaler_X = MinMaxScaler().fit(X)
+            scaler_y = MinMaxScaler().fit(y)
+            model = build_model()
+
+            if 'fit' in sections:
+                print("\n[3/5] Benchmarking model.fit...")
+                n_fit = min(len(X), args.fit_rows)
+                fit_results = bench_fit(
+                    model,
+                    scaler_X.transform(X[:n_fit]).astype(np.float32),
+                    scaler_y.transform(y[:n_fit]).astype(np.float32),
+                    args.fit_epochs, args.fit_batch_size,
+                )
+                results.update(fit_results)
+                print(f"   fit_samples_per_sec         {fit_results['fit_samples_per_sec']:>14,.0f}")
+
+            tflite_paths = {}
+            if {'convert', 'infer'} & set(sections):
+                print("\n[4/5] Benchmarking TFLite conversion...")
+                X_calib = scaler_X.transform(X[:500]).astype(np.float32)
+                convert_results, tflite_paths = bench_convert(model, X_calib, work_dir)
+                if 'convert' in sections:
+                    results.update(convert_results)
+                for name, value in convert_results.items():
+                    print(f"   {name:<28}{value:>14.2f}")
+
+            if 'infer' in sections:
+                print("\n[5/5] Benchmarking inference...")
+                X_infer = X[:args.infer_rows]
+                infer_results = bench_infer(model, tflite_paths, scaler_X, scaler_y,
+                                            X_infer, args.repeats)
+                results.update(infer_results)
+                for name, value in infer_results.items():
+                    print(f"   {name:<28}{value:>14,.1f}")
+
+    # Bandingkan dengan baseline
+    print("\n" + "="*60)
+    baseline = load_baseline(args.baseline, args.rows)
+    comparison = compare(results, baseline or {}, args.tolerance)
+    regressions = [r for r in comparison if r['regression']]
+    if baseline is None:
+        print(f"⚠️  No baseline for --rows {args.rows} in {args.baseline}")
+    else:
+        print(f"Comparison vs baseline (tolerance {args.tolerance:.0%})")
+        for r in comparison:
+            if r['change'] is None:
+                continue
+            mark = "❌" if r['regression'] else "✅"
+            print(f"   {mark} {r['name']:<28}{r['value']:>14,.1f}  ({r['change']:+.1%})")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'rows': args.rows,
+            'machine': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'metrics': results,
+            'comparison': comparison,
+        }, f, indent=2)
+    print(f"   ✅ Saved: {args.output}")
+
+    if args.save_baseline:
+        save_baseline(args.baseline, args.rows, results)
+        print(f"   ✅ Baseline saved: {args.baseline} (rows={args.rows})")
+    elif regressions:
+        print(f"❌ {len(regressions)} performance regression(s) vs baseline")
+        sys.exit(1)
+    print("="*60)
@@ -0,0 +1,487 @@
+"""
+Knowledge distillation + pruning PM predictor untuk budget ESP32
+
+train_model.py memilih satu arsitektur kecil (16-8-4) dan
+convert_to_tflite.py hanya melakukan post-training quantization. Script ini:
+
+1. Train teacher besar (default 128-64-32) dengan full feature set
+   (features.py: lag, rolling, tendency, time, voc/eco2)
+2. Distill ke student MLP yang hanya butuh temperature/humidity/pressure
+   (input firmware sekarang), untuk semua arsitektur yang masuk budget
+   flash (--max-flash) dan MAC (--max-macs)
+3. Pruning magnitude: student yang lebih besar dari budget di-prune per
+   hidden unit (skor = norm weight masuk × norm weight keluar) bertahap,
+   fine-tune dengan loss distillation setiap step, sampai masuk budget
+4. Pareto front R² vs biaya on-device (MAC, flash), model terbaik dalam
+   budget disimpan sebagai bundle + .npz untuk export_c_header.py
+
+Pemilihan kandidat, Pareto front dan kapan pruning berhenti memakai
+validation split yang dipisah dari data train; test set hanya dipakai
+sekali untuk metrics model terpilih, supaya metrics itu tidak bias.
+
+Loss distillation: alpha · MSE(y) + (1 - alpha) · MSE(teacher). Untuk MSE
+ini sama dengan MSE terhadap target campuran alpha·y + (1-alpha)·teacher
+(selisihnya konstanta), jadi student cukup di-fit ke target campuran.
+
+Pruning dilakukan per unit (structured), bukan per weight: forward pass di
+ESP32 (export_c_header.py) adalah dense matmul, jadi weight nol tidak
+mengurangi latency maupun flash, sedangkan unit yang dibuang langsung
+mengecilkan layer.
+
+Usage:
+    python compress_model.py
+    python compress_model.py --reference --workers 4
+    python compress_model.py --max-macs 150 --students 8-4,8-8,12-8 --prune-from 32-16,64-32-16
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+
+from data_pipeline import FEATURES, TARGETS
+from dataset_cache import CACHE_DIR, build_cache, load_dir, synthetic_targets, synthetic_warning
+from features import build_features
+from pm_model import (
+    DEFAULT_DROPOUT, DEFAULT_HIDDEN, build_model, count_macs, esp32_cost, evaluate,
+    fit_model, parse_hidden,
+)
+
+REPORT_PATH = "models/compression_report.json"
+BUNDLE_PATH = "models/pm_predictor_compressed.pmb"
+WEIGHTS_PATH = "models/pm_predictor_compressed_weights.npz"
+
+DEFAULT_TEACHER = (128, 64, 32)
+DEFAULT_STUDENTS = "8-4,8-8,12-8,16-8,20-6,12-8-4,16-8-4"
+DEFAULT_PRUNE_FROM = "32-16,32-16-8,64-32-16"
+
+# Budget default = biaya model sekarang (16-8-4, float32)
+DEFAULT_MAX_MACS = count_macs(DEFAULT_HIDDEN)
+DEFAULT_MAX_FLASH = esp32_cost(DEFAULT_HIDDEN)['flash_bytes_float32']
+
+SHARED_ARRAYS = ('X_train', 'y_train', 't_train', 'X_val', 'y_val', 'y_min', 'y_scale')
+
+# Diisi oleh _init_worker di setiap worker process
+_shared = {}
+
+
+# ==========================================
+# 1. Teacher (full feature set)
+# ==========================================
+def load_data(cache_dir, test_size=0.2, val_size=0.2, seed=42):
+    """
+    Full features + target, split test sama dengan train_model.py
+
+    Validation split (val_size dari bagian train) dipakai untuk memilih
+    student; test set tidak disentuh sampai model terpilih.
+
+    Returns:
+        dict X_full_train/val/test, X_raw_train/val/test (FEATURES),
+        y_train/val/test, feature_names
+    """
+    from sklearn.model_selection import train_test_split
+
+    columns, _ = load_dir(cache_dir)
+    X_full, names = build_features(columns)
+    y = np.column_stack([columns[c] for c in TARGETS]).astype(np.float32)
+    mask = np.isfinite(X_full).all(axis=1) & np.isfinite(y).all(axis=1)
+    X_full, y = X_full[mask], y[mask]
+
+    X_full_train, X_full_test, y_train, y_test = train_test_split(
+        X_full, y, test_size=test_size, random_state=seed
+    )
+    X_full_train, X_full_val, y_train, y_val = train_test_split(
+        X_full_train, y_train, test_size=val_size, random_state=seed
+    )
+    raw = [names.index(c) for c in FEATURES]
+    return {
+        'X_full_train': X_full_train, 'X_full_val': X_full_val, 'X_full_test': X_full_test,
+        'X_raw_train': X_full_train[:, raw], 'X_raw_val': X_full_val[:, raw],
+        'X_raw_test': X_full_test[:, raw],
+        'y_train': y_train, 'y_val': y_val, 'y_test': y_test,
+        'feature_names': names,
+    }
+
+
+def train_teacher(data, hidden=DEFAULT_TEACHER, dropout=0.1, learning_rate=0.001,
+                  epochs=200, patience=15, seed=42):
+    """
+    Train teacher dengan full feature set
+
+    Returns:
+        (soft targets train (scaled y), metrics test, scaler_y)
+    """
+    import tensorflow as tf
+    from sklearn.preprocessing import MinMaxScaler
+
+    scaler_X = MinMaxScaler().fit(data['X_full_train'])
+    scaler_y = MinMaxScaler().fit(data['y_train'])
+    X_train = scaler_X.transform(data['X_full_train'])
+
+    tf.keras.utils.set_random_seed(seed)
+    teacher = build_model(hidden, dropout, learning_rate, input_dim=X_train.shape[1])
+    fit_model(teacher, X_train, scaler_y.transform(data['y_train']),
+              batch_size=64, epochs=epochs, patience=patience)
+
+    soft = teacher.predict(X_train, batch_size=4096, verbose=0)
+    y_pred = scaler_y.inverse_transform(
+        teacher.predict(scaler_X.transform(data['X_full_test']), batch_size=4096, verbose=0)
+    )
+    return soft.astype(np.float32), evaluate(data['y_test'], y_pred), scaler_y
+
+
+def prepare_shared_data(data, soft, out_root=CACHE_DIR):
+    """
+    Simpan array student (input FEATURES saja) sebagai .npy untuk worker
+
+    Returns:
+        (path direktori sementara, scaler_X raw, scaler_y)
+    """
+    from sklearn.preprocessing import MinMaxScaler
+
+    scaler_X = MinMaxScaler().fit(data['X_raw_train'])
+    scaler_y = MinMaxScaler().fit(data['y_train'])
+    arrays = {
+        'X_train': scaler_X.transform(data['X_raw_train']),
+        'y_train': scaler_y.transform(data['y_train']),
+        't_train': soft,
+        'X_val': scaler_X.transform(data['X_raw_val']),
+        'y_val': data['y_val'],
+        'y_min': scaler_y.min_,
+        'y_scale': scaler_y.scale_,
+    }
+    os.makedirs(out_root, exist_ok=True)
+    shared_dir = tempfile.mkdtemp(prefix="compress-", dir=out_root)
+    for name, values in arrays.items():
+        np.save(os.path.join(shared_dir, f"{name}.npy"), np.ascontiguousarray(values, dtype=np.float32))
+    return shared_dir, scaler_X, scaler_y
+
+
+# ==========================================
+# 2. Student Worker (distill + prune)
+# ==========================================
+def _init_worker(shared_dir, threads):
+    """Batasi thread TensorFlow dan buka shared arrays (mmap, read-only)"""
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    for name in SHARED_ARRAYS:
+        _shared[name] = np.load(os.path.join(shared_dir, f"{name}.npy"), mmap_mode='r')
+
+
+def within_budget(cost, max_macs, max_flash):
+    return cost['macs'] <= max_macs and cost['flash_bytes_float32'] <= max_flash
+
+
+def prune_units(weights, rate):
+    """
+    Buang `rate` bagian unit di setiap hidden layer (minimal sisa 1 unit)
+
+    Skor unit j = ||W_in[:, j]|| · ||W_out[j, :]||: unit dengan weight
+    masuk atau keluar kecil paling sedikit berkontribusi ke output.
+
+    Args:
+        weights: [W0, b0, W1, b1, ...] dari model.get_weights()
+
+    Returns:
+        (weights baru, hidden baru)
+    """
+    weights = [np.array(w) for w in weights]
+    hidden = []
+    for i in range(len(weights) // 2 - 1):
+        W_in, b, W_out = weights[2 * i], weights[2 * i + 1], weights[2 * i + 2]
+        units = W_in.shape[1]
+        keep = max(1, min(units - 1, int(round(units * (1 - rate))))) if units > 1 else 1
+        score = np.linalg.norm(W_in, axis=0) * np.linalg.norm(W_out, axis=1)
+        idx = np.sort(np.argsort(-score, kind='stable')[:keep])
+        weights[2 * i], weights[2 * i + 1], weights[2 * i + 2] = W_in[:, idx], b[idx], W_out[idx, :]
+        hidden.append(keep)
+    return weights, tuple(hidden)
+
+
+def _score(model, config, hidden, history, **extra):
+    """Metrics pada validation split (bukan test) + biaya ESP32"""
+    y_pred_scaled = model.predict(_shared['X_val'], batch_size=4096, verbose=0)
+    y_pred = (y_pred_scaled - _shared['y_min']) / _shared['y_scale']
+    metrics = evaluate(np.asarray(_shared['y_val']), y_pred)
+    cost = esp32_cost(hidden)
+    return {
+        'kind': config['kind'],
+        'alpha': config['alpha'],
+        'hidden': list(hidden),
+        **cost,
+        **metrics,
+        'r2_mean': float(np.mean([metrics[f'r2_{t}'] for t in TARGETS])),
+        'within_budget': within_budget(cost, config['max_macs'], config['max_flash']),
+        'epochs_run': len(history.history['loss']),
+        'weights': [w.tolist() for w in model.get_weights()],
+        **extra,
+    }
+
+
+def run_candidate(config):
+    """
+    Train satu student (dijalankan di worker process)
+
+    config['kind']:
+        'baseline' - hard label saja (alpha=1), sama seperti train_model.py
+        'distill'  - target campuran label + teacher
+        'prune'    - distill arsitektur besar, lalu prune + fine-tune
+                     bertahap sampai masuk budget; setiap step satu hasil
+
+    Returns:
+        list hasil (config + metrics validation + biaya ESP32 + weights)
+    """
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(config['seed'])
+    alpha = config['alpha']
+    target = alpha * _shared['y_train'] + (1 - alpha) * _shared['t_train']
+    hidden = tuple(config['hidden'])
+
+    model = build_model(hidden, config['dropout'], config['learning_rate'])
+    history = fit_model(model, _shared['X_train'], target, batch_size=config['batch_size'],
+                        epochs=config['epochs'], patience=config['patience'])
+    results = [_score(model, config, hidden, history, pruned_from=None, prune_step=0)]
+    if config['kind'] != 'prune':
+        return results
+
+    weights, source = model.get_weights(), hidden
+    for step in range(1, config['max_prune_steps'] + 1):
+        if results[-1]['within_budget'] or all(units == 1 for units in hidden):
+            break
+        weights, hidden = prune_units(weights, config['prune_rate'])
+        model = build_model(hidden, config['dropout'], config['learning_rate'] * 0.5)
+        model.set_weights(weights)
+        history = fit_model(model, _shared['X_train'], target, batch_size=config['batch_size'],
+                            epochs=config['finetune_epochs'], patience=config['patience'])
+        weights = model.get_weights()
+        results.append(_score(model, config, hidden, history,
+                              pruned_from=list(source), prune_step=step))
+    return results
+
+
+# ==========================================
+# 3. Pareto Front
+# ==========================================
+def pareto_front(results):
+    """
+    Tandai hasil yang tidak didominasi (R² lebih tinggi, MAC dan flash lebih kecil)
+
+    Returns:
+        list hasil di front, diurutkan dari MAC terkecil
+    """
+    def dominates(a, b):
+        no_worse = (a['r2_mean'] >= b['r2_mean'] and a['macs'] <= b['macs']
+                    and a['flash_bytes_float32'] <= b['flash_bytes_float32'])
+        better = (a['r2_mean'] > b['r2_mean'] or a['macs'] < b['macs']
+                  or a['flash_bytes_float32'] < b['flash_bytes_float32'])
+        return no_worse and better
+
+    for r in results:
+        r['pareto'] = not any(dominates(other, r) for other in results if other is not r)
+    return sorted((r for r in results if r['pareto']), key=lambda r: (r['macs'], -r['r2_mean']))
+
+
+def make_candidates(students, prune_from, alphas, max_macs, max_flash, dropout=DEFAULT_DROPOUT,
+                    batch_size=32, learning_rate=0.001, epochs=100, patience=10,
+                    finetune_epochs=30, prune_rate=0.25, max_prune_steps=10, seed=42):
+    """Baseline 16-8-4 + student dalam budget × alpha + kandidat pruning × alpha"""
+    common = {
+        'dropout': dropout, 'batch_size': batch_size, 'learning_rate': learning_rate,
+        'epochs': epochs, 'patience': patience, 'finetune_epochs': finetune_epochs,
+        'prune_rate': prune_rate, 'max_prune_steps': max_prune_steps, 'seed': seed,
+        'max_macs': max_macs, 'max_flash': max_flash,
+    }
+    candidates = [{**common, 'kind': 'baseline', 'hidden': DEFAULT_HIDDEN, 'alpha': 1.0}]
+    for hidden in students:
+        if not within_budget(esp32_cost(hidden), max_macs, max_flash):
+            print(f"   ⚠️  Student {'-'.join(map(str, hidden))} exceeds budget, skipped "
+                  f"(use --prune-from to shrink it)")
+            continue
+        candidates += [{**common, 'kind': 'distill', 'hidden': hidden, 'alpha': a} for a in alphas]
+    for hidden in prune_from:
+        candidates += [{**common, 'kind': 'prune', 'hidden': hidden, 'alpha': a} for a in alphas]
+    return candidates
+
+
+def run_candidates(candidates, shared_dir, workers, threads_per_worker=1):
+    """Jalankan semua kandidat di ProcessPoolExecutor (pola sama dengan sweep.py)"""
+    results = []
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(shared_dir, threads_per_worker),
+    ) as executor:
+        futures = {executor.submit(run_candidate, config): config for config in candidates}
+        for i, future in enumerate(as_completed(futures), 1):
+            config = futures[future]
+            label = f"{config['kind']} {'-'.join(map(str, config['hidden']))} α={config['alpha']:g}"
+            try:
+                rows = future.result()
+            except Exception as e:
+                print(f"   [{i}/{len(candidates)}] ❌ {label}: {e}")
+                continue
+            results.extend(rows)
+            for r in rows:
+                mark = "✅" if r['within_budget'] else "  "
+                print(f"   [{i}/{len(candidates)}] {mark} {label:<26} → "
+                      f"{'-'.join(map(str, r['hidden'])):>10} val R²={r['r2_pm25']:.3f}/{r['r2_pm10']:.3f} "
+                      f"{r['macs']} MACs, {r['flash_bytes_float32']} B")
+    return results
+
+
+def _csv(values, cast):
+    return [cast(v) for v in values.split(',') if v]
+
+
+# ==========================================
+# Main Function
+# ==========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distill + prune PM predictor under an ESP32 budget")
+    parser.add_argument('--dataset', default="processed/sample_india_singapore_dataset.csv")
+    parser.add_argument('--reference', action='store_true',
+                        help="Pakai Beijing PRSA reference dataset")
+    parser.add_argument('--teacher', default='-'.join(map(str, DEFAULT_TEACHER)))
+    parser.add_argument('--teacher-epochs', type=int, default=200)
+    parser.add_argument('--students', default=DEFAULT_STUDENTS,
+                        help="Arsitektur student (hanya yang masuk budget yang di-train)")
+    parser.add_argument('--prune-from', default=DEFAULT_PRUNE_FROM,
+                        help="Arsitektur besar yang di-prune sampai masuk budget ('' = tanpa pruning)")
+    parser.add_argument('--alphas', default="0.3",
+                        help="Bobot label asli di loss distillation (0 = teacher saja)")
+    parser.add_argument('--max-macs', type=int, default=DEFAULT_MAX_MACS)
+    parser.add_argument('--max-flash', type=int, default=DEFAULT_MAX_FLASH,
+                        help="Budget flash weights float32 (bytes)")
+    parser.add_argument('--prune-rate', type=float, default=0.25,
+                        help="Bagian unit yang dibuang per step pruning")
+    parser.add_argument('--finetune-epochs', type=int, default=30)
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--patience', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--threads-per-worker', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Default: cpu_count / threads-per-worker")
+    parser.add_argument('--output', default=REPORT_PATH)
+    args = parser.parse_args()
+
+    workers = args.workers or max(1, (os.cpu_count() or 1) // args.threads_per_worker)
+
+    print("="*60)
+    print("PM Predictor Distillation + Pruning")
+    print("="*60)
+    print(f"   Budget: ≤ {args.max_macs} MACs, ≤ {args.max_flash} bytes float32 weights")
+
+    print("\n[1/4] Loading full feature set...")
+    if args.reference:
+        from prepare_beijing import SOURCE_PATH, build_training_cache
+        dataset, cache_dir = SOURCE_PATH, build_training_cache()
+    else:
+        dataset, cache_dir = args.dataset, build_cache(args.dataset)
+    data = load_data(cache_dir, seed=args.seed)
+    print(f"   ✅ {len(data['y_train'])} train / {len(data['y_val'])} val / {len(data['y_test'])} test rows, "
+          f"{len(data['feature_names'])} teacher features")
+
+    print(f"\n[2/4] Training teacher {args.teacher}...")
+    start = time.perf_counter()
+    teacher_hidden = parse_hidden(args.teacher)
+    soft, teacher_metrics, _ = train_teacher(data, teacher_hidden, epochs=args.teacher_epochs,
+                                             seed=args.seed)
+    print(f"   ✅ Teacher R²={teacher_metrics['r2_pm25']:.3f}/{teacher_metrics['r2_pm10']:.3f} "
+          f"MAE PM2.5={teacher_metrics['mae_pm25']:.2f} ({time.perf_counter() - start:.1f}s)")
+    synthetic = synthetic_targets(cache_dir)
+    if synthetic:
+        print(f"   {synthetic_warning(synthetic)}")
+
+    shared_dir, scaler_X, scaler_y = prepare_shared_data(data, soft)
+    candidates = make_candidates(
+        [parse_hidden(a) for a in args.students.split(',') if a],
+        [parse_hidden(a) for a in args.prune_from.split(',') if a],
+        _csv(args.alphas, float), args.max_macs, args.max_flash,
+        epochs=args.epochs, patience=args.patience, finetune_epochs=args.finetune_epochs,
+        prune_rate=args.prune_rate, seed=args.seed,
+    )
+    print(f"\n[3/4] Distilling {len(candidates)} students on {workers} workers...")
+    start = time.perf_counter()
+    try:
+        results = run_candidates(candidates, shared_dir, workers, args.threads_per_worker)
+    finally:
+        shutil.rmtree(shared_dir, ignore_errors=True)
+    elapsed = time.perf_counter() - start
+    print(f"   ✅ Done in {elapsed:.1f}s")
+
+    print("\n[4/4] Pareto front + best model within budget...")
+    front = pareto_front(results)
+    for r in front:
+        print(f"   {'✅' if r['within_budget'] else '  '} {r['kind']:<8} "
+              f"{'-'.join(map(str, r['hidden'])):>10} val R²={r['r2_mean']:.3f} "
+              f"{r['macs']:>5} MACs {r['flash_bytes_float32']:>6} B ~{r['est_latency_us']} µs")
+
+    eligible = [r for r in results if r['within_budget']]
+    best = max(eligible, key=lambda r: r['r2_mean']) if eligible else None
+    baseline = next((r for r in results if r['kind'] == 'baseline'), None)
+    if best is not None:
+        from export_numpy import export_npz
+        from model_bundle import save_bundle
+
+        model = build_model(tuple(best['hidden']), 0)
+        model.set_weights([np.asarray(w, dtype=np.float32) for w in best['weights']])
+        # Test set dipakai sekali, hanya untuk model terpilih
+        y_pred = scaler_y.inverse_transform(
+            model.predict(scaler_X.transform(data['X_raw_test']), batch_size=4096, verbose=0)
+        )
+        best['test'] = evaluate(data['y_test'], y_pred)
+        model_info = {
+            'input_features': list(FEATURES),
+            'output_targets': list(TARGETS),
+            'model_size': best['params'],
+            **best['test'],
+            **({'synthetic_targets': synthetic} if synthetic else {}),
+            'compression': {
+                'kind': best['kind'], 'alpha': best['alpha'], 'hidden': best['hidden'],
+                'pruned_from': best['pruned_from'], 'teacher': list(teacher_hidden),
+            },
+        }
+        save_bundle(model, scaler_X, scaler_y, model_info, path=BUNDLE_PATH)
+        export_npz(model, scaler_X, scaler_y, path=WEIGHTS_PATH)
+        print(f"   ✅ Best: {best['kind']} {'-'.join(map(str, best['hidden']))} "
+              f"val R²={best['r2_pm25']:.3f}/{best['r2_pm10']:.3f}, "
+              f"test R²={best['test']['r2_pm25']:.3f}/{best['test']['r2_pm10']:.3f}, {best['macs']} MACs "
+              f"→ {BUNDLE_PATH}, {WEIGHTS_PATH}")
+        if baseline is not None:
+            print(f"   Baseline 16-8-4 (hard labels): val R²={baseline['r2_pm25']:.3f}/{baseline['r2_pm10']:.3f}")
+    else:
+        print("   ❌ No candidate within budget")
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'dataset': dataset,
+        'budget': {'max_macs': args.max_macs, 'max_flash_bytes_float32': args.max_flash},
+        'teacher': {'hidden': list(teacher_hidden), 'features': data['feature_names'], **teacher_metrics},
+        'rows': {k: len(data[f'y_{k}']) for k in ('train', 'val', 'test')},
+        'selection_split': 'val',
+        'synthetic_targets': synthetic,
+        'elapsed_seconds': round(elapsed, 2),
+        'best': None if best is None else {k: v for k, v in best.items() if k != 'weights'},
+        'pareto': [{k: v for k, v in r.items() if k != 'weights'} for r in front],
+        'results': [{k: v for k, v in r.items() if k != 'weights'}
+                    for r in sorted(results, key=lambda r: -r['r2_mean'])],
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"   ✅ Report: {args.output}")
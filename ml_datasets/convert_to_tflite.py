@@ -5,6 +5,29 @@ Convert Keras Model to TensorFlow Lite for ESP32
 import tensorflow as tf
 import numpy as np
 import os
+import io
+import csv
+import json
+import time
+import argparse
+
+from sklearn.model_selection import train_test_split
+
+from data_pipeline import FEATURES, TARGETS, stratified_sample
+from dataset_cache import build_cache, load_dir
+from batch_inference import TFLitePredictor, load_scalers
+from pm_model import evaluate
+from instrumentation import RunReport
+
+parser = argparse.ArgumentParser(description="Convert Keras model to TFLite (float + int8)")
+parser.add_argument('--dataset', default="processed/sample_india_singapore_dataset.csv",
+                    help="Dataset training (untuk kalibrasi int8)")
+parser.add_argument('--reference', action='store_true',
+                    help="Kalibrasi dengan Beijing PRSA reference dataset")
+parser.add_argument('--calibration-samples', type=int, default=500,
+                    help="Jumlah sample representative dataset (stratified)")
+args = parser.parse_args()
+report = RunReport("convert_to_tflite")
 
 print("="*60)
 print("Converting Model to TensorFlow Lite for ESP32")
@@ -13,119 +36,219 @@ print("="*60)
 # ==========================================
 # 1. Load Model
 # ==========================================
-print("\n[1/3] Loading Keras model...")
-model_path = "models/pm_predictor.h5"
-
-if not os.path.exists(model_path):
-    print(f"❌ Model not found: {model_path}")
-    print("   Run train_model.py first!")
-    exit(1)
-
-try:
-    # Try loading with compile=False to avoid metric deserialization issues
-    model = tf.keras.models.load_model(model_path, compile=False)
-    print(f"   ✅ Loaded: {model_path}")
-except Exception as e:
-    print(f"   ⚠️  Error loading model: {e}")
-    print("   Rebuilding model from scratch...")
-    # Rebuild model architecture (same as train_model.py)
-    model = tf.keras.Sequential([
-        tf.keras.layers.Dense(16, activation='relu', input_shape=(3,), name='input'),
-        tf.keras.layers.Dropout(0.2),
-        tf.keras.layers.Dense(8, activation='relu', name='hidden1'),
-        tf.keras.layers.Dense(4, activation='relu', name='hidden2'),
-        tf.keras.layers.Dense(2, activation='linear', name='output')
-    ])
-    # Load weights only
-    model.load_weights(model_path.replace('.h5', '_weights.h5'))
-    print("   ✅ Model rebuilt")
+with report.stage("load"):
+    print("\n[1/5] Loading Keras model...")
+    model_path = "models/pm_predictor.h5"
+
+    if not os.path.exists(model_path):
+        print(f"❌ Model not found: {model_path}")
+        print("   Run train_model.py first!")
+        exit(1)
+
+    try:
+        # Try loading with compile=False to avoid metric deserialization issues
+        model = tf.keras.models.load_model(model_path, compile=False)
+        print(f"   ✅ Loaded: {model_path}")
+    except Exception as e:
+        print(f"   ⚠️  Error loading model: {e}")
+        print("   Rebuilding model from scratch...")
+        # Rebuild model architecture (same as train_model.py)
+        from pm_model import build_model
+        model = build_model()
+        # Load weights only
+        model.load_weights(model_path.replace('.h5', '.weights.h5'))
+        print("   ✅ Model rebuilt")
 
 # ==========================================
-# 2. Convert to TFLite
+# 2. Calibration Data (real training inputs)
 # ==========================================
-print("\n[2/3] Converting to TensorFlow Lite...")
+with report.stage("calibration"):
+    print("\n[2/5] Preparing calibration data...")
+
+    scaler_X, scaler_y = load_scalers()
+
+    if args.reference:
+        from prepare_beijing import build_training_cache
+        cache_dir = build_training_cache()
+    else:
+        cache_dir = build_cache(args.dataset)
+    columns, cache_meta = load_dir(cache_dir)
+    n_inputs = model.input_shape[-1]
+    if n_inputs == len(FEATURES):
+        X_all = np.column_stack([columns[c] for c in FEATURES])
+    else:
+        # Model dari train_model.py --features
+        from features import build_features
+        X_all, _ = build_features(columns)
+    data = np.column_stack([X_all] + [columns[c] for c in TARGETS]).astype(np.float32)
+    groups = np.asarray(columns['location']) if 'location' in columns else np.zeros(len(data), dtype=np.int32)
+    valid = np.isfinite(data).all(axis=1)
+    data, groups = data[valid], groups[valid]
+
+    # Same split as train_model.py: calibrate on train, compare on test
+    train_idx, test_idx = train_test_split(np.arange(len(data)), test_size=0.2, random_state=42)
+    X_train = data[train_idx, :n_inputs]
+    X_test, y_test = data[test_idx, :n_inputs], data[test_idx, n_inputs:]
+
+    calib_idx = stratified_sample(X_train, args.calibration_samples, groups[train_idx])
+    X_calib = scaler_X.transform(X_train[calib_idx]).astype(np.float32)
+    print(f"   ✅ {len(X_calib)} stratified samples from {len(X_train)} training rows ({cache_dir})")
+    print(f"   Scaled range: min={X_calib.min(axis=0).round(3)}, max={X_calib.max(axis=0).round(3)}")
 
-# Standard conversion
-converter = tf.lite.TFLiteConverter.from_keras_model(model)
-tflite_model = converter.convert()
+# ==========================================
+# 3. Convert to TFLite
+# ==========================================
+with report.stage("convert_float"):
+    print("\n[3/5] Converting to TensorFlow Lite...")
 
-# Save standard TFLite
-tflite_path = "models/pm_predictor.tflite"
-with open(tflite_path, 'wb') as f:
-    f.write(tflite_model)
+    # Standard conversion
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    tflite_model = converter.convert()
 
-size_kb = len(tflite_model) / 1024
-print(f"   ✅ Saved: {tflite_path} ({size_kb:.1f} KB)")
+    # Save standard TFLite
+    tflite_path = "models/pm_predictor.tflite"
+    with open(tflite_path, 'wb') as f:
+        f.write(tflite_model)
 
-# ==========================================
-# 3. Quantized Conversion (Smaller size)
-# ==========================================
-print("\n[3/3] Creating quantized model (INT8)...")
-
-# Quantized conversion (smaller, faster on ESP32)
-converter_quant = tf.lite.TFLiteConverter.from_keras_model(model)
-converter_quant.optimizations = [tf.lite.Optimize.DEFAULT]
-
-# Representative dataset for quantization
-def representative_dataset():
-    # Use training data statistics
-    # In real scenario, use actual training samples
-    for i in range(100):
-        yield [np.random.random((1, 3)).astype(np.float32)]
-
-converter_quant.representative_dataset = representative_dataset
-converter_quant.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
-converter_quant.inference_input_type = tf.int8
-converter_quant.inference_output_type = tf.int8
-
-try:
-    tflite_quant_model = converter_quant.convert()
-    
-    tflite_quant_path = "models/pm_predictor_quantized.tflite"
-    with open(tflite_quant_path, 'wb') as f:
-        f.write(tflite_quant_model)
-    
-    size_quant_kb = len(tflite_quant_model) / 1024
-    print(f"   ✅ Saved: {tflite_quant_path} ({size_quant_kb:.1f} KB)")
-    print(f"   Size reduction: {((size_kb - size_quant_kb) / size_kb * 100):.1f}%")
-except Exception as e:
-    print(f"   ⚠️  Quantization failed: {e}")
-    print("   Using standard TFLite model")
+    size_kb = len(tflite_model) / 1024
+    print(f"   ✅ Saved: {tflite_path} ({size_kb:.1f} KB)")
 
 # ==========================================
-# 4. Test TFLite Model
+# 4. Quantized Conversion (Smaller size)
 # ==========================================
-print("\n[4/4] Testing TFLite model...")
+with report.stage("convert_int8"):
+    print("\n[4/5] Creating quantized model (INT8)...")
 
-# Load TFLite model
-interpreter = tf.lite.Interpreter(model_path=tflite_path)
-interpreter.allocate_tensors()
+    # Quantized conversion (smaller, faster on ESP32)
+    converter_quant = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter_quant.optimizations = [tf.lite.Optimize.DEFAULT]
 
-# Get input/output details
-input_details = interpreter.get_input_details()
-output_details = interpreter.get_output_details()
+    # Representative dataset: stratified sample of real scaled training inputs
+    def representative_dataset():
+        for i in range(len(X_calib)):
+            yield [X_calib[i:i + 1]]
 
-print(f"   Input shape: {input_details[0]['shape']}")
-print(f"   Output shape: {output_details[0]['shape']}")
+    converter_quant.representative_dataset = representative_dataset
+    converter_quant.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter_quant.inference_input_type = tf.int8
+    converter_quant.inference_output_type = tf.int8
 
-# Test with sample input
-test_input = np.array([[28.0, 65.0, 1013.0]], dtype=np.float32)
-interpreter.set_tensor(input_details[0]['index'], test_input)
-interpreter.invoke()
-output = interpreter.get_tensor(output_details[0]['index'])
+    tflite_quant_path = "models/pm_predictor_quantized.tflite"
+    tensor_report = []
+    quantized = False
+    try:
+        tflite_quant_model = converter_quant.convert()
+
+        with open(tflite_quant_path, 'wb') as f:
+            f.write(tflite_quant_model)
+        quantized = True
+
+        size_quant_kb = len(tflite_quant_model) / 1024
+        print(f"   ✅ Saved: {tflite_quant_path} ({size_quant_kb:.1f} KB)")
+        print(f"   Size reduction: {((size_kb - size_quant_kb) / size_kb * 100):.1f}%")
+
+        # Per-tensor quantization error (float vs int8 activations, scaled units)
+        debugger = tf.lite.experimental.QuantizationDebugger(
+            converter=converter_quant, debug_dataset=representative_dataset
+        )
+        debugger.run()
+        buffer = io.StringIO()
+        debugger.layer_statistics_dump(buffer)
+        buffer.seek(0)
+        for row in csv.DictReader(buffer):
+            tensor_report.append({
+                key: (value if key in ('op_name', 'tensor_name') else float(value))
+                for key, value in row.items()
+            })
+        print("   Per-tensor quantization error:")
+        for row in tensor_report:
+            print(f"     {row['op_name']:<16} #{int(row['tensor_idx']):<3} "
+                  f"max_abs={row['max_abs_error']:.5f} mse={row['mean_squared_error']:.2e} "
+                  f"scale={row['scale']:.5f}")
+    except Exception as e:
+        print(f"   ⚠️  Quantization failed: {e}")
+        print("   Using standard TFLite model")
+        if not quantized and os.path.exists(tflite_quant_path):
+            # int8 dari run sebelumnya tidak cocok dengan model/scaler sekarang
+            os.remove(tflite_quant_path)
+            print(f"   Removed stale {tflite_quant_path}")
 
-print(f"   Test input: T=28°C, H=65%, P=1013hPa")
-print(f"   Test output: PM2.5={output[0][0]:.1f}, PM10={output[0][1]:.1f}")
+# ==========================================
+# 5. Test TFLite Models (float vs int8)
+# ==========================================
+with report.stage("test"):
+    print("\n[5/5] Testing TFLite models...")
+
+    def measure(path):
+        """Accuracy on the test split + single-sample and batched latency"""
+        single = TFLitePredictor(path, scaler_X, scaler_y, batch_size=1)
+        x_one = scaler_X.transform(X_test[:1]).astype(np.float32)
+        timings = []
+        for _ in range(1000):
+            start = time.perf_counter()
+            single.predict_scaled(x_one)
+            timings.append(time.perf_counter() - start)
+
+        batched = TFLitePredictor(path, scaler_X, scaler_y, batch_size=4096)
+        start = time.perf_counter()
+        y_pred = batched.predict(X_test)
+        batch_seconds = time.perf_counter() - start
+
+        return y_pred, {
+            'kind': single.kind,
+            'size_bytes': os.path.getsize(path),
+            'single_latency_us_p50': float(np.percentile(timings, 50) * 1e6),
+            'single_latency_us_p99': float(np.percentile(timings, 99) * 1e6),
+            'batch_rows_per_sec': float(len(X_test) / batch_seconds),
+            **evaluate(y_test, y_pred),
+        }
+
+    y_float, float_report = measure(tflite_path)
+    quant_report = {'calibration_samples': int(len(X_calib)), 'test_rows': int(len(X_test)),
+                    'float32': float_report, 'tensors': tensor_report}
+
+    # Test with sample input (real units, scaled inside the predictor)
+    if n_inputs == len(FEATURES):
+        test_input = np.array([[28.0, 65.0, 1013.0]], dtype=np.float32)
+        output = TFLitePredictor(tflite_path, scaler_X, scaler_y, batch_size=1).predict(test_input)
+        print("   Test input: T=28°C, H=65%, P=1013hPa")
+        print(f"   Test output: PM2.5={output[0][0]:.1f}, PM10={output[0][1]:.1f}")
+
+    if quantized:
+        y_int8, int8_report = measure(tflite_quant_path)
+        quant_report['int8'] = int8_report
+        quant_report['int8_vs_float_mae'] = [float(v) for v in np.abs(y_int8 - y_float).mean(axis=0)]
+
+    print(f"\n   {'':<10}{'size':>8}{'MAE PM2.5':>11}{'R² PM2.5':>10}{'p50 µs':>9}{'rows/s':>11}")
+    for name in ('float32', 'int8'):
+        if name in quant_report:
+            r = quant_report[name]
+            print(f"   {name:<10}{r['size_bytes']:>7}B{r['mae_pm25']:>11.2f}{r['r2_pm25']:>10.3f}"
+                  f"{r['single_latency_us_p50']:>9.1f}{r['batch_rows_per_sec']:>11,.0f}")
+    if 'int8_vs_float_mae' in quant_report:
+        print(f"   int8 vs float mean |Δ|: PM2.5={quant_report['int8_vs_float_mae'][0]:.2f}, "
+              f"PM10={quant_report['int8_vs_float_mae'][1]:.2f} µg/m³")
+
+    report_path = "models/quantization_report.json"
+    with open(report_path, 'w') as f:
+        json.dump(quant_report, f, indent=2)
+    print(f"   ✅ Saved: {report_path}")
+
+report.extra['quantization_report'] = report_path
+run_report_path = report.write()
+print("\n   Stage timing:")
+print(report.summary())
 
 print("\n" + "="*60)
 print("✅ Conversion Complete!")
 print("="*60)
 print("\nFiles created:")
 print(f"  - {tflite_path}")
-if os.path.exists("models/pm_predictor_quantized.tflite"):
-    print(f"  - models/pm_predictor_quantized.tflite")
+if quantized:
+    print(f"  - {tflite_quant_path}")
+print(f"  - {report_path}")
+print(f"  - {run_report_path}")
 print("\nNext steps:")
 print("  1. Copy .tflite file to ESP32 project")
 print("  2. Update ESP32 code to load and use model")
 print("  3. Test offline mode prediction")
-
@@ -0,0 +1,493 @@
+"""
+Time-aware cross-validation paralel untuk PM predictor
+
+train_model.py mengevaluasi dengan satu train_test_split acak. Untuk data
+time-series hourly itu membocorkan jam-jam tetangga antara train dan test
+(cuaca jam ke-t dan t+1 hampir sama), dan satu split memberi metrics yang
+noisy. Script ini mendukung beberapa skema split:
+
+    blocked   k blok waktu berurutan; setiap blok sekali jadi test, train =
+              blok lain dikurangi --gap jam di kedua sisi blok test
+    rolling   rolling-origin: fold i train di semua data sebelum blok i
+              (dikurangi --gap jam), test di blok i
+    location  leave-one-location-out: test = satu lokasi, train = lainnya
+    random    KFold acak (pembanding, sama bocornya dengan train_test_split)
+
+Data diurutkan per (timestamp, location) dan disimpan sekali sebagai .npy;
+fold disimpan sebagai index array int32 di cache (bukan copy data) dan
+dipakai ulang selama dataset dan parameter split sama. Semua (config,
+fold) di-train paralel di worker process (pola sama dengan sweep.py);
+scaler di-fit per fold dari data train saja.
+
+Hasil: mean, std dan confidence interval 95% (distribusi t) per metric,
+ditulis ke models/cv_report.json dan ke models/model_info.json (key
+'cross_validation', untuk arsitektur pertama di --archs). train_model.py
+mempertahankan key ini saat menulis ulang model_info.json.
+
+Usage:
+    python cross_validation.py
+    python cross_validation.py --schemes blocked,location,random --folds 5 --gap 24
+    python cross_validation.py --reference --archs 16-8-4,32-16,64-32-16 --workers 8
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+from scipy import stats
+
+from data_pipeline import FEATURES, TARGETS
+from dataset_cache import CACHE_DIR, build_cache, load_dir, synthetic_targets, synthetic_warning
+from pm_model import DEFAULT_HIDDEN, build_model, evaluate, fit_model, parse_hidden
+from sweep import make_grid
+
+REPORT_PATH = "models/cv_report.json"
+MODEL_INFO_PATH = "models/model_info.json"
+
+SCHEMES = ('blocked', 'rolling', 'location', 'random')
+DEFAULT_FOLDS = 5
+DEFAULT_GAP_HOURS = 24
+CONFIDENCE = 0.95
+
+# Diisi oleh _init_worker di setiap worker process
+_shared = {}
+
+
+# ==========================================
+# 1. Data + Fold Index Cache
+# ==========================================
+def prepare_data(cache_dir, features=False, out_root=CACHE_DIR):
+    """
+    Simpan X, y, timestamp, location (urut waktu) sebagai .npy sekali
+
+    Returns:
+        path direktori data CV (dipakai ulang kalau sudah ada)
+    """
+    data_dir = os.path.join(out_root, f"cv-{os.path.basename(cache_dir)}-{'features' if features else 'raw'}")
+    if os.path.exists(os.path.join(data_dir, "meta.json")):
+        return data_dir
+
+    columns, meta = load_dir(cache_dir)
+    if 'timestamp' not in columns:
+        raise KeyError(f"Cross-validation needs a 'timestamp' column ({cache_dir})")
+    if features:
+        from features import build_features
+        X, names = build_features(columns)
+    else:
+        X = np.column_stack([columns[c] for c in FEATURES]).astype(np.float32)
+        names = list(FEATURES)
+    y = np.column_stack([columns[c] for c in TARGETS]).astype(np.float32)
+    timestamps = np.asarray(columns['timestamp'], dtype='M8[ns]')
+    n = len(timestamps)
+    locations = (np.asarray(columns['location'], dtype=np.int32) if 'location' in columns
+                 else np.zeros(n, dtype=np.int32))
+
+    valid = np.isfinite(X).all(axis=1) & np.isfinite(y).all(axis=1) & ~np.isnat(timestamps)
+    rows = np.flatnonzero(valid)
+    rows = rows[np.lexsort((locations[rows], timestamps[rows].view(np.int64)))]
+
+    os.makedirs(out_root, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".build-", dir=out_root)
+    np.save(os.path.join(tmp_dir, "X.npy"), np.ascontiguousarray(X[rows], dtype=np.float32))
+    np.save(os.path.join(tmp_dir, "y.npy"), np.ascontiguousarray(y[rows]))
+    np.save(os.path.join(tmp_dir, "timestamp.npy"), timestamps[rows])
+    np.save(os.path.join(tmp_dir, "location.npy"), locations[rows])
+    categories = meta['columns'].get('location', {}).get('categories')
+    with open(os.path.join(tmp_dir, "meta.json"), 'w') as f:
+        json.dump({'source': cache_dir, 'rows': len(rows), 'features': names,
+                   'locations': categories}, f, indent=2)
+    shutil.rmtree(data_dir, ignore_errors=True)
+    os.replace(tmp_dir, data_dir)
+    return data_dir
+
+
+def _time_blocks(timestamps, folds):
+    """Batas blok waktu dengan jumlah baris kira-kira sama (index ke baris urut waktu)"""
+    edges = np.linspace(0, len(timestamps), folds + 1).astype(np.int64)
+    # Geser batas supaya timestamp yang sama tidak terbelah ke dua blok
+    return np.searchsorted(timestamps, timestamps[np.minimum(edges, len(timestamps) - 1)], side='left')
+
+
+def make_folds(data_dir, scheme, folds=DEFAULT_FOLDS, gap_hours=DEFAULT_GAP_HOURS, seed=42):
+    """
+    Index train/test per fold (int32, terhadap baris di data_dir)
+
+    Returns:
+        list of (name, train_idx, test_idx)
+    """
+    timestamps = np.load(os.path.join(data_dir, "timestamp.npy"))
+    locations = np.load(os.path.join(data_dir, "location.npy"))
+    n = len(timestamps)
+    gap = np.timedelta64(gap_hours, 'h')
+    result = []
+
+    if scheme in ('blocked', 'rolling'):
+        edges = _time_blocks(timestamps, folds)
+        edges[-1] = n
+        for b in range(folds):
+            start, end = edges[b], edges[b + 1]
+            if end <= start or (scheme == 'rolling' and b == 0):
+                continue
+            test = np.arange(start, end)
+            before = np.searchsorted(timestamps, timestamps[start] - gap, side='left')
+            train = [np.arange(0, before)]
+            if scheme == 'blocked' and end < n:
+                after = np.searchsorted(timestamps, timestamps[end - 1] + gap, side='right')
+                train.append(np.arange(after, n))
+            train = np.concatenate(train)
+            if len(train):
+                result.append((f"{scheme}{b}", train, test))
+    elif scheme == 'location':
+        with open(os.path.join(data_dir, "meta.json")) as f:
+            names = json.load(f).get('locations') or []
+        codes = np.unique(locations)
+        if len(codes) < 2:
+            raise ValueError("Leave-one-location-out needs at least 2 locations")
+        for code in codes:
+            label = names[code] if 0 <= code < len(names) else str(code)
+            result.append((f"location={label}", np.flatnonzero(locations != code),
+                           np.flatnonzero(locations == code)))
+    elif scheme == 'random':
+        order = np.random.default_rng(seed).permutation(n)
+        for k, test in enumerate(np.array_split(order, folds)):
+            mask = np.ones(n, dtype=bool)
+            mask[test] = False
+            result.append((f"random{k}", np.flatnonzero(mask), np.sort(test)))
+    else:
+        raise ValueError(f"Unknown scheme {scheme!r}, expected one of {SCHEMES}")
+    return [(name, train.astype(np.int32), test.astype(np.int32)) for name, train, test in result]
+
+
+def cached_folds(data_dir, scheme, folds=DEFAULT_FOLDS, gap_hours=DEFAULT_GAP_HOURS, seed=42):
+    """
+    make_folds() dengan cache .npy per fold di bawah data_dir
+
+    Returns:
+        list of (name, train_path, test_path)
+    """
+    params = {'folds': folds, 'gap_hours': gap_hours} if scheme in ('blocked', 'rolling') else (
+        {'folds': folds, 'seed': seed} if scheme == 'random' else {})
+    key = '-'.join([scheme] + [f"{k}{v}" for k, v in params.items()])
+    fold_dir = os.path.join(data_dir, "folds", key)
+    index_path = os.path.join(fold_dir, "folds.json")
+    if not os.path.exists(index_path):
+        tmp_dir = tempfile.mkdtemp(prefix=".build-", dir=data_dir)
+        names = []
+        for i, (name, train, test) in enumerate(make_folds(data_dir, scheme, folds, gap_hours, seed)):
+            np.save(os.path.join(tmp_dir, f"fold{i}_train.npy"), train)
+            np.save(os.path.join(tmp_dir, f"fold{i}_test.npy"), test)
+            names.append(name)
+        with open(os.path.join(tmp_dir, "folds.json"), 'w') as f:
+            json.dump({'scheme': scheme, **params, 'folds': names}, f, indent=2)
+        os.makedirs(os.path.dirname(fold_dir), exist_ok=True)
+        shutil.rmtree(fold_dir, ignore_errors=True)
+        os.replace(tmp_dir, fold_dir)
+    with open(index_path) as f:
+        names = json.load(f)['folds']
+    return [(name, os.path.join(fold_dir, f"fold{i}_train.npy"), os.path.join(fold_dir, f"fold{i}_test.npy"))
+            for i, name in enumerate(names)]
+
+
+# ==========================================
+# 2. Worker Process
+# ==========================================
+def _init_worker(data_dir, threads):
+    """Batasi thread TensorFlow dan buka X/y (mmap, read-only)"""
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    for name in ('X', 'y'):
+        _shared[name] = np.load(os.path.join(data_dir, f"{name}.npy"), mmap_mode='r')
+
+
+def run_fold(job):
+    """
+    Train + evaluasi satu (config, fold) di worker process
+
+    Scaler di-fit hanya di baris train fold. validation_split fit_model
+    mengambil bagian akhir train (baris terbaru, karena urut waktu).
+
+    Returns:
+        dict job + metrics test fold
+    """
+    import tensorflow as tf
+    from sklearn.preprocessing import MinMaxScaler
+
+    config = job['config']
+    train = np.load(job['train'])
+    test = np.load(job['test'])
+    X_train, y_train = _shared['X'][train], _shared['y'][train]
+    scaler_X = MinMaxScaler().fit(X_train)
+    scaler_y = MinMaxScaler().fit(y_train)
+
+    tf.keras.utils.set_random_seed(config['seed'])
+    model = build_model(config['hidden'], config['dropout'], config['learning_rate'],
+                        input_dim=X_train.shape[1])
+    start = time.perf_counter()
+    history = fit_model(model, scaler_X.transform(X_train), scaler_y.transform(y_train),
+                        batch_size=config['batch_size'], epochs=config['epochs'],
+                        patience=config['patience'])
+    train_seconds = time.perf_counter() - start
+
+    y_pred = scaler_y.inverse_transform(
+        model.predict(scaler_X.transform(_shared['X'][test]), batch_size=4096, verbose=0)
+    )
+    return {
+        'config_id': job['config_id'],
+        'scheme': job['scheme'],
+        'fold': job['fold'],
+        'train_rows': int(len(train)),
+        'test_rows': int(len(test)),
+        **evaluate(np.asarray(_shared['y'][test]), y_pred),
+        'epochs_run': len(history.history['loss']),
+        'train_seconds': round(train_seconds, 2),
+    }
+
+
+# ==========================================
+# 3. Aggregation
+# ==========================================
+def summarize(values, confidence=CONFIDENCE):
+    """
+    Mean, std dan confidence interval (distribusi t, n-1 df) dari nilai per fold
+
+    Dengan satu fold CI tidak terdefinisi; ci_low/ci_high (dan nilai
+    non-finite lain) jadi None supaya report tetap JSON valid.
+
+    Returns:
+        dict mean, std, ci_low, ci_high, n
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    mean = float(values.mean())
+    std = float(values.std(ddof=1)) if n > 1 else 0.0
+    if n > 1:
+        half = float(stats.t.ppf((1 + confidence) / 2, n - 1) * std / np.sqrt(n))
+        ci_low, ci_high = mean - half, mean + half
+    else:
+        ci_low = ci_high = None
+    summary = {'mean': mean, 'std': std, 'ci_low': ci_low, 'ci_high': ci_high}
+    summary = {k: v if v is None or np.isfinite(v) else None for k, v in summary.items()}
+    return {**summary, 'n': n}
+
+
+def aggregate(results, confidence=CONFIDENCE):
+    """Ringkasan per metric dari hasil run_fold satu (config, scheme)"""
+    names = [f"{m}_{t}" for m in ('mse', 'mae', 'r2') for t in TARGETS]
+    return {name: summarize([r[name] for r in results], confidence) for name in names}
+
+
+def run_cv(jobs, data_dir, workers, threads_per_worker=1):
+    """
+    Jalankan semua (config, fold) di ProcessPoolExecutor
+
+    Returns:
+        list hasil run_fold
+    """
+    results = []
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(data_dir, threads_per_worker),
+    ) as executor:
+        futures = {executor.submit(run_fold, job): job for job in jobs}
+        for i, future in enumerate(as_completed(futures), 1):
+            job = futures[future]
+            label = f"{'-'.join(map(str, job['config']['hidden']))} {job['fold']}"
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"   [{i}/{len(jobs)}] ❌ {label}: {e}")
+                continue
+            results.append(result)
+            print(f"   [{i}/{len(jobs)}] {label:<28} train={result['train_rows']:<8,} "
+                  f"test={result['test_rows']:<7,} R²={result['r2_pm25']:.3f}/{result['r2_pm10']:.3f} "
+                  f"({result['train_seconds']:.1f}s)")
+    return results
+
+
+def update_model_info(cv_info, path=MODEL_INFO_PATH):
+    """Tambah/replace key 'cross_validation' di model_info.json"""
+    try:
+        with open(path) as f:
+            model_info = json.load(f)
+    except (OSError, ValueError):
+        model_info = {}
+    model_info['cross_validation'] = cv_info
+    tmp = path + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(model_info, f, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+def _fmt(value, digits):
+    """Format angka summarize(); None (tidak terdefinisi) jadi 'n/a'"""
+    return 'n/a' if value is None else f"{value:.{digits}f}"
+
+
+def _csv(values, cast):
+    return [cast(v) for v in values.split(',') if v]
+
+
+# ==========================================
+# Main Function
+# ==========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel time-aware cross-validation")
+    parser.add_argument('--dataset', default="processed/sample_india_singapore_dataset.csv")
+    parser.add_argument('--reference', action='store_true',
+                        help="Pakai Beijing PRSA reference dataset")
+    parser.add_argument('--features', action='store_true',
+                        help="Lag/rolling/time features (features.py), seperti train_model.py --features")
+    parser.add_argument('--schemes', default="blocked,location",
+                        help=f"Skema split, dipisah koma: {', '.join(SCHEMES)}")
+    parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS)
+    parser.add_argument('--gap', type=int, default=DEFAULT_GAP_HOURS,
+                        help="Jarak (jam) antara train dan blok test (blocked/rolling)")
+    parser.add_argument('--archs', default='-'.join(map(str, DEFAULT_HIDDEN)),
+                        help="Hidden layers, dipisah koma; yang pertama masuk model_info.json")
+    parser.add_argument('--batch-sizes', default="32")
+    parser.add_argument('--lrs', default="0.001")
+    parser.add_argument('--dropouts', default="0.2")
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--patience', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--threads-per-worker', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Default: cpu_count / threads-per-worker")
+    parser.add_argument('--output', default=REPORT_PATH)
+    parser.add_argument('--no-model-info', action='store_true',
+                        help="Jangan update models/model_info.json")
+    args = parser.parse_args()
+
+    workers = args.workers or max(1, (os.cpu_count() or 1) // args.threads_per_worker)
+    schemes = _csv(args.schemes, str)
+    for scheme in schemes:
+        if scheme not in SCHEMES:
+            parser.error(f"unknown scheme {scheme!r}, expected one of {', '.join(SCHEMES)}")
+
+    print("="*60)
+    print("PM Predictor Cross-Validation")
+    print("="*60)
+
+    print("\n[1/3] Preparing data + fold indices...")
+    if args.reference:
+        from prepare_beijing import SOURCE_PATH, build_training_cache
+        dataset, cache_dir = SOURCE_PATH, build_training_cache()
+    else:
+        dataset, cache_dir = args.dataset, build_cache(args.dataset)
+    start = time.perf_counter()
+    data_dir = prepare_data(cache_dir, args.features)
+    folds = {}
+    for scheme in schemes:
+        try:
+            folds[scheme] = cached_folds(data_dir, scheme, args.folds, args.gap, args.seed)
+        except ValueError as e:
+            print(f"   ⚠️  {scheme}: {e}, skipped")
+    with open(os.path.join(data_dir, "meta.json")) as f:
+        meta = json.load(f)
+    print(f"   ✅ {meta['rows']:,} rows, {len(meta['features'])} features → {data_dir}")
+    for scheme, items in folds.items():
+        print(f"   {scheme}: {len(items)} folds")
+    print(f"   ({time.perf_counter() - start:.2f}s)")
+
+    grid = make_grid(
+        [parse_hidden(a) for a in args.archs.split(',') if a],
+        _csv(args.batch_sizes, int), _csv(args.lrs, float), _csv(args.dropouts, float),
+        epochs=args.epochs, patience=args.patience, seed=args.seed,
+    )
+    jobs = [
+        {'config_id': c, 'config': config, 'scheme': scheme, 'fold': name,
+         'train': train_path, 'test': test_path}
+        for c, config in enumerate(grid)
+        for scheme, items in folds.items()
+        for name, train_path, test_path in items
+    ]
+    print(f"\n[2/3] Training {len(jobs)} (config × fold) jobs on {workers} workers "
+          f"× {args.threads_per_worker} thread(s)...")
+    start = time.perf_counter()
+    results = run_cv(jobs, data_dir, workers, args.threads_per_worker)
+    elapsed = time.perf_counter() - start
+    print(f"   ✅ Done in {elapsed:.1f}s")
+    synthetic = synthetic_targets(cache_dir)
+
+    print(f"\n[3/3] Aggregating ({CONFIDENCE:.0%} CI)...")
+    summaries = []
+    for c, config in enumerate(grid):
+        entry = {**config, 'hidden': list(config['hidden']), 'schemes': {}}
+        for scheme in folds:
+            rows = [r for r in results if r['config_id'] == c and r['scheme'] == scheme]
+            if not rows:
+                continue
+            entry['schemes'][scheme] = {
+                'folds': len(rows),
+                'metrics': aggregate(rows),
+                'per_fold': sorted(({k: v for k, v in r.items() if k not in ('config_id', 'scheme')}
+                                    for r in rows), key=lambda r: r['fold']),
+            }
+        summaries.append(entry)
+
+    primary = next((s for s in schemes if s in folds), None)
+
+    def score(entry):
+        block = entry['schemes'].get(primary)
+        means = [block['metrics'][f'r2_{t}']['mean'] for t in TARGETS] if block else [None]
+        return -np.inf if None in means else np.mean(means)
+
+    ranked = sorted(summaries, key=score, reverse=True)
+    for entry in ranked:
+        label = '-'.join(map(str, entry['hidden']))
+        for scheme, block in entry['schemes'].items():
+            r2 = block['metrics']['r2_pm25']
+            mae = block['metrics']['mae_pm25']
+            print(f"   {label:>10} bs={entry['batch_size']:<4} lr={entry['learning_rate']:<7g} {scheme:<9} "
+                  f"R² PM2.5 {_fmt(r2['mean'], 3)} [{_fmt(r2['ci_low'], 3)}, {_fmt(r2['ci_high'], 3)}]  "
+                  f"MAE {_fmt(mae['mean'], 2)} ± {_fmt(mae['std'], 2)} ({block['folds']} folds)")
+    if synthetic:
+        print(f"   {synthetic_warning(synthetic)}")
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'dataset': dataset,
+        'features': meta['features'],
+        'gap_hours': args.gap,
+        'confidence': CONFIDENCE,
+        'workers': workers,
+        'elapsed_seconds': round(elapsed, 2),
+        'ranked_by': f"mean R² ({primary})",
+        'synthetic_targets': synthetic,
+        'results': ranked,
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"   ✅ Report: {args.output}")
+
+    if not args.no_model_info and summaries and summaries[0]['schemes']:
+        first = summaries[0]
+        cv_info = {
+            'created': report['created'],
+            'dataset': dataset,
+            'hidden': first['hidden'],
+            'gap_hours': args.gap,
+            'confidence': CONFIDENCE,
+            **{scheme: {'folds': block['folds'], **block['metrics']}
+               for scheme, block in first['schemes'].items()},
+        }
+        if synthetic:
+            cv_info['synthetic_targets'] = synthetic
+        print(f"   ✅ Updated: {update_model_info(cv_info)}")
@@ -0,0 +1,232 @@
+"""
+Streaming data pipeline untuk training PM predictor
+Membaca CSV besar per chunk (column-pruned, float32) supaya memory tetap kecil
+"""
+
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# Schema
+# ==========================================
+FEATURES = ['temperature', 'humidity', 'pressure']
+TARGETS = ['pm25', 'pm10']
+COLUMNS = FEATURES + TARGETS
+
+# Split labels per row (train / validation / test)
+TRAIN, VAL, TEST = 0, 1, 2
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+# ==========================================
+# 1. Chunked CSV Reading
+# ==========================================
+def iter_chunks(path, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Baca CSV per chunk, hanya kolom yang dipakai, dalam float32
+
+    Args:
+        path: path ke CSV dataset
+        chunksize: jumlah baris per chunk
+
+    Yields:
+        (X, y) float32 arrays, baris NaN/inf sudah dibuang
+    """
+    reader = pd.read_csv(
+        path,
+        usecols=COLUMNS,
+        dtype={col: np.float32 for col in COLUMNS},
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        values = chunk[COLUMNS].to_numpy(dtype=np.float32, copy=False)
+        values = values[np.isfinite(values).all(axis=1)]
+        yield values[:, :len(FEATURES)], values[:, len(FEATURES):]
+
+
+def split_labels(n_rows, chunk_index, seed=42, test_size=0.2, val_size=0.2):
+    """
+    Label split deterministik untuk satu chunk
+
+    Sama seperti train_test_split(test_size=0.2) lalu validation_split=0.2,
+    tapi dihitung per chunk sehingga tidak perlu load seluruh dataset.
+    Hasilnya identik di setiap pass selama chunksize dan seed sama.
+    """
+    rng = np.random.default_rng([seed, chunk_index])
+    u = rng.random(n_rows)
+    labels = np.full(n_rows, TRAIN, dtype=np.int8)
+    labels[u < test_size] = TEST
+    labels[(u >= test_size) & (u < test_size + (1 - test_size) * val_size)] = VAL
+    return labels
+
+
+def iter_split(path, split, chunksize=DEFAULT_CHUNKSIZE, seed=42):
+    """Yield (X, y) hanya untuk baris yang masuk split tertentu"""
+    for i, (X, y) in enumerate(iter_chunks(path, chunksize)):
+        mask = split_labels(len(X), i, seed) == split
+        if mask.any():
+            yield X[mask], y[mask]
+
+
+def load_xy(cache_dir):
+    """
+    Load X, y dari columnar cache (lihat dataset_cache.py)
+
+    Returns:
+        (X, y) float32 arrays, baris NaN/inf sudah dibuang
+    """
+    from dataset_cache import load_dir
+
+    columns, _ = load_dir(cache_dir, COLUMNS)
+    values = np.column_stack([columns[c] for c in COLUMNS]).astype(np.float32, copy=False)
+    values = values[np.isfinite(values).all(axis=1)]
+    return values[:, :len(FEATURES)], values[:, len(FEATURES):]
+
+
+def stratified_sample(X, n, groups=None, bins=4, seed=42):
+    """
+    Ambil n baris secara stratified dari X
+
+    Strata = group (misal location) × quantile bin dari dua feature pertama
+    (temperature, humidity). Setiap stratum mendapat jatah proporsional,
+    minimal satu baris, sehingga distribusi sample mengikuti data asli
+    termasuk bagian ekornya.
+
+    Returns:
+        index array (sorted) ke baris X
+    """
+    rng = np.random.default_rng(seed)
+    if n >= len(X):
+        return np.arange(len(X))
+
+    strata = np.zeros(len(X), dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64)
+    for j in range(min(2, X.shape[1])):
+        edges = np.quantile(X[:, j], np.linspace(0, 1, bins + 1)[1:-1])
+        strata = strata * bins + np.searchsorted(edges, X[:, j])
+
+    _, inverse, counts = np.unique(strata, return_inverse=True, return_counts=True)
+    quota = np.maximum(1, np.round(counts / len(X) * n).astype(np.int64))
+    order = np.argsort(inverse, kind='stable')
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    picked = [
+        rng.choice(order[start:start + count], size=min(q, count), replace=False)
+        for start, count, q in zip(starts, counts, quota)
+    ]
+    return np.sort(np.concatenate(picked))
+
+
+# ==========================================
+# 2. Incremental Scaler Fitting (first pass)
+# ==========================================
+def fit_scalers(path, chunksize=DEFAULT_CHUNKSIZE, seed=42):
+    """
+    Fit MinMaxScaler untuk X dan y dengan partial_fit per chunk
+
+    Hanya baris train yang dipakai (sama seperti fit_transform pada X_train).
+
+    Returns:
+        (scaler_X, scaler_y, counts) dimana counts = {'train', 'val', 'test'}
+    """
+    from sklearn.preprocessing import MinMaxScaler
+
+    scaler_X = MinMaxScaler()
+    scaler_y = MinMaxScaler()
+    counts = {'train': 0, 'val': 0, 'test': 0}
+
+    for i, (X, y) in enumerate(iter_chunks(path, chunksize)):
+        labels = split_labels(len(X), i, seed)
+        train = labels == TRAIN
+        counts['train'] += int(train.sum())
+        counts['val'] += int((labels == VAL).sum())
+        counts['test'] += int((labels == TEST).sum())
+        if train.any():
+            scaler_X.partial_fit(X[train])
+            scaler_y.partial_fit(y[train])
+
+    if counts['train'] == 0:
+        raise ValueError(f"No usable training rows in {path}")
+    return scaler_X, scaler_y, counts
+
+
+def scale(scaler, values):
+    """MinMaxScaler.transform dalam float32 tanpa copy tambahan"""
+    out = values * scaler.scale_.astype(np.float32)
+    out += scaler.min_.astype(np.float32)
+    return out
+
+
+# ==========================================
+# 3. tf.data Pipeline
+# ==========================================
+def make_dataset(path, split, scaler_X, scaler_y, batch_size=32,
+                 chunksize=DEFAULT_CHUNKSIZE, seed=42, shuffle_buffer=10_000):
+    """
+    Buat tf.data.Dataset yang streaming dari CSV
+
+    Hanya satu chunk (plus shuffle buffer) yang ada di memory pada satu waktu.
+    Dataset bisa di-iterasi ulang setiap epoch (generator dibuat ulang).
+    """
+    import tensorflow as tf
+
+    def generator():
+        for X, y in iter_split(path, split, chunksize, seed):
+            yield scale(scaler_X, X), scale(scaler_y, y)
+
+    ds = tf.data.Dataset.from_generator(
+        generator,
+        output_signature=(
+            tf.TensorSpec(shape=(None, len(FEATURES)), dtype=tf.float32),
+            tf.TensorSpec(shape=(None, len(TARGETS)), dtype=tf.float32),
+        ),
+    )
+    ds = ds.unbatch()
+    if split == TRAIN and shuffle_buffer:
+        ds = ds.shuffle(shuffle_buffer, seed=seed)
+    return ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+# ==========================================
+# 4. Streaming Evaluation
+# ==========================================
+def evaluate_streaming(model, path, scaler_X, scaler_y,
+                       chunksize=DEFAULT_CHUNKSIZE, seed=42, n_samples=5):
+    """
+    Hitung MSE, MAE dan R² per target dari test split tanpa load semua data
+
+    Akumulasi dilakukan dalam float64 (sum, sum of squares, residuals).
+
+    Returns:
+        (metrics, samples) dimana metrics = {'mse', 'mae', 'r2'} per target
+        (array shape (2,)) dan samples = (X, y_true, y_pred) beberapa baris
+        pertama untuk ditampilkan
+    """
+    n = 0
+    sum_y = np.zeros(len(TARGETS))
+    sum_y2 = np.zeros(len(TARGETS))
+    sum_sq_err = np.zeros(len(TARGETS))
+    sum_abs_err = np.zeros(len(TARGETS))
+    samples = None
+
+    for X, y in iter_split(path, TEST, chunksize, seed):
+        y_pred_scaled = model.predict(scale(scaler_X, X), verbose=0)
+        y_pred = scaler_y.inverse_transform(y_pred_scaled)
+        err = y_pred - y
+        n += len(y)
+        sum_y += y.sum(axis=0, dtype=np.float64)
+        sum_y2 += np.square(y, dtype=np.float64).sum(axis=0)
+        sum_sq_err += np.square(err, dtype=np.float64).sum(axis=0)
+        sum_abs_err += np.abs(err, dtype=np.float64).sum(axis=0)
+        if samples is None:
+            samples = (X[:n_samples], y[:n_samples], y_pred[:n_samples])
+
+    if n == 0:
+        raise ValueError(f"No test rows in {path}")
+
+    ss_tot = sum_y2 - sum_y ** 2 / n
+    metrics = {
+        'mse': sum_sq_err / n,
+        'mae': sum_abs_err / n,
+        'r2': 1 - sum_sq_err / ss_tot,
+    }
+    return metrics, samples
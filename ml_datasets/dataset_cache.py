@@ -0,0 +1,365 @@
+"""
+Columnar dataset cache: CSV → per-column .npy (memory-mapped)
+
+Setiap CSV di processed/ atau raw/ dikonversi sekali menjadi satu file .npy
+per kolom di cache/<nama>-<sha256>/. Training cukup np.load(mmap_mode='r'),
+tanpa parsing text, dan page cache dipakai bersama oleh run paralel.
+Cache di-rebuild hanya kalau isi file sumber berubah.
+
+Usage:
+    python dataset_cache.py                      # semua CSV di processed/ dan raw/
+    python dataset_cache.py path/to/data.csv     # file tertentu
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+CACHE_DIR = "cache"
+META_FILE = "meta.json"
+CACHE_VERSION = 1
+DEFAULT_CHUNKSIZE = 200_000
+HASH_BLOCK = 1 << 20
+
+# Kolom yang disimpan sebagai datetime64[ns]
+TIME_COLUMNS = ('timestamp',)
+
+
+# ==========================================
+# 1. Source Hashing
+# ==========================================
+def scan_source(path):
+    """
+    Hitung sha256 dan jumlah baris file sumber dalam satu pass
+
+    Returns:
+        (digest, n_lines)
+    """
+    sha = hashlib.sha256()
+    n_lines = 0
+    last = b"\n"
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(HASH_BLOCK)
+            if not block:
+                break
+            sha.update(block)
+            n_lines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        n_lines += 1
+    return sha.hexdigest(), n_lines
+
+
+def _stem(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, META_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def synthetic_targets(cache_dir):
+    """
+    {target: rumus} untuk target yang bukan hasil ukur (meta `synthetic_targets`)
+
+    Contoh: pm10 Beijing PRSA = pm25 / 0.6. Metrics target ini hanya
+    mengukur rumus tersebut, jadi report menandainya.
+    """
+    meta = _read_meta(cache_dir) or {}
+    return dict(meta.get('synthetic_targets') or {})
+
+
+def synthetic_warning(synthetic):
+    """Satu baris peringatan untuk dicetak di bawah metrics, None kalau tidak ada"""
+    if not synthetic:
+        return None
+    items = ', '.join(f"{target} = {formula}" for target, formula in synthetic.items())
+    return f"⚠️  Synthetic target(s) {items}: their metrics only measure that formula"
+
+
+def _source_stat(path):
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def find_cache(path, cache_root=CACHE_DIR):
+    """
+    Cari cache yang masih valid untuk file sumber
+
+    Cek cepat lewat size + mtime dulu; kalau berubah, hash ulang isi file
+    dan cocokkan dengan digest yang tersimpan (misal file hanya di-touch).
+
+    Returns:
+        (cache_dir or None, digest or None, n_lines or None)
+    """
+    if not os.path.isdir(cache_root):
+        return None, None, None
+
+    prefix = _stem(path) + "-"
+    candidates = [
+        os.path.join(cache_root, name) for name in os.listdir(cache_root)
+        if name.startswith(prefix)
+    ]
+    stat = _source_stat(path)
+    abs_path = os.path.abspath(path)
+
+    for cache_dir in candidates:
+        meta = _read_meta(cache_dir)
+        if (meta and meta.get('version') == CACHE_VERSION
+                and meta['source'].get('path') == abs_path
+                and meta['source'].get('size') == stat['size']
+                and meta['source'].get('mtime_ns') == stat['mtime_ns']):
+            return cache_dir, meta['source']['sha256'], None
+
+    digest, n_lines = scan_source(path)
+    cache_dir = os.path.join(cache_root, f"{_stem(path)}-{digest[:16]}")
+    meta = _read_meta(cache_dir)
+    if meta and meta.get('version') == CACHE_VERSION and meta['source'].get('sha256') == digest:
+        # Isi sama, hanya metadata file yang berubah
+        meta['source'].update(stat, path=abs_path)
+        _write_meta(cache_dir, meta)
+        return cache_dir, digest, n_lines
+    return None, digest, n_lines
+
+
+# ==========================================
+# 2. Writing Columns
+# ==========================================
+def _write_meta(cache_dir, meta):
+    tmp = os.path.join(cache_dir, META_FILE + ".tmp")
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(cache_dir, META_FILE))
+
+
+def write_columns(cache_dir, columns, source=None, categories=None, extra=None):
+    """
+    Tulis dict {nama: array 1-D} sebagai cache columnar
+
+    Dipakai juga oleh stage lain yang menghasilkan dataset turunan
+    (misal preprocessing Beijing) supaya formatnya sama.
+
+    Args:
+        categories: {nama kolom: [label]} untuk kolom kode int32
+    """
+    lengths = {len(v) for v in columns.values()}
+    if len(lengths) != 1:
+        raise ValueError(f"Columns have different lengths: {lengths}")
+
+    parent = os.path.dirname(cache_dir) or "."
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".build-", dir=parent)
+    try:
+        meta_columns = {}
+        for name, values in columns.items():
+            values = np.asarray(values)
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), values)
+            meta_columns[name] = {'dtype': values.dtype.str}
+            if categories and name in categories:
+                meta_columns[name]['categories'] = list(categories[name])
+        meta = {
+            'version': CACHE_VERSION,
+            'rows': lengths.pop(),
+            'columns': meta_columns,
+            'source': source or {},
+        }
+        meta.update(extra or {})
+        _write_meta(tmp_dir, meta)
+        _publish(tmp_dir, cache_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return cache_dir
+
+
+def _publish(tmp_dir, cache_dir):
+    """Ganti cache lama secara atomic (rename), aman untuk reader paralel"""
+    if os.path.isdir(cache_dir):
+        old = cache_dir + ".old"
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(cache_dir, old)
+        os.replace(tmp_dir, cache_dir)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.replace(tmp_dir, cache_dir)
+
+
+def _remove_stale(path, keep, cache_root):
+    prefix = _stem(path) + "-"
+    abs_path = os.path.abspath(path)
+    for name in os.listdir(cache_root):
+        cache_dir = os.path.join(cache_root, name)
+        if not name.startswith(prefix) or cache_dir == keep:
+            continue
+        meta = _read_meta(cache_dir)
+        if meta and meta['source'].get('path') == abs_path:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+# ==========================================
+# 3. Build Cache from CSV
+# ==========================================
+def build_cache(path, cache_root=CACHE_DIR, chunksize=DEFAULT_CHUNKSIZE, force=False):
+    """
+    Konversi CSV menjadi cache columnar kalau belum ada / sumber berubah
+
+    CSV dibaca per chunk dan ditulis langsung ke .npy memmap, jadi memory
+    tetap kecil untuk file besar. Kolom numerik → float32, kolom
+    'timestamp' → datetime64[ns], kolom text → kode int32 + daftar kategori.
+
+    Returns:
+        path ke direktori cache
+    """
+    import pandas as pd
+
+    cache_dir, digest, n_lines = (None, None, None) if force else find_cache(path, cache_root)
+    if cache_dir:
+        return cache_dir
+    if digest is None:
+        digest, n_lines = scan_source(path)
+
+    cache_dir = os.path.join(cache_root, f"{_stem(path)}-{digest[:16]}")
+    os.makedirs(cache_root, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".build-", dir=cache_root)
+
+    capacity = max(n_lines - 1, 0)   # minus header
+    arrays = {}
+    kinds = {}
+    categories = {}
+    rows = 0
+    try:
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            if not arrays:
+                for name in chunk.columns:
+                    if name in TIME_COLUMNS:
+                        kinds[name], dtype = 'time', np.dtype('M8[ns]')
+                    elif pd.api.types.is_numeric_dtype(chunk[name]):
+                        kinds[name], dtype = 'numeric', np.dtype(np.float32)
+                    else:
+                        kinds[name], dtype = 'category', np.dtype(np.int32)
+                        categories[name] = {}
+                    arrays[name] = np.lib.format.open_memmap(
+                        os.path.join(tmp_dir, f"{name}.npy"), mode='w+',
+                        dtype=dtype, shape=(capacity,),
+                    )
+
+            n = len(chunk)
+            for name, out in arrays.items():
+                col = chunk[name]
+                if kinds[name] == 'time':
+                    values = pd.to_datetime(col).to_numpy(dtype='M8[ns]')
+                elif kinds[name] == 'numeric':
+                    values = pd.to_numeric(col, errors='coerce').to_numpy(dtype=np.float32)
+                else:
+                    values = _encode(col, categories[name])
+                out[rows:rows + n] = values
+            rows += n
+
+        for out in arrays.values():
+            out.flush()
+        del arrays
+
+        meta = {
+            'version': CACHE_VERSION,
+            'rows': rows,
+            'columns': {
+                name: ({'dtype': 'int32', 'categories': list(categories[name])}
+                       if kind == 'category' else
+                       {'dtype': 'M8[ns]' if kind == 'time' else 'float32'})
+                for name, kind in kinds.items()
+            },
+            'source': dict(_source_stat(path), path=os.path.abspath(path), sha256=digest),
+        }
+        _write_meta(tmp_dir, meta)
+        _publish(tmp_dir, cache_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    _remove_stale(path, cache_dir, cache_root)
+    return cache_dir
+
+
+def _encode(col, mapping):
+    """Encode kolom text ke kode int32, mapping diperluas antar chunk"""
+    import pandas as pd
+
+    codes, uniques = pd.factorize(col, use_na_sentinel=True)
+    lookup = np.empty(len(uniques), dtype=np.int32)
+    for i, value in enumerate(uniques):
+        lookup[i] = mapping.setdefault(str(value), len(mapping))
+    return np.where(codes >= 0, lookup[codes] if len(lookup) else -1, -1).astype(np.int32)
+
+
+# ==========================================
+# 4. Loading
+# ==========================================
+def load_dir(cache_dir, columns=None):
+    """
+    Buka cache columnar sebagai memmap read-only
+
+    Returns:
+        (arrays, meta) dimana arrays = {nama: np.memmap}
+    """
+    meta = _read_meta(cache_dir)
+    if meta is None:
+        raise FileNotFoundError(f"No dataset cache in {cache_dir}")
+    names = columns or list(meta['columns'])
+    missing = [name for name in names if name not in meta['columns']]
+    if missing:
+        raise KeyError(f"Columns {missing} not in cache {cache_dir}")
+    rows = meta['rows']
+    arrays = {
+        name: np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode='r')[:rows]
+        for name in names
+    }
+    return arrays, meta
+
+
+def load_columns(path, columns=None, cache_root=CACHE_DIR):
+    """
+    Load kolom dari CSV lewat cache (build otomatis kalau belum ada)
+
+    Returns:
+        dict {nama: array}, memory-mapped dan read-only
+    """
+    arrays, _ = load_dir(build_cache(path, cache_root), columns)
+    return arrays
+
+
+def default_sources():
+    """Semua CSV di processed/ dan raw/ (recursive)"""
+    sources = []
+    for root in ("processed", "raw"):
+        for dirpath, _, filenames in os.walk(root):
+            sources += [os.path.join(dirpath, f) for f in sorted(filenames) if f.endswith(".csv")]
+    return sources
+
+
+# ==========================================
+# Main Function
+# ==========================================
+if __name__ == "__main__":
+    print("="*60)
+    print("Building Columnar Dataset Cache")
+    print("="*60)
+
+    sources = sys.argv[1:] or default_sources()
+    if not sources:
+        print("❌ No CSV files found. Run download_datasets.py first!")
+        sys.exit(1)
+
+    for source in sources:
+        cache_dir = build_cache(source)
+        meta = _read_meta(cache_dir)
+        print(f"   ✅ {source} → {cache_dir} ({meta['rows']} rows, {len(meta['columns'])} columns)")
@@ -0,0 +1,468 @@
+"""
+Data-parallel training PM predictor di beberapa worker process (CPU)
+
+train_model.py menjalankan model.fit dengan batch 32 di satu process; untuk
+data multi-tahun / multi-site throughput dibatasi overhead per step.
+Script ini menjalankan N worker process dengan
+tf.distribute.MultiWorkerMirroredStrategy: setiap worker menghitung gradient
+dari shard datanya, gradient dirata-rata (all-reduce) setiap step.
+
+- Batch besar: global batch = --batch-per-worker × N, learning rate
+  di-scale linear terhadap batch 32 dengan warmup lalu cosine decay
+- Input pipeline tf.data: blok baris dibaca paralel dari shared arrays
+  (mmap, lihat sweep.py), di-cache di memory, di-shuffle ulang setiap
+  epoch, dan di-prefetch
+- Beberapa step per panggilan tf.function (--steps-per-call)
+- --scaling 1,2,4 mengukur samples/sec dan efisiensi scaling per N worker
+
+Usage:
+    python distributed_train.py --workers 4
+    python distributed_train.py --reference --workers 8 --batch-per-worker 512
+    python distributed_train.py --reference --scaling 1,2,4,8
+"""
+
+import argparse
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from data_pipeline import FEATURES, TARGETS
+from dataset_cache import build_cache
+from pm_model import esp32_cost, evaluate, parse_hidden
+from sweep import SHARED_ARRAYS, prepare_shared_data
+
+DEFAULT_OUTPUT = "models/pm_predictor_distributed.pmb"
+REPORT_PATH = "models/distributed_train_report.json"
+SCALING_PATH = "models/distributed_scaling.json"
+BASE_BATCH = 32          # batch size train_model.py (referensi learning rate)
+BASE_LR = 0.001          # default Adam
+MAX_BLOCK_ROWS = 65536
+
+
+# ==========================================
+# 1. Large-Batch Learning Rate Schedule
+# ==========================================
+def make_schedule(base_lr, global_batch, total_steps, warmup_steps):
+    """
+    Linear scaling rule + warmup + cosine decay
+
+    lr naik linear dari base_lr ke base_lr × global_batch / 32 selama
+    warmup_steps, lalu turun cosine sampai 0 di total_steps.
+    """
+    import tensorflow as tf
+    from tensorflow import keras
+
+    class WarmupCosine(keras.optimizers.schedules.LearningRateSchedule):
+        def __init__(self, base_lr, peak_lr, warmup_steps, total_steps):
+            self.base_lr = base_lr
+            self.peak_lr = peak_lr
+            self.warmup_steps = warmup_steps
+            self.total_steps = total_steps
+
+        def __call__(self, step):
+            step = tf.cast(step, tf.float32)
+            warmup = tf.cast(max(self.warmup_steps, 1), tf.float32)
+            decay = tf.cast(max(self.total_steps - self.warmup_steps, 1), tf.float32)
+            warm_lr = self.base_lr + (self.peak_lr - self.base_lr) * step / warmup
+            progress = tf.clip_by_value((step - warmup) / decay, 0.0, 1.0)
+            cosine_lr = 0.5 * self.peak_lr * (1.0 + tf.cos(math.pi * progress))
+            return tf.where(step < warmup, warm_lr, cosine_lr)
+
+        def get_config(self):
+            return {'base_lr': self.base_lr, 'peak_lr': self.peak_lr,
+                    'warmup_steps': self.warmup_steps, 'total_steps': self.total_steps}
+
+    peak_lr = base_lr * global_batch / BASE_BATCH
+    return WarmupCosine(base_lr, peak_lr, warmup_steps, total_steps)
+
+
+# ==========================================
+# 2. tf.data Input Pipeline
+# ==========================================
+def make_dataset(X, y, batch_size, input_context=None, shuffle_buffer=100_000,
+                 cache=True, seed=42):
+    """
+    Dataset training tak berujung (repeat) dari array / memmap
+
+    Baris dibaca per blok lewat map paralel, blok di-shard antar worker
+    (input_context), lalu di-unbatch, di-shuffle dan di-batch ulang.
+
+    Args:
+        batch_size: batch per worker
+        cache: simpan blok di memory setelah epoch pertama (matikan kalau
+            shard data lebih besar dari RAM)
+    """
+    import tensorflow as tf
+
+    n = len(X)
+    pipelines = input_context.num_input_pipelines if input_context else 1
+    # Minimal ~4 blok per worker supaya shard rata
+    block_rows = int(min(MAX_BLOCK_ROWS, max(batch_size, math.ceil(n / (pipelines * 4)))))
+    starts = np.arange(0, n, block_rows, dtype=np.int64)
+
+    def read_block(start):
+        stop = min(int(start) + block_rows, n)
+        return (np.asarray(X[start:stop], dtype=np.float32),
+                np.asarray(y[start:stop], dtype=np.float32))
+
+    def load(start):
+        X_block, y_block = tf.numpy_function(read_block, [start], (tf.float32, tf.float32))
+        X_block.set_shape((None, X.shape[1]))
+        y_block.set_shape((None, y.shape[1]))
+        return X_block, y_block
+
+    ds = tf.data.Dataset.from_tensor_slices(starts)
+    if input_context:
+        ds = ds.shard(input_context.num_input_pipelines, input_context.input_pipeline_id)
+    ds = ds.map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=False)
+    if cache:
+        ds = ds.cache()
+    ds = ds.shuffle(len(starts), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.unbatch().shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    ds = ds.repeat().batch(batch_size, drop_remainder=True)
+    options = tf.data.Options()
+    options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.OFF
+    return ds.with_options(options).prefetch(tf.data.AUTOTUNE)
+
+
+# ==========================================
+# 3. Worker (satu process per worker)
+# ==========================================
+def run_worker(job):
+    """
+    Training loop data-parallel; dijalankan oleh setiap worker process
+
+    Semua worker menghitung validation loss di data yang sama dengan
+    weights yang sama, jadi keputusan early stopping identik dan tidak
+    ada worker yang menunggu all-reduce sendirian.
+
+    Returns:
+        dict hasil (hanya ditulis oleh chief)
+    """
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    os.environ['OMP_NUM_THREADS'] = str(job['threads'])
+    import tensorflow as tf
+    from tensorflow import keras
+    from pm_model import build_model
+
+    tf.config.threading.set_intra_op_parallelism_threads(job['threads'])
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    shared = {name: np.load(os.path.join(job['shared_dir'], f"{name}.npy"), mmap_mode='r')
+              for name in SHARED_ARRAYS}
+    n_train_all = len(shared['X_train'])
+    n_val = min(int(n_train_all * job['val_fraction']), job['max_val_rows'])
+    n_train = n_train_all - n_val
+    X_train, y_train = shared['X_train'][:n_train], shared['y_train'][:n_train]
+    X_val = np.asarray(shared['X_train'][n_train:])
+    y_val = np.asarray(shared['y_train'][n_train:])
+
+    strategy = tf.distribute.MultiWorkerMirroredStrategy()
+    workers = strategy.num_replicas_in_sync
+    per_worker = job['batch_per_worker']
+    global_batch = per_worker * workers
+    steps_per_epoch = job['steps_per_epoch'] or max(1, n_train // global_batch)
+    steps_per_call = max(1, min(job['steps_per_call'], steps_per_epoch))
+    total_steps = steps_per_epoch * job['epochs']
+    warmup_steps = int(steps_per_epoch * job['warmup_epochs'])
+
+    tf.keras.utils.set_random_seed(job['seed'])
+    with strategy.scope():
+        model = build_model(job['hidden'], job['dropout'])
+        base_lr = job['learning_rate'] or BASE_LR
+        optimizer = keras.optimizers.Adam(make_schedule(base_lr, global_batch, total_steps, warmup_steps))
+
+    dataset = strategy.distribute_datasets_from_function(
+        lambda ctx: make_dataset(X_train, y_train, per_worker, ctx,
+                                 cache=job['cache'], seed=job['seed'])
+    )
+    iterator = iter(dataset)
+
+    def step_fn(X, y):
+        with tf.GradientTape() as tape:
+            pred = model(X, training=True)
+            # Mean atas global batch: gradient per worker dijumlah oleh all-reduce
+            loss = tf.reduce_sum(tf.square(pred - y)) / (global_batch * len(TARGETS))
+        grads = tape.gradient(loss, model.trainable_variables)
+        optimizer.apply_gradients(zip(grads, model.trainable_variables))
+        return loss
+
+    @tf.function
+    def train_steps(iterator, n):
+        total = tf.constant(0.0)
+        for _ in tf.range(n):
+            X, y = next(iterator)
+            losses = strategy.run(step_fn, args=(X, y))
+            total += strategy.reduce(tf.distribute.ReduceOp.SUM, losses, axis=None)
+        return total / tf.cast(n, tf.float32)
+
+    @tf.function
+    def val_loss():
+        return tf.reduce_mean(tf.square(model(X_val, training=False) - y_val))
+
+    is_chief = job['index'] == 0
+    history, epoch_times = [], []
+    best_loss, best_weights, wait = float('inf'), None, 0
+    step_chunks = [steps_per_call] * (steps_per_epoch // steps_per_call)
+    if steps_per_epoch % steps_per_call:
+        step_chunks.append(steps_per_epoch % steps_per_call)
+
+    for epoch in range(job['epochs']):
+        start = time.perf_counter()
+        losses = [float(train_steps(iterator, tf.constant(n))) for n in step_chunks]
+        epoch_times.append(time.perf_counter() - start)
+        train_loss = float(np.average(losses, weights=step_chunks))
+        current = float(val_loss()) if n_val else train_loss
+        history.append({'loss': train_loss, 'val_loss': current})
+        if is_chief and job['verbose']:
+            print(f"   epoch {epoch + 1:>3}: loss={train_loss:.5f} val_loss={current:.5f} "
+                  f"({steps_per_epoch * global_batch / epoch_times[-1]:,.0f} samples/s)", flush=True)
+        if current < best_loss:
+            best_loss, best_weights, wait = current, model.get_weights(), 0
+        else:
+            wait += 1
+            if job['patience'] and wait >= job['patience']:
+                break
+
+    # Epoch pertama termasuk tracing + cache fill; throughput dari epoch berikutnya
+    steady = epoch_times[1:] or epoch_times
+    samples_per_sec = steps_per_epoch * global_batch * len(steady) / sum(steady)
+    result = {
+        'workers': workers,
+        'threads_per_worker': job['threads'],
+        'batch_per_worker': per_worker,
+        'global_batch': global_batch,
+        'peak_learning_rate': base_lr * global_batch / BASE_BATCH,
+        'warmup_steps': warmup_steps,
+        'steps_per_epoch': steps_per_epoch,
+        'epochs_run': len(history),
+        'samples_per_sec': samples_per_sec,
+        'train_seconds': round(sum(epoch_times), 2),
+        'best_val_loss': best_loss,
+    }
+    if not is_chief:
+        return result
+
+    if job['output']:
+        from model_bundle import ArrayScaler, save_bundle
+
+        # Copy di luar strategy scope: worker lain sudah selesai, jadi
+        # predict / save tidak boleh memicu collective op
+        final = build_model(job['hidden'], job['dropout'])
+        final.set_weights(best_weights)
+        y_pred_scaled = final.predict(np.asarray(shared['X_test']), batch_size=8192, verbose=0)
+        y_pred = (y_pred_scaled - shared['y_min']) / shared['y_scale']
+        metrics = evaluate(np.asarray(shared['y_test']), y_pred)
+        result.update(metrics)
+        model_info = {
+            'input_features': list(FEATURES),
+            'output_targets': list(TARGETS),
+            'hidden': list(job['hidden']),
+            'training': 'distributed',
+            **{k: v for k, v in result.items() if k != 'best_val_loss'},
+        }
+        save_bundle(final,
+                    ArrayScaler(shared['x_data_min'], shared['x_data_max']),
+                    ArrayScaler(shared['y_data_min'], shared['y_data_max']),
+                    model_info, job['output'])
+    result['history'] = history
+    return result
+
+
+# ==========================================
+# 4. Launcher
+# ==========================================
+def _free_ports(n):
+    sockets = []
+    for _ in range(n):
+        s = socket.socket()
+        s.bind(("127.0.0.1", 0))
+        sockets.append(s)
+    ports = [s.getsockname()[1] for s in sockets]
+    for s in sockets:
+        s.close()
+    return ports
+
+
+def launch(job, workers, timeout=None):
+    """
+    Jalankan `workers` process lokal dengan TF_CONFIG masing-masing
+
+    Returns:
+        hasil dari chief (worker 0)
+    """
+    cluster = {'worker': [f"127.0.0.1:{port}" for port in _free_ports(workers)]}
+    with tempfile.TemporaryDirectory(prefix="pm-dist-") as tmp:
+        procs = []
+        for index in range(workers):
+            job_path = os.path.join(tmp, f"job_{index}.json")
+            with open(job_path, 'w') as f:
+                json.dump({**job, 'index': index,
+                           'result_path': os.path.join(tmp, f"result_{index}.json")}, f)
+            env = dict(os.environ)
+            env['TF_CONFIG'] = json.dumps({'cluster': cluster, 'task': {'type': 'worker', 'index': index}})
+            procs.append(subprocess.Popen([sys.executable, os.path.abspath(__file__), '--worker-job', job_path],
+                                          env=env, stdout=None if index == 0 else subprocess.DEVNULL))
+        try:
+            codes = [p.wait(timeout) for p in procs]
+        finally:
+            for p in procs:
+                if p.poll() is None:
+                    p.kill()
+        if any(codes):
+            raise RuntimeError(f"Worker exit codes: {codes}")
+        with open(os.path.join(tmp, "result_0.json")) as f:
+            return json.load(f)
+
+
+def scaling_report(job, counts):
+    """
+    Samples/sec untuk setiap jumlah worker (batch per worker tetap)
+
+    efficiency = samples/sec(N) / (N × samples/sec(1))
+    """
+    rows, base = [], None
+    for n in counts:
+        result = launch({**job, 'output': None, 'patience': 0}, n)
+        base = base or result['samples_per_sec'] / n
+        row = {
+            'workers': n,
+            'global_batch': result['global_batch'],
+            'samples_per_sec': round(result['samples_per_sec'], 1),
+            'speedup': round(result['samples_per_sec'] / base, 2),
+            'efficiency': round(result['samples_per_sec'] / (n * base), 3),
+        }
+        rows.append(row)
+        print(f"   {n:>3} worker(s): {row['samples_per_sec']:>12,.0f} samples/s  "
+              f"speedup {row['speedup']:>5.2f}x  efficiency {row['efficiency']:.0%}", flush=True)
+    return rows
+
+
+# ==========================================
+# Main Function
+# ==========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Data-parallel multi-process training")
+    parser.add_argument('--dataset', default="processed/sample_india_singapore_dataset.csv")
+    parser.add_argument('--reference', action='store_true',
+                        help="Pakai Beijing PRSA reference dataset")
+    parser.add_argument('--workers', type=int, default=None, help="Default: cpu_count / threads-per-worker")
+    parser.add_argument('--threads-per-worker', type=int, default=1)
+    parser.add_argument('--hidden', default="16-8-4")
+    parser.add_argument('--dropout', type=float, default=0.2)
+    parser.add_argument('--batch-per-worker', type=int, default=256)
+    parser.add_argument('--learning-rate', type=float, default=None,
+                        help=f"Base learning rate untuk batch {BASE_BATCH} (default {BASE_LR})")
+    parser.add_argument('--warmup-epochs', type=float, default=2.0)
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--patience', type=int, default=10)
+    parser.add_argument('--steps-per-call', type=int, default=20,
+                        help="Training steps per panggilan tf.function")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Jangan cache data di memory (dataset lebih besar dari RAM)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--scaling', default=None,
+                        help="Ukur scaling untuk jumlah worker, misal 1,2,4,8")
+    parser.add_argument('--scaling-epochs', type=int, default=3)
+    parser.add_argument('--worker-job', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker_job:
+        with open(args.worker_job) as f:
+            job = json.load(f)
+        result = run_worker(job)
+        if job['index'] == 0:
+            with open(job['result_path'], 'w') as f:
+                json.dump(result, f)
+        sys.exit(0)
+
+    workers = args.workers or max(1, (os.cpu_count() or 1) // args.threads_per_worker)
+
+    print("="*60)
+    print("Distributed PM Predictor Training")
+    print("="*60)
+
+    print("\n[1/3] Preparing shared data...")
+    if args.reference:
+        from prepare_beijing import SOURCE_PATH, build_training_cache
+        dataset, cache_dir = SOURCE_PATH, build_training_cache()
+    else:
+        dataset, cache_dir = args.dataset, build_cache(args.dataset)
+    shared_dir = prepare_shared_data(cache_dir, seed=args.seed)
+    n_train = len(np.load(os.path.join(shared_dir, "X_train.npy"), mmap_mode='r'))
+    print(f"   ✅ Shared arrays: {shared_dir} ({n_train} train rows)")
+
+    hidden = parse_hidden(args.hidden)
+    job = {
+        'shared_dir': os.path.abspath(shared_dir),
+        'hidden': list(hidden),
+        'dropout': args.dropout,
+        'batch_per_worker': args.batch_per_worker,
+        'learning_rate': args.learning_rate,
+        'warmup_epochs': args.warmup_epochs,
+        'epochs': args.epochs,
+        'patience': args.patience,
+        'steps_per_call': args.steps_per_call,
+        'steps_per_epoch': None,
+        'val_fraction': 0.1,
+        'max_val_rows': 200_000,
+        'cache': not args.no_cache,
+        'threads': args.threads_per_worker,
+        'seed': args.seed,
+        'verbose': True,
+        'output': os.path.abspath(args.output),
+    }
+
+    if args.scaling:
+        counts = [int(n) for n in args.scaling.split(',') if n]
+        # Jumlah step tetap per epoch supaya semua N mengerjakan step yang sama
+        steps = max(1, n_train // (args.batch_per_worker * max(counts)))
+        print(f"\n[2/3] Scaling benchmark: {counts} worker(s), "
+              f"{args.batch_per_worker} rows/worker/step, {steps} steps × {args.scaling_epochs} epochs "
+              f"({os.cpu_count()} CPU cores)...")
+        rows = scaling_report({**job, 'epochs': args.scaling_epochs, 'steps_per_epoch': steps,
+                               'verbose': False}, counts)
+        print("\n[3/3] Saving scaling report...")
+        os.makedirs(os.path.dirname(SCALING_PATH) or ".", exist_ok=True)
+        with open(SCALING_PATH, 'w') as f:
+            json.dump({
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'dataset': dataset,
+                'cpu_count': os.cpu_count(),
+                'threads_per_worker': args.threads_per_worker,
+                'batch_per_worker': args.batch_per_worker,
+                'hidden': list(hidden),
+                'results': rows,
+            }, f, indent=2)
+        print(f"   ✅ Saved: {SCALING_PATH}")
+        sys.exit(0)
+
+    print(f"\n[2/3] Training on {workers} worker(s) × {args.threads_per_worker} thread(s), "
+          f"global batch {args.batch_per_worker * workers}...")
+    result = launch(job, workers)
+    print(f"   ✅ {result['epochs_run']} epochs in {result['train_seconds']:.1f}s "
+          f"({result['samples_per_sec']:,.0f} samples/s)")
+
+    print("\n[3/3] Saving...")
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'dataset': dataset,
+        'bundle': args.output,
+        **esp32_cost(hidden),
+        **result,
+    }
+    os.makedirs(os.path.dirname(REPORT_PATH) or ".", exist_ok=True)
+    with open(REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"   ✅ Saved: {args.output}")
+    print(f"   ✅ Saved: {REPORT_PATH}")
+    print(f"   R² PM2.5: {result['r2_pm25']:.4f}, PM10: {result['r2_pm10']:.4f}")
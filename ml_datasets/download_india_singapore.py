@@ -2,10 +2,7 @@
 Script untuk download dataset air quality dari India dan Singapura
 """
 
-import requests
-import pandas as pd
-import json
-from datetime import datetime, timedelta
+import asyncio
 import os
 
 # Create directories
@@ -16,48 +13,11 @@ os.makedirs('raw/waqi', exist_ok=True)
 # ==========================================
 # 1. WAQI API - India & Singapore
 # ==========================================
-def download_waqi_data(token, city='delhi', days=30):
-    """
-    Download data dari WAQI API
-    
-    Args:
-        token: WAQI API token (dapatkan dari https://aqicn.org/api/)
-        city: 'delhi', 'mumbai', 'singapore', dll
-        days: jumlah hari data historis
-    """
-    print(f"Downloading WAQI data for {city}...")
-    
-    # Real-time data
-    url = f"https://api.waqi.info/feed/{city}/?token={token}"
-    response = requests.get(url)
-    
-    if response.status_code == 200:
-        data = response.json()
-        
-        if data['status'] == 'ok':
-            # Save real-time data
-            with open(f'raw/waqi/{city}_realtime.json', 'w') as f:
-                json.dump(data, f, indent=2)
-            
-            # Extract and save to CSV
-            aq_data = data['data']
-            df = pd.DataFrame([{
-                'timestamp': datetime.now().isoformat(),
-                'city': city,
-                'aqi': aq_data.get('aqi', 'N/A'),
-                'pm25': aq_data.get('iaqi', {}).get('pm25', {}).get('v', 'N/A'),
-                'pm10': aq_data.get('iaqi', {}).get('pm10', {}).get('v', 'N/A'),
-                'temperature': aq_data.get('iaqi', {}).get('t', {}).get('v', 'N/A'),
-                'humidity': aq_data.get('iaqi', {}).get('h', {}).get('v', 'N/A'),
-                'pressure': aq_data.get('iaqi', {}).get('p', {}).get('v', 'N/A'),
-            }])
-            
-            df.to_csv(f'raw/waqi/{city}_realtime.csv', index=False)
-            print(f"✅ Saved: raw/waqi/{city}_realtime.csv")
-        else:
-            print(f"❌ Error: {data.get('data', 'Unknown error')}")
-    else:
-        print(f"❌ HTTP Error: {response.status_code}")
+# Concurrent fetcher (pooled aiohttp session, rate limit, retry):
+# lihat waqi_fetcher.py. download_waqi_data(token, city, days) untuk satu
+# kota di-re-export di sini supaya import lama tetap jalan.
+from waqi_fetcher import DEFAULT_STORE, download_waqi_data, fetch_stations  # noqa: F401
+from history_store import DEFAULT_ROOT as HISTORY_ROOT, HistoryStore
 
 # ==========================================
 # 2. India - CPCB Data (Manual)
@@ -138,7 +98,7 @@ if __name__ == "__main__":
     print("="*60)
     
     # WAQI API Token (dapatkan dari https://aqicn.org/api/)
-    WAQI_TOKEN = "YOUR_WAQI_TOKEN_HERE"  # Ganti dengan token Anda
+    WAQI_TOKEN = os.environ.get("WAQI_TOKEN", "YOUR_WAQI_TOKEN_HERE")  # Ganti dengan token Anda
     
     if WAQI_TOKEN == "YOUR_WAQI_TOKEN_HERE":
         print("\n⚠️  Warning: WAQI token belum di-set!")
@@ -148,11 +108,10 @@ if __name__ == "__main__":
         # Download WAQI data
         print("\n1. Downloading WAQI Data...")
         cities = ['delhi', 'mumbai', 'bangalore', 'singapore']
-        for city in cities:
-            try:
-                download_waqi_data(WAQI_TOKEN, city)
-            except Exception as e:
-                print(f"   Error downloading {city}: {e}")
+        stats = asyncio.run(fetch_stations(WAQI_TOKEN, cities, days=30, history=HistoryStore()))
+        print(f"   ✅ {stats['ok']}/{stats['stations']} cities, {stats['records']} records → {DEFAULT_STORE}, {HISTORY_ROOT}/")
+        for error in stats['failed']:
+            print(f"   ❌ {error}")
     
     # Print instructions untuk manual download
     print("\n2. Manual Download Instructions:")
@@ -0,0 +1,211 @@
+"""
+Download manifest: incremental + resumable download untuk dataset sumber
+
+Setiap file yang di-download atau di-generate dicatat di raw/manifest.json
+(url, ETag, Last-Modified, size, sha256). Run berikutnya:
+    - file yang tidak berubah di server → conditional GET (304), 0 byte
+    - download yang terputus → lanjut dari file .part dengan HTTP Range
+    - file hasil generate yang isinya sama → tidak ditulis ulang (mtime
+      tetap, jadi columnar cache juga tidak perlu di-rebuild)
+
+Usage:
+    manifest = Manifest()
+    status = fetch(url, "raw/reference/beijing_pm25.csv", manifest)
+    write_if_changed("raw/waqi/sample_structure.json", data, manifest)
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import requests
+
+from dataset_cache import HASH_BLOCK, scan_source
+
+MANIFEST_PATH = "raw/manifest.json"
+DOWNLOAD_CHUNK = 1 << 20
+DEFAULT_TIMEOUT = 30
+
+
+def _stat(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _sha256_file(path, sha=None):
+    sha = sha or hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            sha.update(block)
+    return sha
+
+
+class Manifest:
+    """raw/manifest.json: entry per path lokal, disimpan atomic"""
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, dest):
+        return self.entries.get(dest)
+
+    def is_current(self, dest):
+        """File lokal masih sama dengan yang tercatat (size + mtime, fallback sha256)"""
+        entry = self.get(dest)
+        if not entry or not os.path.exists(dest):
+            return False
+        size, mtime_ns = _stat(dest)
+        if size != entry['size']:
+            return False
+        if mtime_ns == entry.get('mtime_ns'):
+            return True
+        if scan_source(dest)[0] == entry['sha256']:
+            entry['mtime_ns'] = mtime_ns
+            return True
+        return False
+
+    def record(self, dest, sha256, **fields):
+        size, mtime_ns = _stat(dest)
+        self.entries[dest] = {
+            **fields,
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'sha256': sha256,
+            'updated': datetime.now().isoformat(timespec='seconds'),
+        }
+        self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+# ==========================================
+# 1. Conditional + Resumable Download
+# ==========================================
+def fetch(url, dest, manifest, session=None, timeout=DEFAULT_TIMEOUT, chunk_size=DOWNLOAD_CHUNK):
+    """
+    Download url ke dest kalau berubah, lanjutkan .part kalau ada
+
+    Returns:
+        'unchanged' (304 / sudah ada), 'downloaded', 'resumed', atau
+        'offline' (network error tapi file lokal masih valid)
+    """
+    session = session or requests.Session()
+    entry = manifest.get(dest)
+    current = manifest.is_current(dest) and entry.get('url') == url
+    part = dest + ".part"
+
+    # identity: Content-Length/Range dihitung pada byte file yang disimpan
+    headers = {'Accept-Encoding': 'identity'}
+    if current:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    part_validator = None
+    if offset:
+        try:
+            with open(part + ".json") as f:
+                part_validator = json.load(f).get('validator')
+        except (OSError, ValueError):
+            part_validator = None
+        if part_validator:
+            headers['Range'] = f"bytes={offset}-"
+            headers['If-Range'] = part_validator
+        else:
+            offset = 0
+
+    try:
+        response = session.get(url, headers=headers, stream=True, timeout=timeout)
+    except requests.RequestException:
+        if current:
+            return 'offline'
+        raise
+
+    with response:
+        if response.status_code == 304:
+            return 'unchanged'
+        if response.status_code == 416 and offset:
+            # Range di luar ukuran file (mis. .part sudah penuh): buang .part
+            # dan download ulang dari awal; tanpa .part tidak ada Range lagi
+            response.close()
+            for path in (part, part + ".json"):
+                if os.path.exists(path):
+                    os.remove(path)
+            return fetch(url, dest, manifest, session, timeout, chunk_size)
+        response.raise_for_status()
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        resumed = response.status_code == 206 and offset > 0
+        if resumed:
+            # Jangan percaya 206 begitu saja: versi dan offset harus cocok
+            start = response.headers.get('Content-Range', '').partition(' ')[2].partition('-')[0]
+            if part_validator not in (etag, last_modified) or start != str(offset):
+                response.close()
+                os.remove(part)
+                return fetch(url, dest, manifest, session, timeout, chunk_size)
+        elif response.status_code == 206:
+            raise IOError(f"Unexpected partial response for {url}")
+        # Simpan validator supaya .part bisa dilanjutkan dengan If-Range
+        validator = etag or last_modified
+        if validator:
+            with open(part + ".json", 'w') as f:
+                json.dump({'url': url, 'validator': validator}, f)
+
+        sha = _sha256_file(part) if resumed else hashlib.sha256()
+        with open(part, 'ab' if resumed else 'wb') as f:
+            for block in response.iter_content(chunk_size):
+                f.write(block)
+                sha.update(block)
+
+    expected = response.headers.get('Content-Range', '').rpartition('/')[2]
+    if not expected or expected == '*':
+        expected = response.headers.get('Content-Length') if not resumed else None
+    size = os.path.getsize(part)
+    if expected and expected.isdigit() and int(expected) != size:
+        raise IOError(f"Incomplete download: {size} of {expected} bytes ({part})")
+
+    os.replace(part, dest)
+    if os.path.exists(part + ".json"):
+        os.remove(part + ".json")
+    manifest.record(dest, sha.hexdigest(), url=url, etag=etag, last_modified=last_modified)
+    return 'resumed' if resumed else 'downloaded'
+
+
+# ==========================================
+# 2. Generated Files
+# ==========================================
+def write_if_changed(dest, data, manifest):
+    """
+    Tulis bytes ke dest hanya kalau isinya berbeda dari file yang ada
+
+    Returns:
+        True kalau file ditulis, False kalau tidak berubah
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    entry = manifest.get(dest)
+    if entry and entry['sha256'] == digest and manifest.is_current(dest):
+        return False
+    if not entry and os.path.exists(dest) and os.path.getsize(dest) == len(data) \
+            and scan_source(dest)[0] == digest:
+        manifest.record(dest, digest, generated=True)
+        return False
+    tmp = dest + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, dest)
+    manifest.record(dest, digest, generated=True)
+    return True
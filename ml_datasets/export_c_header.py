@@ -0,0 +1,286 @@
+"""
+Generate C header dari trained model untuk firmware ESP32
+
+Header berisi konstanta scaler, weights sebagai const array (di flash) dan
+forward function yang di-unroll untuk ukuran model yang tetap. Tidak perlu
+TFLite Micro dan tidak ada lagi konstanta yang di-copy manual ke .ino.
+
+Parity: reference_forward() di sini meniru urutan operasi float32 di C
+persis (satu rounding per operasi, tanpa FMA). Script meng-compile header
+dengan C compiler host (-ffp-contract=off) dan membandingkan output
+bit-for-bit dengan reference. Di ESP32, compiler boleh memakai FMA
+(madd.s), jadi hasil on-device bisa beda di digit terakhir (1 ulp).
+
+Usage:
+    python export_c_header.py                   # float32 weights → ../pm_model.h
+    python export_c_header.py --int8            # int8 weights + per-channel scale
+    python export_c_header.py --out path/pm_model.h
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from numpy_predictor import DEFAULT_WEIGHTS, NumpyPredictor
+
+# Header ditulis di folder sketch (sebelah esp32_production_working_ml.ino)
+DEFAULT_OUTPUT = "../pm_model.h"
+
+INPUT_NAMES = ('temperature', 'humidity', 'pressure')
+OUTPUT_NAMES = ('pm25', 'pm10')
+
+
+# ==========================================
+# 1. Reference Forward (mirrors generated C)
+# ==========================================
+def quantize_weights(W):
+    """Symmetric int8 per output channel: W ≈ q * scale"""
+    max_abs = np.abs(W).max(axis=0)
+    scale = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+    q = np.clip(np.round(W / scale), -127, 127).astype(np.int8)
+    return q, scale
+
+
+def reference_forward(predictor, X, int8=False):
+    """
+    Forward pass float32 dengan urutan operasi yang sama dengan C header
+
+    Per neuron: a = b; a += x0*w0; a += x1*w1; ...; relu(a) = a > 0 ? a : 0.
+    Mode int8: a = 0; a += x_i*(float)q_i; ...; a = a*scale + b.
+    """
+    f32 = np.float32
+    x = np.asarray(X, dtype=f32)
+    x = x * predictor.x_scale
+    x = x + predictor.x_min
+    for W, b, activation in zip(predictor.weights, predictor.biases, predictor.activations):
+        if int8:
+            q, scale = quantize_weights(W)
+            weights = q.astype(f32)
+            acc = np.zeros((len(x), W.shape[1]), dtype=f32)
+        else:
+            weights = W
+            acc = np.broadcast_to(b, (len(x), W.shape[1])).astype(f32)
+        for i in range(W.shape[0]):
+            acc = acc + x[:, i:i + 1] * weights[i]
+        if int8:
+            acc = acc * scale
+            acc = acc + b
+        if activation == 'relu':
+            acc = np.where(acc > f32(0), acc, f32(0))
+        x = acc
+    y = x - predictor.y_min
+    return y / predictor.y_scale
+
+
+# ==========================================
+# 2. C Code Generation
+# ==========================================
+def c_float(value):
+    """Literal float32 yang round-trip exact (shortest repr + 'f')"""
+    value = np.float32(value)
+    if not np.isfinite(value):
+        raise ValueError(f"Non-finite weight: {value}")
+    text = str(value)
+    if 'e' not in text and '.' not in text:
+        text += '.0'
+    return text + 'f'
+
+
+def c_array(ctype, name, values, per_line=8):
+    flat = np.asarray(values).ravel()
+    if ctype == 'float':
+        items = [c_float(v) for v in flat]
+    else:
+        items = [str(int(v)) for v in flat]
+    dims = ''.join(f'[{d}]' for d in np.shape(values))
+    lines = [', '.join(items[i:i + per_line]) for i in range(0, len(items), per_line)]
+    body = ',\n  '.join(lines)
+    return f"static const {ctype} {name}{dims} = {{\n  {body}\n}};\n"
+
+
+def generate_header(predictor, int8=False, source=DEFAULT_WEIGHTS):
+    """
+    Buat isi pm_model.h
+
+    Returns:
+        string source code C
+    """
+    sizes = [predictor.weights[0].shape[0]] + [W.shape[1] for W in predictor.weights]
+    arch = '-'.join(map(str, sizes))
+    out = []
+    out.append("// Auto-generated by ml_datasets/export_c_header.py - DO NOT EDIT\n")
+    out.append(f"// Source: {source}\n")
+    out.append(f"// Architecture: {arch} ({'int8' if int8 else 'float32'} weights)\n")
+    out.append("#ifndef PM_MODEL_H\n#define PM_MODEL_H\n\n#include <stdint.h>\n\n")
+
+    # Scaler constants (training range)
+    x_min_data = -predictor.x_min / predictor.x_scale
+    x_max_data = (1 - predictor.x_min) / predictor.x_scale
+    y_min_data = -predictor.y_min / predictor.y_scale
+    y_max_data = (1 - predictor.y_min) / predictor.y_scale
+    out.append("// Training range (MinMaxScaler data_min_ / data_max_)\n")
+    for i, name in enumerate(INPUT_NAMES):
+        out.append(f"#define PM_MODEL_{name.upper()}_MIN {c_float(x_min_data[i])}\n")
+        out.append(f"#define PM_MODEL_{name.upper()}_MAX {c_float(x_max_data[i])}\n")
+    for i, name in enumerate(OUTPUT_NAMES):
+        out.append(f"#define PM_MODEL_{name.upper()}_MIN {c_float(y_min_data[i])}\n")
+        out.append(f"#define PM_MODEL_{name.upper()}_MAX {c_float(y_max_data[i])}\n")
+    out.append("\n")
+    out.append(c_array('float', 'PM_MODEL_X_SCALE', predictor.x_scale))
+    out.append(c_array('float', 'PM_MODEL_X_MIN', predictor.x_min))
+    out.append(c_array('float', 'PM_MODEL_Y_SCALE', predictor.y_scale))
+    out.append(c_array('float', 'PM_MODEL_Y_MIN', predictor.y_min))
+    out.append("\n")
+
+    # Weights (const → flash / .rodata)
+    for k, (W, b) in enumerate(zip(predictor.weights, predictor.biases)):
+        if int8:
+            q, scale = quantize_weights(W)
+            out.append(c_array('int8_t', f'PM_MODEL_W{k}', q))
+            out.append(c_array('float', f'PM_MODEL_S{k}', scale))
+        else:
+            out.append(c_array('float', f'PM_MODEL_W{k}', W))
+        out.append(c_array('float', f'PM_MODEL_B{k}', b))
+    out.append("\n")
+
+    # Unrolled forward function
+    out.append("// Prediksi PM2.5/PM10 (µg/m³) dari temperature (°C), humidity (%), pressure (hPa)\n")
+    out.append("static inline void pm_model_predict(float temperature, float humidity, "
+               "float pressure, float *pm25, float *pm10) {\n")
+    for i, name in enumerate(INPUT_NAMES):
+        out.append(f"  float x{i} = {name} * PM_MODEL_X_SCALE[{i}];\n")
+        out.append(f"  x{i} = x{i} + PM_MODEL_X_MIN[{i}];\n")
+
+    prev = [f"x{i}" for i in range(sizes[0])]
+    for k, (W, activation) in enumerate(zip(predictor.weights, predictor.activations)):
+        out.append(f"  // Layer {k}: {W.shape[0]} → {W.shape[1]} ({activation})\n")
+        current = []
+        for j in range(W.shape[1]):
+            var = f"l{k}_{j}"
+            if int8:
+                out.append(f"  float {var} = 0.0f;\n")
+                for i, src in enumerate(prev):
+                    out.append(f"  {var} = {var} + {src} * (float)PM_MODEL_W{k}[{i}][{j}];\n")
+                out.append(f"  {var} = {var} * PM_MODEL_S{k}[{j}];\n")
+                out.append(f"  {var} = {var} + PM_MODEL_B{k}[{j}];\n")
+            else:
+                out.append(f"  float {var} = PM_MODEL_B{k}[{j}];\n")
+                for i, src in enumerate(prev):
+                    out.append(f"  {var} = {var} + {src} * PM_MODEL_W{k}[{i}][{j}];\n")
+            if activation == 'relu':
+                out.append(f"  {var} = {var} > 0.0f ? {var} : 0.0f;\n")
+            current.append(var)
+        prev = current
+
+    for i, name in enumerate(OUTPUT_NAMES):
+        out.append(f"  *{name} = ({prev[i]} - PM_MODEL_Y_MIN[{i}]) / PM_MODEL_Y_SCALE[{i}];\n")
+    out.append("}\n\n#endif  // PM_MODEL_H\n")
+    return ''.join(out)
+
+
+# ==========================================
+# 3. Host-side Parity Check
+# ==========================================
+CHECK_MAIN = r"""
+#include <stdint.h>
+#include <stdio.h>
+#include "pm_model.h"
+
+int main(void) {
+  float in[3], out[2];
+  while (fread(in, sizeof(float), 3, stdin) == 3) {
+    pm_model_predict(in[0], in[1], in[2], &out[0], &out[1]);
+    fwrite(out, sizeof(float), 2, stdout);
+  }
+  return 0;
+}
+"""
+
+
+def compile_and_run(header_text, X, compiler=None, main=CHECK_MAIN, header_name='pm_model.h'):
+    """
+    Compile header + harness dengan C compiler host dan jalankan pada X
+
+    main/header_name bisa diganti untuk header lain (misal pm_lut.h)
+
+    Returns:
+        array (n, 2) float32 output C, atau None kalau tidak ada compiler
+    """
+    compiler = compiler or os.environ.get('CC') or shutil.which('cc') or shutil.which('gcc')
+    if not compiler:
+        return None
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, header_name), 'w') as f:
+            f.write(header_text)
+        with open(os.path.join(tmp, 'check.c'), 'w') as f:
+            f.write(main)
+        binary = os.path.join(tmp, 'check')
+        subprocess.run(
+            [compiler, '-std=c99', '-O2', '-ffp-contract=off', '-o', binary,
+             os.path.join(tmp, 'check.c')],
+            check=True, capture_output=True,
+        )
+        result = subprocess.run(
+            [binary], input=np.ascontiguousarray(X, dtype=np.float32).tobytes(),
+            check=True, capture_output=True,
+        )
+    return np.frombuffer(result.stdout, dtype=np.float32).reshape(-1, 2)
+
+
+# ==========================================
+# Main Function
+# ==========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export trained model as C header for ESP32")
+    parser.add_argument('--weights', default=DEFAULT_WEIGHTS, help="NumPy weights (export_numpy.py)")
+    parser.add_argument('--out', default=DEFAULT_OUTPUT)
+    parser.add_argument('--int8', action='store_true', help="int8 weights + per-channel float scale")
+    parser.add_argument('--samples', type=int, default=100_000, help="Jumlah input untuk parity check")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("Exporting Model as C Header for ESP32")
+    print("="*60)
+
+    if not os.path.exists(args.weights):
+        print(f"❌ Weights not found: {args.weights}")
+        print("   Run export_numpy.py (or train_model.py) first!")
+        sys.exit(1)
+
+    predictor = NumpyPredictor.load(args.weights)
+    if predictor.weights[0].shape[0] != len(INPUT_NAMES):
+        print(f"❌ C header supports {len(INPUT_NAMES)}-input models only "
+              f"(got {predictor.weights[0].shape[0]}, trained with --features?)")
+        sys.exit(1)
+    header = generate_header(predictor, int8=args.int8, source=args.weights)
+    with open(args.out, 'w') as f:
+        f.write(header)
+    weight_bytes = sum(W.size * (1 if args.int8 else 4) + b.size * 4
+                       for W, b in zip(predictor.weights, predictor.biases))
+    print(f"   ✅ Saved: {args.out} ({weight_bytes} bytes of weights in flash)")
+
+    # Inputs covering and slightly exceeding the training range
+    rng = np.random.default_rng(0)
+    low = -predictor.x_min / predictor.x_scale
+    high = (1 - predictor.x_min) / predictor.x_scale
+    span = high - low
+    X = (low - 0.1 * span + rng.random((args.samples, 3)) * 1.2 * span).astype(np.float32)
+
+    y_ref = reference_forward(predictor, X, int8=args.int8)
+    max_diff = float(np.max(np.abs(y_ref - predictor.predict(X))))
+    print(f"   Reference vs NumpyPredictor: max |Δ| = {max_diff:.2e} µg/m³")
+
+    y_c = compile_and_run(header, X)
+    if y_c is None:
+        print("   ⚠️  No C compiler found, skipping bit-for-bit check")
+        sys.exit(0)
+    mismatches = int(np.count_nonzero(y_c.view(np.uint32) != y_ref.view(np.uint32)))
+    if mismatches:
+        print(f"   ❌ C output differs from reference in {mismatches} values")
+        sys.exit(1)
+    print(f"   ✅ C output matches reference bit-for-bit ({args.samples:,} samples)")
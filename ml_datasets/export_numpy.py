@@ -0,0 +1,119 @@
+"""
+Export Keras model + scalers ke .npz untuk numpy_predictor.py
+
+Format .npz (semua float32, tanpa pickle):
+    n_layers            jumlah Dense layer
+    W{i}, b{i}          kernel (in, out) dan bias layer ke-i
+    activations          'relu' / 'linear' per layer
+    x_min, x_scale      MinMaxScaler X: x_scaled = x * x_scale + x_min
+    y_min, y_scale      MinMaxScaler y: y = (y_scaled - y_min) / y_scale
+
+Usage:
+    python export_numpy.py
+"""
+
+import os
+import sys
+
+import numpy as np
+
+from numpy_predictor import DEFAULT_WEIGHTS, NumpyPredictor
+
+MODEL_PATH = "models/pm_predictor.h5"
+TFLITE_PATH = "models/pm_predictor.tflite"
+
+# Toleransi parity terhadap Keras/TFLite (satuan µg/m³)
+PARITY_ATOL = 1e-3
+
+
+def dense_layers(model):
+    """Dense layers dari model Keras (Dropout dll dilewati)"""
+    return [layer for layer in model.layers if layer.get_weights()]
+
+
+def export_arrays(model, scaler_X, scaler_y):
+    """Kumpulkan weights dan scaler sebagai dict array untuk np.savez"""
+    layers = dense_layers(model)
+    arrays = {
+        'n_layers': np.array(len(layers)),
+        'activations': np.array([layer.get_config()['activation'] for layer in layers]),
+        'x_min': np.asarray(scaler_X.min_, dtype=np.float32),
+        'x_scale': np.asarray(scaler_X.scale_, dtype=np.float32),
+        'y_min': np.asarray(scaler_y.min_, dtype=np.float32),
+        'y_scale': np.asarray(scaler_y.scale_, dtype=np.float32),
+    }
+    for i, layer in enumerate(layers):
+        kernel, bias = layer.get_weights()
+        arrays[f'W{i}'] = kernel.astype(np.float32)
+        arrays[f'b{i}'] = bias.astype(np.float32)
+    return arrays
+
+
+def export_npz(model, scaler_X, scaler_y, path=DEFAULT_WEIGHTS):
+    """Tulis .npz secara atomic (tmp + rename)"""
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **export_arrays(model, scaler_X, scaler_y))
+    os.replace(tmp, path)
+    return path
+
+
+def sample_inputs(scaler_X, n=10_000, seed=0):
+    """Input acak di dalam range training (data_min_..data_max_)"""
+    rng = np.random.default_rng(seed)
+    low = np.asarray(scaler_X.data_min_, dtype=np.float32)
+    high = np.asarray(scaler_X.data_max_, dtype=np.float32)
+    return (low + rng.random((n, len(low)), dtype=np.float32) * (high - low)).astype(np.float32)
+
+
+# ==========================================
+# Main Function
+# ==========================================
+if __name__ == "__main__":
+    import time
+
+    print("="*60)
+    print("Exporting Model to NumPy Weights")
+    print("="*60)
+
+    if not os.path.exists(MODEL_PATH):
+        print(f"❌ Model not found: {MODEL_PATH}")
+        print("   Run train_model.py first!")
+        sys.exit(1)
+
+    import tensorflow as tf
+    from batch_inference import TFLitePredictor, load_scalers
+
+    print("\n[1/3] Loading Keras model and scalers...")
+    model = tf.keras.models.load_model(MODEL_PATH, compile=False)
+    scaler_X, scaler_y = load_scalers()
+    print(f"   ✅ Loaded: {MODEL_PATH}")
+
+    print("\n[2/3] Exporting weights...")
+    export_npz(model, scaler_X, scaler_y)
+    size_kb = os.path.getsize(DEFAULT_WEIGHTS) / 1024
+    print(f"   ✅ Saved: {DEFAULT_WEIGHTS} ({size_kb:.1f} KB)")
+
+    print("\n[3/3] Checking parity...")
+    start = time.perf_counter()
+    predictor = NumpyPredictor.load(DEFAULT_WEIGHTS)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    X = sample_inputs(scaler_X)
+    y_numpy = predictor.predict(X)
+    X_scaled = X * predictor.x_scale + predictor.x_min
+    y_keras = scaler_y.inverse_transform(model.predict(X_scaled, batch_size=4096, verbose=0))
+    diff_keras = float(np.max(np.abs(y_numpy - y_keras)))
+    print(f"   NumPy load time: {load_ms:.2f} ms")
+    print(f"   Max |NumPy - Keras|: {diff_keras:.2e} µg/m³")
+
+    failed = diff_keras > PARITY_ATOL
+    if os.path.exists(TFLITE_PATH):
+        y_tflite = TFLitePredictor(TFLITE_PATH, scaler_X, scaler_y).predict(X)
+        diff_tflite = float(np.max(np.abs(y_numpy - y_tflite)))
+        print(f"   Max |NumPy - TFLite|: {diff_tflite:.2e} µg/m³")
+        failed |= diff_tflite > PARITY_ATOL
+
+    if failed:
+        print(f"   ❌ Parity check failed (tolerance {PARITY_ATOL})")
+        sys.exit(1)
+    print(f"   ✅ Parity OK (tolerance {PARITY_ATOL})")
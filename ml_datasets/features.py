@@ -0,0 +1,222 @@
+"""
+Feature engineering time-windowed untuk PM predictor
+
+Dari timestamp + temperature/humidity/pressure (per lokasi) dihitung:
+    - lag 1 dan 3 sample per sensor
+    - rolling mean/std window 6 dan 24 sample per sensor
+    - pressure tendency (perubahan 3 sample, indikator front cuaca)
+    - hour-of-day dan day-of-year sebagai sin/cos
+    - voc/eco2 (opsional, kalau kolomnya ada)
+
+build_features() menghitung semuanya untuk seluruh dataset dalam satu pass
+vectorized: data diurutkan per (location, timestamp), rolling window pakai
+selisih cumsum dengan batas grup, tanpa loop per baris. OnlineFeatures
+menghitung feature yang sama secara incremental, O(1) per sample baru
+(ring buffer + running sum), untuk on-device / streaming service.
+
+Window dan lag dihitung dalam jumlah sample (dataset hourly → jam). Di
+awal grup, window memakai sample yang sudah ada dan lag memakai sample
+paling lama yang tersedia. Nilai NaN diganti nilai valid terakhir.
+
+Usage:
+    X, names = build_features(columns)               # columns = load_dir(...)[0]
+    state = OnlineFeatures()
+    x = state.update(timestamp, temperature, humidity, pressure)
+"""
+
+from collections import deque
+
+import numpy as np
+
+from data_pipeline import FEATURES
+
+LAGS = (1, 3)
+WINDOWS = (6, 24)
+TENDENCY = 3
+EXTRA_COLUMNS = ('voc', 'eco2')
+TIME_FEATURES = ('hour_sin', 'hour_cos', 'doy_sin', 'doy_cos')
+
+
+def feature_names(extra=()):
+    """Urutan kolom feature (sama untuk build_features dan OnlineFeatures)"""
+    names = list(FEATURES)
+    names += [f"{c}_lag{k}" for c in FEATURES for k in LAGS]
+    for c in FEATURES:
+        for w in WINDOWS:
+            names += [f"{c}_mean{w}", f"{c}_std{w}"]
+    names.append(f"pressure_tendency{TENDENCY}")
+    names += list(TIME_FEATURES)
+    names += list(extra)
+    return names
+
+
+def time_features(timestamps):
+    """sin/cos hour-of-day dan day-of-year dari datetime64 (NaT → NaN)"""
+    ts = np.asarray(timestamps, dtype='M8[ns]')
+    nat = np.isnat(ts)
+    hours = (ts.astype('M8[h]') - ts.astype('M8[D]')).astype(np.float64)
+    days = (ts.astype('M8[D]') - ts.astype('M8[Y]')).astype(np.float64)
+    hour_angle = 2 * np.pi * hours / 24.0
+    day_angle = 2 * np.pi * days / 365.25
+    out = np.column_stack([np.sin(hour_angle), np.cos(hour_angle),
+                           np.sin(day_angle), np.cos(day_angle)])
+    out[nat] = np.nan
+    return out
+
+
+# ==========================================
+# 1. Vectorized (seluruh dataset, satu pass)
+# ==========================================
+def _group_starts(groups):
+    """Index awal grup untuk setiap baris (groups sudah terurut)"""
+    idx = np.arange(len(groups))
+    is_start = np.ones(len(groups), dtype=bool)
+    is_start[1:] = groups[1:] != groups[:-1]
+    return np.maximum.accumulate(np.where(is_start, idx, 0))
+
+
+def _ffill(x, starts):
+    """Forward-fill NaN di dalam grup (NaN di awal grup tetap NaN)"""
+    idx = np.arange(len(x))
+    last_valid = np.maximum.accumulate(np.where(np.isfinite(x), idx, -1))
+    filled = x[np.maximum(last_valid, 0)]
+    return np.where(last_valid >= starts, filled, np.nan)
+
+
+def _rolling(x, window, starts):
+    """Rolling mean/std (ddof=0) per grup lewat selisih cumsum, abaikan NaN"""
+    idx = np.arange(len(x))
+    valid = np.isfinite(x)
+    center = np.nanmean(x) if valid.any() else 0.0
+    v = np.where(valid, x - center, 0.0)
+    cs = np.concatenate([[0.0], np.cumsum(v)])
+    cs2 = np.concatenate([[0.0], np.cumsum(v * v)])
+    cn = np.concatenate([[0], np.cumsum(valid)])
+    lo = np.maximum(idx - window + 1, starts)
+    count = cn[idx + 1] - cn[lo]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (cs[idx + 1] - cs[lo]) / count
+        var = (cs2[idx + 1] - cs2[lo]) / count - mean * mean
+    return mean + center, np.sqrt(np.maximum(var, 0.0))
+
+
+def build_features(columns, extra=None):
+    """
+    Hitung semua feature untuk dataset columnar
+
+    Args:
+        columns: dict {nama: array} dengan 'timestamp' + FEATURES, opsional
+            'location' (grup) dan kolom EXTRA_COLUMNS
+        extra: kolom tambahan (default: EXTRA_COLUMNS yang ada di columns)
+
+    Returns:
+        (X float32 (n, n_features) dalam urutan baris asli, feature names)
+    """
+    if 'timestamp' not in columns:
+        raise KeyError("Feature engineering needs a 'timestamp' column")
+    extra = tuple(c for c in EXTRA_COLUMNS if c in columns) if extra is None else tuple(extra)
+    timestamps = np.asarray(columns['timestamp'], dtype='M8[ns]')
+    n = len(timestamps)
+    groups = (np.asarray(columns['location']) if 'location' in columns
+              else np.zeros(n, dtype=np.int32))
+
+    order = np.lexsort((timestamps.view(np.int64), groups))
+    starts = _group_starts(groups[order])
+    idx = np.arange(n)
+
+    filled = {c: _ffill(np.asarray(columns[c], dtype=np.float64)[order], starts) for c in FEATURES}
+    out = [filled[c] for c in FEATURES]
+    for c in FEATURES:
+        for k in LAGS:
+            out.append(filled[c][np.maximum(idx - k, starts)])
+    for c in FEATURES:
+        for w in WINDOWS:
+            out.extend(_rolling(filled[c], w, starts))
+    out.append(filled['pressure'] - filled['pressure'][np.maximum(idx - TENDENCY, starts)])
+    X_sorted = np.column_stack(out + [time_features(timestamps[order])]
+                               + [np.asarray(columns[c], dtype=np.float64)[order] for c in extra])
+
+    X = np.empty((n, X_sorted.shape[1]), dtype=np.float32)
+    X[order] = X_sorted
+    return X, feature_names(extra)
+
+
+# ==========================================
+# 2. Incremental (O(1) per sample)
+# ==========================================
+class OnlineFeatures:
+    """
+    State feature untuk satu lokasi / satu device
+
+    Setiap update() O(1): ring buffer sepanjang window terbesar dan running
+    sum/sum of squares per window. Hasil sama dengan build_features() untuk
+    urutan sample yang sama. Untuk banyak lokasi, simpan satu instance per
+    lokasi (misal dict {location: OnlineFeatures()}).
+    """
+
+    def __init__(self, extra=()):
+        self.extra = tuple(extra)
+        self.names = feature_names(self.extra)
+        size = max(max(WINDOWS), max(LAGS) + 1, TENDENCY + 1)
+        self._history = {c: deque(maxlen=size) for c in FEATURES}
+        self._last = {c: np.nan for c in FEATURES}
+        self._center = {c: None for c in FEATURES}
+        # per (kolom, window): [sum, sum of squares, count valid]
+        self._sums = {(c, w): [0.0, 0.0, 0] for c in FEATURES for w in WINDOWS}
+
+    def _push(self, column, value):
+        if np.isfinite(value):
+            self._last[column] = float(value)
+        value = self._last[column]
+        if self._center[column] is None and np.isfinite(value):
+            self._center[column] = value
+        history = self._history[column]
+        for w in WINDOWS:
+            acc = self._sums[(column, w)]
+            if len(history) >= w:
+                self._remove(acc, column, history[-w])
+            self._add(acc, column, value)
+        history.append(value)
+
+    def _add(self, acc, column, value):
+        if np.isfinite(value):
+            d = value - self._center[column]
+            acc[0] += d
+            acc[1] += d * d
+            acc[2] += 1
+
+    def _remove(self, acc, column, value):
+        if np.isfinite(value):
+            d = value - self._center[column]
+            acc[0] -= d
+            acc[1] -= d * d
+            acc[2] -= 1
+
+    def _lag(self, column, k):
+        history = self._history[column]
+        return history[max(len(history) - 1 - k, 0)]
+
+    def update(self, timestamp, temperature, humidity, pressure, **extra):
+        """
+        Tambahkan satu sample dan return feature vector
+
+        Returns:
+            array float32 (n_features,) dengan urutan self.names
+        """
+        for column, value in zip(FEATURES, (temperature, humidity, pressure)):
+            self._push(column, float(value) if value is not None else np.nan)
+
+        out = [self._history[c][-1] for c in FEATURES]
+        out += [self._lag(c, k) for c in FEATURES for k in LAGS]
+        for c in FEATURES:
+            for w in WINDOWS:
+                total, total_sq, count = self._sums[(c, w)]
+                if count:
+                    mean = total / count
+                    out += [mean + self._center[c], np.sqrt(max(total_sq / count - mean * mean, 0.0))]
+                else:
+                    out += [np.nan, np.nan]
+        out.append(self._history['pressure'][-1] - self._lag('pressure', TENDENCY))
+        out += list(time_features([np.datetime64(timestamp, 'ns')])[0])
+        out += [float(extra.get(c, np.nan)) for c in self.extra]
+        return np.asarray(out, dtype=np.float32)
@@ -0,0 +1,370 @@
+"""
+Simulator armada ESP32 untuk load test jalur ingest server.js (asyncio)
+
+Setiap device virtual membuka satu WebSocket (aiohttp) ke server.js,
+mengirim `init` lalu frame `sensor_data` dengan bentuk yang sama seperti
+sendSensorData() di firmware, setiap --interval detik (default 3 s seperti
+sendInterval firmware). Nilai sensor diambil berurutan dari dataset di
+processed/ (setiap device mulai dari offset acak di lokasinya); dengan
+--ml-fraction sebagian device mengirim PM hasil prediksi model (ml_mode).
+
+Latency end-to-end = waktu kirim frame → `sensor_ack` diterima. server.js
+membalas ACK per koneksi sesuai urutan frame, jadi frame dicocokkan FIFO.
+Frame tanpa ACK dalam --ack-timeout detik (atau koneksi putus) dihitung
+dropped. Broadcast `sensor_data` dari server ke semua client juga diterima
+device virtual (sama seperti board asli) dan hanya dihitung, tidak di-parse.
+
+Hanya untuk server lokal / staging sendiri.
+
+Usage:
+    node server.js
+    python fleet_simulator.py --devices 1000 --duration 60
+    python fleet_simulator.py --devices 5000 --interval 1 --ramp 30 --ml-fraction 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from datetime import datetime
+
+import aiohttp
+import numpy as np
+
+from data_pipeline import FEATURES, TARGETS
+
+DEFAULT_URL = "ws://localhost:3000/"
+DEFAULT_DATASET = "processed/sample_india_singapore_dataset.csv"
+DEFAULT_INTERVAL = 3.0       # sendInterval firmware (ms 3000)
+DEFAULT_ACK_TIMEOUT = 10.0
+REPORT_PATH = "models/fleet_report.json"
+ACK_PREFIX = '{"type":"sensor_ack"'
+
+
+# ==========================================
+# 1. Sensor Data Source
+# ==========================================
+class SensorSource:
+    """
+    Baris sensor dari dataset; setiap device berjalan berurutan di lokasinya
+
+    Args:
+        model_path: model untuk PM ml_mode (.pmb/.npz/.tflite), None = tanpa ML
+    """
+
+    def __init__(self, dataset=DEFAULT_DATASET, model_path=None, seed=42):
+        from dataset_cache import build_cache, load_dir
+
+        columns, meta = load_dir(build_cache(dataset))
+        n = meta['rows']
+        self.rng = np.random.default_rng(seed)
+        self.values = {name: np.asarray(columns[name], dtype=np.float32)
+                       for name in FEATURES + TARGETS + ['voc', 'eco2'] if name in columns}
+        valid = np.ones(n, dtype=bool)
+        for values in self.values.values():
+            valid &= np.isfinite(values)
+
+        if 'location' in columns:
+            codes = np.asarray(columns['location'])
+            self.groups = [np.flatnonzero(valid & (codes == code)) for code in np.unique(codes)]
+            self.groups = [rows for rows in self.groups if len(rows)]
+        else:
+            self.groups = [np.flatnonzero(valid)]
+        if not any(len(rows) for rows in self.groups):
+            raise ValueError(f"No complete sensor rows in {dataset}")
+
+        self.ml_pm = None
+        if model_path:
+            from batch_inference import load_predictor
+
+            X = np.column_stack([self.values[c] for c in FEATURES])
+            self.ml_pm = np.clip(load_predictor(model_path).predict(X), 0, None)
+
+    def stream(self, device_index):
+        """Iterator tak berujung atas index baris untuk satu device"""
+        rows = self.groups[device_index % len(self.groups)]
+        position = int(self.rng.integers(len(rows)))
+        while True:
+            yield rows[position]
+            position = (position + 1) % len(rows)
+
+    def frame(self, device, row, ml_mode, rng):
+        """Payload sensor_data seperti sendSensorData() di firmware"""
+        v = self.values
+        voc = int(v['voc'][row]) if 'voc' in v else int(rng.integers(0, 600))
+        eco2 = int(v['eco2'][row]) if 'eco2' in v else 400 + voc
+        if ml_mode and self.ml_pm is not None:
+            pm25, pm10 = (float(x) for x in self.ml_pm[row])
+        else:
+            pm25, pm10 = float(v['pm25'][row]), float(v['pm10'][row])
+        relay = voc > 250 or pm25 > 50
+        return {
+            'type': 'sensor_data',
+            'device': device,
+            'voc': voc,
+            'eco2': eco2,
+            'h2': int(rng.integers(12000, 14000)),
+            'ethanol': int(rng.integers(17000, 20000)),
+            'pm25': round(pm25, 2),
+            'pm10': round(pm10, 2),
+            'ml_mode': bool(ml_mode),
+            'source': 'ML_Prediction' if ml_mode else 'Sensor',
+            'temperature': round(float(v['temperature'][row]), 2),
+            'humidity': round(float(v['humidity'][row]), 2),
+            'pressure': round(float(v['pressure'][row]), 2),
+            'status': 'Unhealthy' if relay else 'Healthy',
+            'relay_state': 'ON' if relay else 'OFF',
+            'heap': int(rng.integers(180_000, 220_000)),
+            'wifi_status': 'Connected',
+        }
+
+
+# ==========================================
+# 2. Statistics
+# ==========================================
+class FleetStats:
+    """Counter + latency (ms) seluruh armada"""
+
+    def __init__(self):
+        self.latencies = []
+        self.counters = {
+            'connected': 0, 'connect_failed': 0, 'disconnected': 0,
+            'sent': 0, 'acked': 0, 'dropped': 0, 'send_errors': 0,
+            'late_sends': 0, 'received_other': 0,
+        }
+        self.acks_per_second = {}
+        self.started = time.perf_counter()
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def ack(self, latency_ms):
+        self.counters['acked'] += 1
+        self.latencies.append(latency_ms)
+        second = int(time.perf_counter() - self.started)
+        self.acks_per_second[second] = self.acks_per_second.get(second, 0) + 1
+
+    def report(self, elapsed):
+        latencies = np.asarray(self.latencies, dtype=np.float64)
+        percentiles = {}
+        if len(latencies):
+            for q in (50, 90, 95, 99, 99.9):
+                percentiles[f'p{q:g}'] = round(float(np.percentile(latencies, q)), 2)
+            percentiles['max'] = round(float(latencies.max()), 2)
+            percentiles['mean'] = round(float(latencies.mean()), 2)
+        sent = self.counters['sent']
+        return {
+            **self.counters,
+            'elapsed_seconds': round(elapsed, 2),
+            'sent_per_sec': round(sent / elapsed, 1) if elapsed else None,
+            'acked_per_sec': round(self.counters['acked'] / elapsed, 1) if elapsed else None,
+            'drop_rate': round(self.counters['dropped'] / sent, 5) if sent else None,
+            'latency_ms': percentiles,
+            'acks_per_second': [self.acks_per_second.get(s, 0)
+                                for s in range(int(elapsed) + 1)],
+        }
+
+
+# ==========================================
+# 3. Virtual Device
+# ==========================================
+async def run_device(session, url, index, source, stats, deadline, args):
+    """
+    Satu device: connect, init, kirim frame sampai deadline, tunggu ACK sisa
+
+    Sender dan receiver berjalan sebagai dua task pada koneksi yang sama.
+    """
+    rng = np.random.default_rng(args.seed + index)
+    device = f"{args.prefix}-{index:05d}"
+    ml_mode = source.ml_pm is not None and rng.random() < args.ml_fraction
+    pending = deque()                 # waktu kirim frame yang belum di-ACK
+
+    # Ramp-up: koneksi disebar merata dalam --ramp detik
+    await asyncio.sleep(args.ramp * index / max(args.devices, 1))
+    try:
+        ws = await session.ws_connect(url, heartbeat=None, max_msg_size=0)
+    except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+        stats.count('connect_failed')
+        return
+    stats.count('connected')
+    lost = asyncio.Event()            # koneksi ditutup dari sisi server
+
+    async def receiver():
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            if msg.data.startswith(ACK_PREFIX):
+                if pending:
+                    stats.ack((time.perf_counter() - pending.popleft()) * 1000)
+            else:
+                stats.count('received_other')
+        lost.set()
+
+    receive_task = asyncio.create_task(receiver())
+    try:
+        await ws.send_str(json.dumps({'type': 'init', 'device': device,
+                                      'ip': f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}"}))
+        rows = source.stream(index)
+        # Fase acak supaya device tidak mengirim serentak
+        next_send = time.perf_counter() + rng.random() * args.interval
+        while next_send < deadline and not lost.is_set():
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif -delay > args.interval:
+                # Event loop tertinggal satu interval penuh: simulator jadi bottleneck
+                stats.count('late_sends')
+            frame = json.dumps(source.frame(device, next(rows), ml_mode, rng), separators=(',', ':'))
+            pending.append(time.perf_counter())
+            try:
+                await ws.send_str(frame)
+            except (aiohttp.ClientError, ConnectionError, RuntimeError):
+                pending.pop()
+                stats.count('send_errors')
+                break
+            stats.count('sent')
+            # Frame lebih tua dari ack-timeout dianggap hilang
+            now = time.perf_counter()
+            while pending and now - pending[0] > args.ack_timeout:
+                pending.popleft()
+                stats.count('dropped')
+            next_send += args.interval
+
+        # Tunggu ACK untuk frame yang masih pending
+        drain_deadline = time.perf_counter() + args.ack_timeout
+        while pending and not lost.is_set() and time.perf_counter() < drain_deadline:
+            await asyncio.sleep(0.05)
+    finally:
+        if lost.is_set():
+            stats.count('disconnected')
+        stats.count('dropped', len(pending))
+        pending.clear()
+        await ws.close()
+        receive_task.cancel()
+
+
+async def run_fleet(args, source):
+    """
+    Jalankan semua device sampai --duration (+ ramp) selesai
+
+    Returns:
+        dict laporan (FleetStats.report)
+    """
+    stats = FleetStats()
+    deadline = time.perf_counter() + args.ramp + args.duration
+    connector = aiohttp.TCPConnector(limit=0, force_close=False)
+    timeout = aiohttp.ClientTimeout(total=None, connect=args.connect_timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        tasks = [asyncio.create_task(run_device(session, args.url, i, source, stats, deadline, args))
+                 for i in range(args.devices)]
+
+        async def progress():
+            while True:
+                await asyncio.sleep(args.progress)
+                c = stats.counters
+                recent = stats.latencies[-1000:]
+                p50 = f"{np.percentile(recent, 50):.1f}" if recent else "-"
+                print(f"   [{time.perf_counter() - stats.started:6.1f}s] connected={c['connected']} "
+                      f"sent={c['sent']} acked={c['acked']} dropped={c['dropped']} "
+                      f"p50={p50} ms", flush=True)
+
+        progress_task = asyncio.create_task(progress()) if args.progress else None
+        await asyncio.gather(*tasks)
+        if progress_task:
+            progress_task.cancel()
+    return stats.report(time.perf_counter() - stats.started)
+
+
+def raise_fd_limit(needed):
+    """Naikkan soft limit file descriptor (satu socket per device)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        soft = target
+    return soft
+
+
+# ==========================================
+# Main Function
+# ==========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Asyncio ESP32 fleet load generator for server.js")
+    parser.add_argument('--url', default=DEFAULT_URL)
+    parser.add_argument('--devices', type=int, default=100)
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help="Detik antar frame per device")
+    parser.add_argument('--duration', type=float, default=60.0, help="Detik setelah ramp-up")
+    parser.add_argument('--ramp', type=float, default=10.0, help="Detik untuk connect semua device")
+    parser.add_argument('--dataset', default=DEFAULT_DATASET)
+    parser.add_argument('--model', default=None,
+                        help="Model untuk PM ml_mode (.pmb/.npz/.tflite)")
+    parser.add_argument('--ml-fraction', type=float, default=0.0,
+                        help="Fraksi device yang mengirim PM prediksi ML (butuh --model)")
+    parser.add_argument('--ack-timeout', type=float, default=DEFAULT_ACK_TIMEOUT)
+    parser.add_argument('--connect-timeout', type=float, default=15.0)
+    parser.add_argument('--prefix', default="ESP32-SIM")
+    parser.add_argument('--progress', type=float, default=5.0, help="Interval log progress (0 = off)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=REPORT_PATH)
+    args = parser.parse_args()
+
+    if args.ml_fraction and not args.model:
+        parser.error("--ml-fraction needs --model")
+
+    print("="*60)
+    print("ESP32 Fleet Simulator")
+    print("="*60)
+
+    fd_limit = raise_fd_limit(args.devices + 256)
+    if fd_limit is not None and fd_limit < args.devices + 64:
+        print(f"   ⚠️  File descriptor limit {fd_limit} < {args.devices} devices (ulimit -n)")
+
+    source = SensorSource(args.dataset, args.model, args.seed)
+    print(f"   ✅ Dataset: {args.dataset} ({sum(len(g) for g in source.groups)} rows, "
+          f"{len(source.groups)} location(s))")
+    print(f"   Target: {args.url}")
+    print(f"   Fleet: {args.devices} devices × 1 frame / {args.interval:g}s "
+          f"= {args.devices / args.interval:,.0f} frames/s, ramp {args.ramp:g}s, duration {args.duration:g}s")
+
+    try:
+        report = asyncio.run(run_fleet(args, source))
+    except KeyboardInterrupt:
+        print("\n[!] Interrupted")
+        sys.exit(1)
+
+    lat = report['latency_ms']
+    print("\n" + "="*60)
+    print("RESULTS")
+    print("="*60)
+    print(f"   Connected: {report['connected']}/{args.devices} "
+          f"(failed {report['connect_failed']}, disconnected {report['disconnected']})")
+    print(f"   Frames: sent {report['sent']}, acked {report['acked']}, "
+          f"dropped {report['dropped']} ({(report['drop_rate'] or 0):.2%})")
+    print(f"   Throughput: {report['sent_per_sec']} sent/s, {report['acked_per_sec']} acked/s")
+    if lat:
+        print(f"   Latency (ms): p50 {lat['p50']}  p90 {lat['p90']}  p99 {lat['p99']}  max {lat['max']}")
+    if report['late_sends']:
+        print(f"   ⚠️  {report['late_sends']} late sends: simulator overloaded, "
+              f"jalankan beberapa process atau naikkan --interval")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'url': args.url,
+            'devices': args.devices,
+            'interval': args.interval,
+            'duration': args.duration,
+            'ramp': args.ramp,
+            'ml_fraction': args.ml_fraction,
+            **report,
+        }, f, indent=2)
+    print(f"   ✅ Saved: {args.output}")
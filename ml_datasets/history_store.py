@@ -0,0 +1,560 @@
+"""
+History store sensor / API: append-only, dipartisi per site dan per hari
+
+Layout (satu writer, banyak reader):
+
+    raw/history/<site>/
+        daily.npy                    rollup harian (semua hari site ini)
+        <YYYY-MM-DD>/                partisi per hari (UTC)
+            seg-000001.npy           segment immutable, terurut timestamp
+            seg-000002.npy
+            hourly.npy               rollup per jam partisi ini
+
+Setiap append menulis segment baru (structured array, diurutkan dan
+di-dedup per (source, timestamp), ditulis atomic) lalu menghitung ulang
+rollup jam/hari untuk partisi yang tersentuh. Data lama tidak pernah
+diubah; compact() hanya menggabungkan segment satu partisi jadi satu
+(otomatis kalau lebih dari MAX_SEGMENTS). Duplikat (misal WAQI realtime
+yang di-fetch dua kali dalam jam yang sama) disimpan sekali: yang terakhir
+di-append yang menang.
+
+Range query hanya membuka partisi hari di dalam window (dari nama
+direktori), dan di dalam partisi memakai searchsorted pada timestamp
+(segment di-mmap), jadi "90 hari terakhir site X" tidak membaca data site
+atau hari lain.
+
+Usage:
+    python history_store.py --import-csv processed/sample_india_singapore_dataset.csv
+    python history_store.py --import-spool raw/live/sensor_spool.jsonl
+    python history_store.py --list
+    python history_store.py --query india --days 90 --rollup day
+    python train_model.py --history-site india --days 90
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+DEFAULT_ROOT = "raw/history"
+FIELDS = ('temperature', 'humidity', 'pressure', 'pm25', 'pm10', 'voc', 'eco2', 'aqi')
+SOURCES = ('sensor', 'waqi_realtime', 'waqi_daily', 'import')
+MAX_SEGMENTS = 16
+
+RECORD_DTYPE = np.dtype([('timestamp', 'M8[s]'), ('source', 'i1')] +
+                        [(f, '<f4') for f in FIELDS])
+ROLLUP_DTYPE = np.dtype([('timestamp', 'M8[s]'), ('source', 'i1'), ('count', '<i4')] +
+                        [(f"{f}_{stat}", '<f4') for f in FIELDS for stat in ('mean', 'min', 'max')])
+
+SEGMENT_RE = re.compile(r'seg-(\d+)\.npy$')
+DAY_RE = re.compile(r'\d{4}-\d{2}-\d{2}$')
+
+
+def site_key(name):
+    """Nama site aman untuk direktori: 'New Delhi' → 'new_delhi', '@1451' → '1451'"""
+    key = re.sub(r'[^a-z0-9_.-]+', '_', str(name).strip().lower()).strip('._')
+    if not key:
+        raise ValueError(f"Invalid site name: {name!r}")
+    return key
+
+
+def to_datetime64(values):
+    """
+    Timestamp → datetime64[s] UTC
+
+    Menerima datetime64, epoch detik, datetime, atau string ISO (offset
+    zona waktu seperti '+05:30' / 'Z' dikonversi ke UTC; tanpa offset
+    dianggap UTC).
+    """
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('M8[s]')
+    if np.issubdtype(values.dtype, np.number):
+        return values.astype('i8').astype('M8[s]')
+    out = np.empty(len(values), dtype='M8[s]')
+    for i, value in enumerate(values):
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.strip())
+        if isinstance(value, datetime):
+            if value.tzinfo is not None:
+                value = value.astimezone(timezone.utc).replace(tzinfo=None)
+            out[i] = np.datetime64(value, 's')
+        else:
+            out[i] = np.datetime64(value, 's')
+    return out
+
+
+def _save_atomic(path, array):
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def _dedup_sorted(records):
+    """Urutkan per timestamp; duplikat (source, timestamp) → baris terakhir"""
+    if len(records) < 2:
+        return records
+    order = np.lexsort((np.arange(len(records)), records['timestamp'], records['source']))
+    ordered = records[order]
+    same_next = ((ordered['source'][1:] == ordered['source'][:-1]) &
+                 (ordered['timestamp'][1:] == ordered['timestamp'][:-1]))
+    keep = np.append(~same_next, True)
+    unique = ordered[keep]
+    return unique[np.argsort(unique['timestamp'], kind='stable')]
+
+
+# ==========================================
+# 1. Rollups
+# ==========================================
+def compute_rollup(records, freq):
+    """
+    Count / mean / min / max per (source, periode) untuk satu partisi
+
+    NaN diabaikan per field (mean NaN kalau semua NaN dalam periode).
+    """
+    if not len(records):
+        return np.empty(0, dtype=ROLLUP_DTYPE)
+    buckets = records['timestamp'].astype(f"M8[{'h' if freq == 'hour' else 'D'}]")
+    keys = np.rec.fromarrays([records['source'], buckets])
+    unique, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    inverse = inverse.ravel()
+
+    out = np.zeros(len(unique), dtype=ROLLUP_DTYPE)
+    out['source'] = unique['f0']
+    out['timestamp'] = unique['f1'].astype('M8[s]')
+    out['count'] = counts
+    for f in FIELDS:
+        values = records[f].astype(np.float64)
+        finite = np.isfinite(values)
+        n = np.bincount(inverse[finite], minlength=len(unique))
+        total = np.bincount(inverse[finite], weights=values[finite], minlength=len(unique))
+        low = np.full(len(unique), np.inf)
+        high = np.full(len(unique), -np.inf)
+        np.minimum.at(low, inverse[finite], values[finite])
+        np.maximum.at(high, inverse[finite], values[finite])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[f"{f}_mean"] = np.where(n > 0, total / np.maximum(n, 1), np.nan)
+        out[f"{f}_min"] = np.where(n > 0, low, np.nan)
+        out[f"{f}_max"] = np.where(n > 0, high, np.nan)
+    return out
+
+
+# ==========================================
+# 2. Store
+# ==========================================
+class HistoryStore:
+    """
+    Append-only store per site × hari
+
+    Satu process writer (fetcher / importer); reader boleh paralel karena
+    semua file ditulis atomic dan segment tidak pernah diubah.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, max_segments=MAX_SEGMENTS):
+        self.root = root
+        self.max_segments = max_segments
+
+    # ---------- layout ----------
+    def site_dir(self, site):
+        return os.path.join(self.root, site_key(site))
+
+    def sites(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, name)))
+
+    def days(self, site, start=None, end=None):
+        """Partisi hari (string 'YYYY-MM-DD', urut) yang overlap [start, end)"""
+        site_dir = self.site_dir(site)
+        if not os.path.isdir(site_dir):
+            return []
+        days = sorted(name for name in os.listdir(site_dir) if DAY_RE.match(name))
+        if start is not None:
+            first = str(to_datetime64([start])[0].astype('M8[D]'))
+            days = [d for d in days if d >= first]
+        if end is not None:
+            last = str((to_datetime64([end])[0] - np.timedelta64(1, 's')).astype('M8[D]'))
+            days = [d for d in days if d <= last]
+        return days
+
+    def _segments(self, partition):
+        names = [n for n in os.listdir(partition) if SEGMENT_RE.match(n)] if os.path.isdir(partition) else []
+        return sorted(os.path.join(partition, n) for n in names)
+
+    # ---------- write ----------
+    def append_arrays(self, site, timestamps, columns, source='sensor'):
+        """
+        Append kolom (dict field → array) untuk satu site
+
+        Returns:
+            jumlah baris yang ditulis
+        """
+        timestamps = to_datetime64(timestamps)
+        n = len(timestamps)
+        if n == 0:
+            return 0
+        records = np.zeros(n, dtype=RECORD_DTYPE)
+        records['timestamp'] = timestamps
+        records['source'] = SOURCES.index(source)
+        for f in FIELDS:
+            values = columns.get(f)
+            records[f] = np.nan if values is None else np.asarray(values, dtype=np.float64)
+        records = records[~np.isnat(records['timestamp'])]
+
+        site_dir = self.site_dir(site)
+        days = records['timestamp'].astype('M8[D]')
+        touched = []
+        for day in np.unique(days):
+            partition = os.path.join(site_dir, str(day))
+            os.makedirs(partition, exist_ok=True)
+            segments = self._segments(partition)
+            seq = int(SEGMENT_RE.search(segments[-1]).group(1)) + 1 if segments else 1
+            _save_atomic(os.path.join(partition, f"seg-{seq:06d}.npy"), _dedup_sorted(records[days == day]))
+            if len(segments) + 1 > self.max_segments:
+                self.compact_partition(partition)
+            touched.append(str(day))
+        self._update_rollups(site, touched)
+        return len(records)
+
+    def append(self, site, records, source='sensor'):
+        """Append list of dict (key 'timestamp' + FIELDS, field lain diabaikan)"""
+        records = list(records)
+        if not records:
+            return 0
+        columns = {f: [_number(r.get(f)) for r in records] for f in FIELDS}
+        return self.append_arrays(site, [r['timestamp'] for r in records], columns, source)
+
+    def append_waqi(self, records):
+        """Record dari waqi_fetcher.parse_feed; site = nama station"""
+        written = 0
+        groups = {}
+        for record in records:
+            source = 'waqi_daily' if record.get('kind') == 'daily' else 'waqi_realtime'
+            groups.setdefault((record['station'], source), []).append(record)
+        for (station, source), rows in groups.items():
+            written += self.append(station, rows, source)
+        return written
+
+    def compact_partition(self, partition):
+        """Gabung semua segment partisi jadi satu (sorted, dedup)"""
+        segments = self._segments(partition)
+        if len(segments) <= 1:
+            return
+        merged = _dedup_sorted(np.concatenate([np.load(path) for path in segments]))
+        seq = int(SEGMENT_RE.search(segments[-1]).group(1)) + 1
+        _save_atomic(os.path.join(partition, f"seg-{seq:06d}.npy"), merged)
+        for path in segments:
+            os.remove(path)
+
+    def compact(self, site=None):
+        for name in ([site_key(site)] if site else self.sites()):
+            for day in self.days(name):
+                self.compact_partition(os.path.join(self.site_dir(name), day))
+
+    def _update_rollups(self, site, days):
+        site_dir = self.site_dir(site)
+        daily_rows = []
+        for day in days:
+            partition = os.path.join(site_dir, day)
+            records = self._read_partition(partition)
+            _save_atomic(os.path.join(partition, "hourly.npy"), compute_rollup(records, 'hour'))
+            daily_rows.append(compute_rollup(records, 'day'))
+
+        daily_path = os.path.join(site_dir, "daily.npy")
+        daily = np.load(daily_path) if os.path.exists(daily_path) else np.empty(0, dtype=ROLLUP_DTYPE)
+        touched = np.array(days, dtype='M8[D]')
+        daily = daily[~np.isin(daily['timestamp'].astype('M8[D]'), touched)]
+        daily = np.concatenate([daily] + daily_rows)
+        _save_atomic(daily_path, daily[np.argsort(daily['timestamp'], kind='stable')])
+
+    # ---------- read ----------
+    def _read_partition(self, partition):
+        for _ in range(3):
+            segments = self._segments(partition)
+            try:
+                if len(segments) == 1:
+                    return np.load(segments[0], mmap_mode='r')
+                if not segments:
+                    return np.empty(0, dtype=RECORD_DTYPE)
+                return _dedup_sorted(np.concatenate([np.load(path) for path in segments]))
+            except FileNotFoundError:
+                # Segment dihapus compaction di tengah baca: ulang
+                continue
+        raise RuntimeError(f"Partition keeps changing: {partition}")
+
+    def query(self, site, start=None, end=None, fields=FIELDS, source=None):
+        """
+        Data satu site dalam [start, end) sebagai dict NumPy array
+
+        Args:
+            source: nama source (misal 'sensor'), None = semua
+
+        Returns:
+            {'timestamp': datetime64[s], 'source': int8, field: float32 ...}
+        """
+        lo = to_datetime64([start])[0] if start is not None else None
+        hi = to_datetime64([end])[0] if end is not None else None
+        parts = []
+        for day in self.days(site, start, end):
+            records = self._read_partition(os.path.join(self.site_dir(site), day))
+            ts = records['timestamp']
+            i = np.searchsorted(ts, lo, 'left') if lo is not None else 0
+            j = np.searchsorted(ts, hi, 'left') if hi is not None else len(records)
+            chunk = records[i:j]
+            if source is not None:
+                chunk = chunk[chunk['source'] == SOURCES.index(source)]
+            parts.append(chunk)
+        records = np.concatenate(parts) if parts else np.empty(0, dtype=RECORD_DTYPE)
+        out = {'timestamp': np.array(records['timestamp']), 'source': np.array(records['source'])}
+        for f in fields:
+            out[f] = np.array(records[f])
+        return out
+
+    def last(self, site, days=90, end=None, **kwargs):
+        """Query `days` hari terakhir (sampai end, default sekarang)"""
+        end = to_datetime64([end])[0] if end is not None else np.datetime64(
+            datetime.now(timezone.utc).replace(tzinfo=None), 's') + np.timedelta64(1, 's')
+        return self.query(site, end - np.timedelta64(days, 'D'), end, **kwargs)
+
+    def window(self, site, days=90, end=None):
+        """
+        Window [start, end) `days` hari, default berakhir di akhir hari data terakhir
+
+        End di-align ke batas hari supaya export_cache() dengan window yang
+        sama menghasilkan cache key yang sama antar run.
+
+        Returns:
+            (start, end) datetime64[s], atau None kalau site belum punya data
+        """
+        if end is None:
+            partitions = self.days(site)
+            if not partitions:
+                return None
+            end = np.datetime64(partitions[-1], 'D') + np.timedelta64(1, 'D')
+        end = to_datetime64([end])[0]
+        return end - np.timedelta64(days, 'D'), end
+
+    def rollup(self, site, freq='hour', start=None, end=None, source=None):
+        """
+        Rollup precomputed ('hour' atau 'day') dalam [start, end)
+
+        Returns:
+            structured array ROLLUP_DTYPE
+        """
+        if freq == 'day':
+            path = os.path.join(self.site_dir(site), "daily.npy")
+            rows = np.load(path) if os.path.exists(path) else np.empty(0, dtype=ROLLUP_DTYPE)
+        elif freq == 'hour':
+            parts = []
+            for day in self.days(site, start, end):
+                path = os.path.join(self.site_dir(site), day, "hourly.npy")
+                if os.path.exists(path):
+                    parts.append(np.load(path))
+            rows = np.concatenate(parts) if parts else np.empty(0, dtype=ROLLUP_DTYPE)
+        else:
+            raise ValueError(f"freq must be 'hour' or 'day', got {freq!r}")
+        mask = np.ones(len(rows), dtype=bool)
+        if start is not None:
+            mask &= rows['timestamp'] >= to_datetime64([start])[0]
+        if end is not None:
+            mask &= rows['timestamp'] < to_datetime64([end])[0]
+        if source is not None:
+            mask &= rows['source'] == SOURCES.index(source)
+        return rows[mask]
+
+    def stats(self):
+        """{site: {'days', 'segments', 'rows', 'first', 'last'}}"""
+        out = {}
+        for site in self.sites():
+            days = self.days(site)
+            segments = sum(len(self._segments(os.path.join(self.site_dir(site), d))) for d in days)
+            daily = self.rollup(site, 'day')
+            out[site] = {
+                'days': len(days),
+                'segments': segments,
+                'rows': int(daily['count'].sum()),
+                'first': days[0] if days else None,
+                'last': days[-1] if days else None,
+            }
+        return out
+
+    # ---------- export ----------
+    def export_cache(self, site, start=None, end=None, source=None, cache_root=None):
+        """
+        Tulis window sebagai columnar cache (format dataset_cache) untuk training
+
+        Cache key = site + window + daftar segment partisi, jadi export
+        ulang hanya kalau ada data baru di window tersebut.
+
+        Returns:
+            path direktori cache (dipakai train_model.py / sweep.py)
+        """
+        from data_pipeline import FEATURES, TARGETS
+        from dataset_cache import CACHE_DIR, write_columns
+
+        cache_root = cache_root or CACHE_DIR
+        key_parts = [site_key(site), str(start), str(end), str(source)]
+        for day in self.days(site, start, end):
+            for path in self._segments(os.path.join(self.site_dir(site), day)):
+                key_parts.append(f"{day}/{os.path.basename(path)}:{os.path.getsize(path)}")
+        key = hashlib.sha256("|".join(key_parts).encode()).hexdigest()[:16]
+        cache_dir = os.path.join(cache_root, f"history-{site_key(site)}-{key}")
+        if os.path.exists(os.path.join(cache_dir, "meta.json")):
+            return cache_dir
+
+        data = self.query(site, start, end, source=source)
+        n = len(data['timestamp'])
+        columns = {'timestamp': data['timestamp'].astype('M8[ns]')}
+        for name in FEATURES + TARGETS + ['voc', 'eco2']:
+            columns[name] = data[name].astype(np.float32)
+        columns['location'] = np.zeros(n, dtype=np.int32)
+        return write_columns(
+            cache_dir, columns,
+            source={'history': os.path.abspath(self.root), 'site': site_key(site),
+                    'start': str(start), 'end': str(end), 'source': source},
+            categories={'location': [site_key(site)]},
+        )
+
+
+def _number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+# ==========================================
+# 3. Importers
+# ==========================================
+def import_csv(store, path, site_column='location', site=None, source='import'):
+    """
+    Import CSV (lewat columnar cache) ke store, satu site per nilai site_column
+
+    Returns:
+        dict {site: rows}
+    """
+    from dataset_cache import build_cache, load_dir
+
+    columns, meta = load_dir(build_cache(path))
+    timestamps = np.asarray(columns['timestamp'])
+    fields = {f: np.asarray(columns[f]) for f in FIELDS if f in columns}
+    if site is not None or site_column not in columns:
+        groups = {site or os.path.splitext(os.path.basename(path))[0]: slice(None)}
+    else:
+        codes = np.asarray(columns[site_column])
+        categories = meta['columns'][site_column].get('categories')
+        groups = {(categories[int(c)] if categories else str(c)): codes == c for c in np.unique(codes)}
+
+    written = {}
+    for name, rows in groups.items():
+        written[site_key(name)] = store.append_arrays(
+            name, timestamps[rows], {f: v[rows] for f, v in fields.items()}, source)
+    return written
+
+
+def import_spool(store, path, chunk_rows=100_000):
+    """
+    Import spool JSONL server.js (satu site per device)
+
+    Returns:
+        dict {site: rows}
+    """
+    written = {}
+
+    def flush(batch):
+        by_device = {}
+        for record in batch:
+            by_device.setdefault(record.get('device') or 'unknown', []).append(record)
+        for device, records in by_device.items():
+            key = site_key(device)
+            written[key] = written.get(key, 0) + store.append(device, records, 'sensor')
+
+    batch = []
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and record.get('timestamp'):
+                batch.append(record)
+            if len(batch) >= chunk_rows:
+                flush(batch)
+                batch = []
+    if batch:
+        flush(batch)
+    return written
+
+
+# ==========================================
+# Main Function
+# ==========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Append-only partitioned sensor history store")
+    parser.add_argument('--root', default=DEFAULT_ROOT)
+    parser.add_argument('--import-csv', default=None, help="CSV (timestamp + fields [+ location])")
+    parser.add_argument('--site-column', default='location')
+    parser.add_argument('--site', default=None, help="Site untuk semua baris --import-csv")
+    parser.add_argument('--import-spool', default=None, help="Spool JSONL dari server.js")
+    parser.add_argument('--compact', action='store_true')
+    parser.add_argument('--list', action='store_true')
+    parser.add_argument('--query', default=None, help="Site untuk range query")
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--end', default=None, help="Akhir window (ISO), default: data terakhir site")
+    parser.add_argument('--rollup', choices=['hour', 'day'], default=None)
+    parser.add_argument('--export', action='store_true', help="Export --query window ke columnar cache")
+    args = parser.parse_args()
+
+    store = HistoryStore(args.root)
+
+    if args.import_csv or args.import_spool:
+        start = time.perf_counter()
+        if args.import_csv:
+            written = import_csv(store, args.import_csv, args.site_column, args.site)
+        else:
+            written = import_spool(store, args.import_spool)
+        for site, rows in sorted(written.items()):
+            print(f"   ✅ {site}: {rows:,} rows")
+        print(f"   Imported in {time.perf_counter() - start:.2f}s → {args.root}")
+
+    if args.compact:
+        store.compact()
+        print("   ✅ Compacted")
+
+    if args.list:
+        stats = store.stats()
+        print(f"{'site':<24}{'days':>6}{'segments':>10}{'rows':>12}  range")
+        for site, s in stats.items():
+            print(f"{site:<24}{s['days']:>6}{s['segments']:>10}{s['rows']:>12,}  {s['first']} → {s['last']}")
+
+    if args.query:
+        window = store.window(args.query, args.days, args.end)
+        if window is None:
+            print(f"❌ No data for site {args.query}")
+            sys.exit(1)
+        start64, end64 = window
+        t0 = time.perf_counter()
+        if args.rollup:
+            rows = store.rollup(args.query, args.rollup, start64, end64)
+            elapsed = (time.perf_counter() - t0) * 1000
+            print(f"   {len(rows)} {args.rollup} rollup rows in {elapsed:.1f} ms")
+            for row in rows[-5:]:
+                print(f"   {row['timestamp']} {SOURCES[row['source']]:<14} n={row['count']:<6} "
+                      f"PM2.5 {row['pm25_mean']:.1f} [{row['pm25_min']:.1f}, {row['pm25_max']:.1f}]")
+        else:
+            data = store.query(args.query, start64, end64)
+            elapsed = (time.perf_counter() - t0) * 1000
+            print(f"   {len(data['timestamp']):,} rows {start64} → {end64} in {elapsed:.1f} ms "
+                  f"({len(store.days(args.query, start64, end64))} partitions)")
+        if args.export:
+            print(f"   ✅ Cache: {store.export_cache(args.query, start64, end64)}")
@@ -0,0 +1,181 @@
+"""
+Instrumentation ringan untuk pipeline ML (timing + memory per stage)
+
+Setiap stage mencatat wall time, CPU time, RSS sebelum/sesudah (dan
+selisihnya) serta peak RSS proses. ru_maxrss adalah peak sepanjang umur
+proses, jadi per stage dicatat sebagai peak_rss_mb_cumulative plus
+peak_rss_mb_increase (berapa stage ini menaikkan peak; 0 kalau peak
+berasal dari stage sebelumnya). Di akhir run, report JSON ditulis ke
+models/ dan satu baris ditambahkan ke models/run_history.jsonl untuk
+tracking regresi antar retrain.
+
+Environment variables:
+    PIPELINE_PROFILE=1       dump cProfile per stage ke models/profiles/
+    PIPELINE_TRACEMALLOC=1   tracemalloc peak per stage (opt-in, memperlambat
+                             setiap alokasi Python)
+
+Usage:
+    report = RunReport("train_model")
+    with report.stage("load"):
+        ...
+    report.write()
+"""
+
+import cProfile
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+REPORT_DIR = "models"
+HISTORY_FILE = "run_history.jsonl"
+PROFILE_DIR = os.path.join(REPORT_DIR, "profiles")
+
+
+def _env_flag(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in ('', '0', 'false', 'no')
+
+
+def peak_rss_mb():
+    """Peak RSS proses sejauh ini (MB), None kalau tidak tersedia"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KB, macOS: bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def current_rss_mb():
+    """RSS saat ini (MB) dari /proc, None kalau tidak tersedia"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class RunReport:
+    """Kumpulan stage metrics untuk satu run script"""
+
+    def __init__(self, script, report_dir=REPORT_DIR, profile=None, trace_malloc=None):
+        self.script = script
+        self.report_dir = report_dir
+        self.profile = _env_flag('PIPELINE_PROFILE', False) if profile is None else profile
+        self.trace_malloc = (_env_flag('PIPELINE_TRACEMALLOC', False)
+                             if trace_malloc is None else trace_malloc)
+        self.started = datetime.now()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        self.stages = []
+        self.extra = {}
+        if self.trace_malloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        """Context manager yang mengukur satu stage pipeline"""
+        profiler = cProfile.Profile() if self.profile else None
+        if self.trace_malloc:
+            tracemalloc.reset_peak()
+        rss_before = current_rss_mb()
+        peak_before = peak_rss_mb()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        if profiler:
+            profiler.enable()
+        status = 'ok'
+        try:
+            yield
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            if profiler:
+                profiler.disable()
+            rss_after, peak_after = current_rss_mb(), peak_rss_mb()
+            record = {
+                'name': name,
+                'status': status,
+                'wall_seconds': round(time.perf_counter() - wall, 6),
+                'cpu_seconds': round(time.process_time() - cpu, 6),
+                'rss_mb_before': _round(rss_before),
+                'rss_mb_after': _round(rss_after),
+                'rss_mb_delta': _round(_diff(rss_after, rss_before)),
+                'peak_rss_mb_cumulative': _round(peak_after),
+                'peak_rss_mb_increase': _round(_diff(peak_after, peak_before)),
+            }
+            if self.trace_malloc:
+                record['tracemalloc_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 3)
+            if profiler:
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                path = os.path.join(PROFILE_DIR, f"{self.script}-{name}.prof")
+                profiler.dump_stats(path)
+                record['profile'] = path
+            self.stages.append(record)
+
+    def to_dict(self):
+        return {
+            'script': self.script,
+            'started': self.started.isoformat(timespec='seconds'),
+            'total_wall_seconds': round(time.perf_counter() - self._start_wall, 6),
+            'total_cpu_seconds': round(time.process_time() - self._start_cpu, 6),
+            'peak_rss_mb': _round(peak_rss_mb()),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'argv': sys.argv[1:],
+            'stages': self.stages,
+            **self.extra,
+        }
+
+    def write(self):
+        """
+        Tulis models/run_report_<script>.json dan append ke run_history.jsonl
+
+        Returns:
+            path report JSON
+        """
+        os.makedirs(self.report_dir, exist_ok=True)
+        report = self.to_dict()
+        path = os.path.join(self.report_dir, f"run_report_{self.script}.json")
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        with open(os.path.join(self.report_dir, HISTORY_FILE), 'a') as f:
+            f.write(json.dumps(report) + "\n")
+        return path
+
+    def summary(self):
+        """Tabel ringkas per stage untuk dicetak di akhir script"""
+        lines = [f"   {'stage':<16}{'wall s':>9}{'cpu s':>9}{'Δ RSS':>9}{'peak +':>9}"
+                 f"{'peak cum':>10}{'py peak':>9}"]
+        for s in self.stages:
+            lines.append(
+                f"   {s['name']:<16}{s['wall_seconds']:>9.2f}{s['cpu_seconds']:>9.2f}"
+                f"{_fmt_mb(s['rss_mb_delta']):>9}{_fmt_mb(s['peak_rss_mb_increase']):>9}"
+                f"{_fmt_mb(s['peak_rss_mb_cumulative']):>10}{_fmt_mb(s.get('tracemalloc_peak_mb')):>9}"
+            )
+        return "\n".join(lines)
+
+
+def _diff(after, before):
+    return None if after is None or before is None else after - before
+
+
+def _round(value, digits=2):
+    return None if value is None else round(value, digits)
+
+
+def _fmt_mb(value):
+    return "-" if value is None else f"{value:.0f}MB"
@@ -0,0 +1,440 @@
+"""
+Lookup-table surrogate PM predictor (grid 3-D + interpolasi trilinear)
+
+Model hanya punya tiga input yang terbatas (firmware meng-clamp ke
+TEMP_MIN..TEMP_MAX, HUM_MIN..HUM_MAX, PRESS_MIN..PRESS_MAX), jadi seluruh
+network bisa ditabulasi. Generator mengevaluasi model di semua titik grid
+dalam satu batch, lalu menyimpan hasilnya sebagai tabel int16 (scale +
+offset per output) atau float16. Prediksi = interpolasi trilinear 8 titik
+grid terdekat: waktu konstan, tanpa matmul, sama untuk model sebesar apa
+pun.
+
+Input di luar grid di-clamp ke tepi grid (sama dengan firmware). Error
+interpolasi maksimum terhadap model penuh dilaporkan di titik acak dan di
+pusat setiap cell grid (biasanya titik error terbesar).
+
+Format .lut (npz tanpa pickle, extension sendiri supaya tidak tertukar
+dengan weights NumpyPredictor):
+    table           (n_t, n_h, n_p, 2) int16 atau float16
+    lo, hi          batas grid per input (satuan asli)
+    y_offset, y_scale   y = table * y_scale + y_offset (float16: 0 dan 1)
+
+Usage:
+    python lut_surrogate.py                              # models/pm_predictor_weights.npz → models/pm_predictor.lut
+    python lut_surrogate.py --grid 49,49,26 --dtype float16
+    python lut_surrogate.py --range training --c-out ../pm_lut.h
+    python batch_inference.py --model models/pm_predictor.lut ...
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from export_c_header import c_array, c_float, compile_and_run
+from numpy_predictor import DEFAULT_WEIGHTS
+
+DEFAULT_LUT = "models/pm_predictor.lut"
+DEFAULT_C_OUTPUT = "../pm_lut.h"
+DEFAULT_GRID = (37, 32, 26)
+
+# Sama dengan konstanta clamp di esp32_production_working_ml.ino
+FIRMWARE_RANGE = ((11.0, 47.0), (15.0, 108.0), (1000.0, 1025.0))
+
+INPUT_NAMES = ('temperature', 'humidity', 'pressure')
+OUTPUT_NAMES = ('pm25', 'pm10')
+
+# 8 sudut cell (di, dj, dk) dengan pressure paling cepat berubah
+CORNERS = tuple((di, dj, dk) for di in (0, 1) for dj in (0, 1) for dk in (0, 1))
+
+
+# ==========================================
+# 1. Generator
+# ==========================================
+def grid_axes(lo, hi, grid):
+    """Titik grid per input (linspace, termasuk kedua ujung)"""
+    return [np.linspace(l, h, n, dtype=np.float64) for l, h, n in zip(lo, hi, grid)]
+
+
+def evaluate_grid(predictor, lo, hi, grid):
+    """
+    Evaluasi model di semua titik grid dalam satu batch
+
+    Returns:
+        array float32 (n_t, n_h, n_p, 2)
+    """
+    axes = grid_axes(lo, hi, grid)
+    mesh = np.meshgrid(*axes, indexing='ij')
+    X = np.stack([m.ravel() for m in mesh], axis=1).astype(np.float32)
+    y = np.asarray(predictor.predict(X), dtype=np.float32)
+    return y.reshape(*grid, y.shape[1])
+
+
+def quantize_table(values, dtype='int16'):
+    """
+    Kompres tabel float32
+
+    int16: affine per output, y = q * scale + offset (error ≤ scale / 2)
+
+    Returns:
+        (table, y_offset, y_scale)
+    """
+    n_out = values.shape[-1]
+    if dtype == 'float16':
+        return (values.astype(np.float16), np.zeros(n_out, dtype=np.float32),
+                np.ones(n_out, dtype=np.float32))
+    if dtype != 'int16':
+        raise ValueError(f"dtype must be 'int16' or 'float16', got {dtype!r}")
+    flat = values.reshape(-1, n_out)
+    y_min, y_max = flat.min(axis=0), flat.max(axis=0)
+    scale = np.where(y_max > y_min, (y_max - y_min) / 65534.0, 1.0).astype(np.float32)
+    offset = ((y_max + y_min) / 2).astype(np.float32)
+    q = np.clip(np.round((values - offset) / scale), -32767, 32767).astype(np.int16)
+    return q, offset, scale
+
+
+def build_lut(predictor, lo, hi, grid=DEFAULT_GRID, dtype='int16'):
+    """Tabulasi predictor → LutPredictor"""
+    grid = tuple(int(n) for n in grid)
+    if len(grid) != 3 or min(grid) < 2:
+        raise ValueError(f"grid needs 3 axes with ≥ 2 points each, got {grid}")
+    table, offset, scale = quantize_table(evaluate_grid(predictor, lo, hi, grid), dtype)
+    return LutPredictor(table, lo, hi, offset, scale)
+
+
+# ==========================================
+# 2. Trilinear Inference (NumPy)
+# ==========================================
+class LutPredictor:
+    """
+    Prediksi via interpolasi trilinear pada tabel grid
+
+    Interface sama dengan NumpyPredictor (predict(X) dalam satuan asli),
+    jadi bisa dipakai batch_inference.py / model_server.py.
+    """
+
+    kind = 'lut'
+    n_inputs = len(INPUT_NAMES)
+
+    def __init__(self, table, lo, hi, y_offset, y_scale):
+        self.table = np.asarray(table)
+        self.lo = np.asarray(lo, dtype=np.float32)
+        self.hi = np.asarray(hi, dtype=np.float32)
+        self.y_offset = np.asarray(y_offset, dtype=np.float32)
+        self.y_scale = np.asarray(y_scale, dtype=np.float32)
+        self.grid = np.array(self.table.shape[:3])
+        self.inv_step = ((self.grid - 1) / (self.hi - self.lo)).astype(np.float32)
+        self._coef = self._cell_coefficients()
+        self._pos_max = (self.grid - 1).astype(np.float32)
+        self._cell_max = (self.grid - 2).astype(np.int32)
+        self._cell_strides = [np.int32((self.grid[1] - 1) * (self.grid[2] - 1)),
+                              np.int32(self.grid[2] - 1)]
+
+    def _cell_coefficients(self):
+        """
+        Koefisien trilinear per cell (di RAM, float32, sudah di-dequantize)
+
+        f = Σ coef[k] · basis[k], basis = [1, p, h, hp, t, tp, th, thp]
+        (t, h, p = fraksi dalam cell). Satu gather baris kontigu per sample,
+        bukan 8 gather terpisah.
+
+        Returns:
+            array (n_cells, 8, n_outputs)
+        """
+        values = self.table.astype(np.float32) * self.y_scale + self.y_offset
+        n_t, n_h, n_p = self.grid
+        v = [values[di:n_t - 1 + di, dj:n_h - 1 + dj, dk:n_p - 1 + dk] for di, dj, dk in CORNERS]
+        v000, v001, v010, v011, v100, v101, v110, v111 = v
+        coef = np.stack([
+            v000,
+            v001 - v000,
+            v010 - v000,
+            v011 - v010 - v001 + v000,
+            v100 - v000,
+            v101 - v100 - v001 + v000,
+            v110 - v100 - v010 + v000,
+            v111 - v110 - v101 - v011 + v100 + v010 + v001 - v000,
+        ], axis=3)
+        return np.ascontiguousarray(coef.reshape(-1, 8, values.shape[-1]))
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes
+
+    @classmethod
+    def load(cls, path=DEFAULT_LUT):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['table'], data['lo'], data['hi'], data['y_offset'], data['y_scale'])
+
+    def save(self, path=DEFAULT_LUT, **info):
+        """Tulis .lut secara atomic (tmp + rename)"""
+        tmp = path + ".tmp"
+        with open(tmp, 'wb') as f:
+            np.savez(f, table=self.table, lo=self.lo, hi=self.hi,
+                     y_offset=self.y_offset, y_scale=self.y_scale,
+                     **{k: np.asarray(v) for k, v in info.items()})
+        os.replace(tmp, path)
+        return path
+
+    def predict(self, X):
+        """
+        Prediksi PM2.5/PM10 dari array (n, 3) temperature, humidity, pressure
+
+        Returns:
+            array (n, 2) float32 [pm25, pm10]
+        """
+        X = np.asarray(X, dtype=np.float32).reshape(-1, self.n_inputs)
+        pos = X - self.lo
+        pos *= self.inv_step
+        # Clamp ke grid; fmax(NaN, 0) = 0
+        np.fmax(pos, 0, out=pos)
+        np.fmin(pos, self._pos_max, out=pos)
+        i0 = pos.astype(np.int32)
+        np.minimum(i0, self._cell_max, out=i0)
+        pos -= i0
+        cell = i0[:, 0] * self._cell_strides[0]
+        cell += i0[:, 1] * self._cell_strides[1]
+        cell += i0[:, 2]
+
+        basis = np.empty((len(X), 8), dtype=np.float32)
+        basis[:, 0] = 1
+        basis[:, 1] = pos[:, 2]
+        basis[:, 2] = pos[:, 1]
+        np.multiply(pos[:, 1], pos[:, 2], out=basis[:, 3])
+        np.multiply(basis[:, :4], pos[:, :1], out=basis[:, 4:])
+        return np.einsum('nk,nko->no', basis, np.take(self._coef, cell, axis=0))
+
+
+# ==========================================
+# 3. Error Report
+# ==========================================
+def interpolation_error(lut, predictor, samples=1_000_000, seed=0, chunk=1_000_000):
+    """
+    Error LUT terhadap model penuh
+
+    Dicek di `samples` titik acak uniform di dalam grid dan di pusat setiap
+    cell grid (worst case interpolasi untuk fungsi yang melengkung).
+
+    Returns:
+        dict max / p99 / mean |Δ| per output (µg/m³)
+    """
+    rng = np.random.default_rng(seed)
+    lo, hi = lut.lo.astype(np.float64), lut.hi.astype(np.float64)
+    axes = grid_axes(lo, hi, lut.grid)
+    centers = np.meshgrid(*[(a[:-1] + a[1:]) / 2 for a in axes], indexing='ij')
+    X_centers = np.stack([m.ravel() for m in centers], axis=1).astype(np.float32)
+
+    errors = []
+    for start in range(0, samples, chunk):
+        n = min(chunk, samples - start)
+        X = (lo + rng.random((n, 3)) * (hi - lo)).astype(np.float32)
+        errors.append(np.abs(lut.predict(X) - predictor.predict(X)))
+    for start in range(0, len(X_centers), chunk):
+        X = X_centers[start:start + chunk]
+        errors.append(np.abs(lut.predict(X) - predictor.predict(X)))
+    errors = np.concatenate(errors)
+
+    report = {}
+    for i, name in enumerate(OUTPUT_NAMES):
+        report[f'max_abs_err_{name}'] = float(errors[:, i].max())
+        report[f'p99_abs_err_{name}'] = float(np.percentile(errors[:, i], 99))
+        report[f'mean_abs_err_{name}'] = float(errors[:, i].mean())
+    report['points'] = len(errors)
+    return report
+
+
+# ==========================================
+# 4. C Export
+# ==========================================
+HALF_TO_FLOAT = r"""static inline float pm_lut_value(uint16_t h) {
+  uint32_t sign = (uint32_t)(h & 0x8000u) << 16;
+  uint32_t exp = (h >> 10) & 0x1Fu;
+  uint32_t mant = h & 0x3FFu;
+  uint32_t bits;
+  if (exp == 0) {
+    float f = (float)mant * 5.9604645e-8f;  // subnormal / nol
+    return sign ? -f : f;
+  }
+  bits = sign | (exp == 31 ? 0x7F800000u : (exp + 112u) << 23) | (mant << 13);
+  float f;
+  memcpy(&f, &bits, sizeof f);
+  return f;
+}
+"""
+
+CHECK_MAIN = r"""
+#include <stdint.h>
+#include <stdio.h>
+#include "pm_lut.h"
+
+int main(void) {
+  float in[3], out[2];
+  while (fread(in, sizeof(float), 3, stdin) == 3) {
+    pm_lut_predict(in[0], in[1], in[2], &out[0], &out[1]);
+    fwrite(out, sizeof(float), 2, stdout);
+  }
+  return 0;
+}
+"""
+
+
+def generate_header(lut, source=DEFAULT_LUT):
+    """
+    Buat isi pm_lut.h: tabel const (flash) + pm_lut_predict()
+
+    Signature sama dengan pm_model_predict() di pm_model.h.
+
+    Returns:
+        string source code C
+    """
+    half = lut.table.dtype == np.float16
+    n_t, n_h, n_p = (int(n) for n in lut.grid)
+    out = []
+    out.append("// Auto-generated by ml_datasets/lut_surrogate.py - DO NOT EDIT\n")
+    out.append(f"// Source: {source}\n")
+    out.append(f"// Grid: {n_t}x{n_h}x{n_p} ({'float16' if half else 'int16'}, "
+               f"{lut.nbytes} bytes), trilinear interpolation\n")
+    out.append("#ifndef PM_LUT_H\n#define PM_LUT_H\n\n#include <stdint.h>\n")
+    out.append("#include <string.h>\n\n" if half else "\n")
+    for i, name in enumerate(INPUT_NAMES):
+        out.append(f"#define PM_LUT_{name.upper()}_MIN {c_float(lut.lo[i])}\n")
+        out.append(f"#define PM_LUT_{name.upper()}_MAX {c_float(lut.hi[i])}\n")
+    out.append(f"#define PM_LUT_NT {n_t}\n#define PM_LUT_NH {n_h}\n#define PM_LUT_NP {n_p}\n\n")
+    out.append(c_array('float', 'PM_LUT_LO', lut.lo))
+    out.append(c_array('float', 'PM_LUT_INV_STEP', lut.inv_step))
+    out.append(c_array('float', 'PM_LUT_Y_SCALE', lut.y_scale))
+    out.append(c_array('float', 'PM_LUT_Y_OFFSET', lut.y_offset))
+    if half:
+        out.append(c_array('uint16_t', 'PM_LUT_TABLE', lut.table.view(np.uint16), per_line=12))
+        out.append("\n" + HALF_TO_FLOAT)
+    else:
+        out.append(c_array('int16_t', 'PM_LUT_TABLE', lut.table, per_line=12))
+        out.append("\n#define pm_lut_value(q) ((float)(q))\n")
+    out.append(r"""
+// Posisi pada satu sumbu: index cell (0..n-2) + fraksi, input di-clamp ke grid
+static inline int pm_lut_axis(float v, int i, int n, float *frac) {
+  float pos = (v - PM_LUT_LO[i]) * PM_LUT_INV_STEP[i];
+  if (!(pos > 0.0f)) pos = 0.0f;  // juga NaN
+  if (pos > (float)(n - 1)) pos = (float)(n - 1);
+  int k = (int)pos;
+  if (k > n - 2) k = n - 2;
+  *frac = pos - (float)k;
+  return k;
+}
+
+// Prediksi PM2.5/PM10 (µg/m³) dari temperature (°C), humidity (%), pressure (hPa)
+static inline void pm_lut_predict(float temperature, float humidity, float pressure,
+                                  float *pm25, float *pm10) {
+  float ft, fh, fp, out[2];
+  int i = pm_lut_axis(temperature, 0, PM_LUT_NT, &ft);
+  int j = pm_lut_axis(humidity, 1, PM_LUT_NH, &fh);
+  int k = pm_lut_axis(pressure, 2, PM_LUT_NP, &fp);
+  for (int o = 0; o < 2; o++) {
+#define V(a, b, c) pm_lut_value(PM_LUT_TABLE[i + (a)][j + (b)][k + (c)][o])
+    float c00 = V(0, 0, 0) + (V(0, 0, 1) - V(0, 0, 0)) * fp;
+    float c01 = V(0, 1, 0) + (V(0, 1, 1) - V(0, 1, 0)) * fp;
+    float c10 = V(1, 0, 0) + (V(1, 0, 1) - V(1, 0, 0)) * fp;
+    float c11 = V(1, 1, 0) + (V(1, 1, 1) - V(1, 1, 0)) * fp;
+#undef V
+    float c0 = c00 + (c01 - c00) * fh;
+    float c1 = c10 + (c11 - c10) * fh;
+    out[o] = (c0 + (c1 - c0) * ft) * PM_LUT_Y_SCALE[o] + PM_LUT_Y_OFFSET[o];
+  }
+  *pm25 = out[0];
+  *pm10 = out[1];
+}
+
+#endif  // PM_LUT_H
+""")
+    return ''.join(out)
+
+
+def _time_per_row(predict, X, repeats=3):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict(X)
+        best = min(best, time.perf_counter() - start)
+    return best / len(X) * 1e9
+
+
+# ==========================================
+# Main Function
+# ==========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tabulate the PM predictor as a 3-D lookup table")
+    parser.add_argument('--model', default=DEFAULT_WEIGHTS,
+                        help="Model sumber (.pmb / .npz / .tflite, lihat batch_inference.py)")
+    parser.add_argument('--out', default=DEFAULT_LUT)
+    parser.add_argument('--grid', default=','.join(map(str, DEFAULT_GRID)),
+                        help="Jumlah titik grid temperature,humidity,pressure")
+    parser.add_argument('--dtype', choices=('int16', 'float16'), default='int16')
+    parser.add_argument('--range', choices=('firmware', 'training'), default='firmware',
+                        help="Batas grid: clamp firmware atau data_min/max scaler training")
+    parser.add_argument('--samples', type=int, default=1_000_000,
+                        help="Titik acak untuk error report")
+    parser.add_argument('--c-out', default=None, help=f"Tulis C header (misal {DEFAULT_C_OUTPUT})")
+    args = parser.parse_args()
+
+    from batch_inference import load_predictor
+
+    print("="*60)
+    print("Lookup-Table Surrogate for PM Predictor")
+    print("="*60)
+
+    if not os.path.exists(args.model):
+        print(f"❌ Model not found: {args.model}")
+        print("   Run train_model.py first!")
+        sys.exit(1)
+    predictor = load_predictor(args.model)
+    if hasattr(predictor, 'weights') and predictor.weights[0].shape[0] != len(INPUT_NAMES):
+        print(f"❌ Lookup table supports {len(INPUT_NAMES)}-input models only "
+              f"(got {predictor.weights[0].shape[0]}, trained with --features?)")
+        sys.exit(1)
+
+    if args.range == 'training':
+        if not hasattr(predictor, 'x_min'):
+            print("❌ --range training needs a .npz / .pmb model (scaler constants)")
+            sys.exit(1)
+        lo = -predictor.x_min / predictor.x_scale
+        hi = (1 - predictor.x_min) / predictor.x_scale
+    else:
+        lo, hi = np.array(FIRMWARE_RANGE, dtype=np.float32).T
+    grid = tuple(int(n) for n in args.grid.split(','))
+
+    print(f"\n[1/3] Evaluating {np.prod(grid):,} grid points ({'x'.join(map(str, grid))})...")
+    start = time.perf_counter()
+    lut = build_lut(predictor, lo, hi, grid, args.dtype)
+    lut.save(args.out, source=args.model)
+    print(f"   ✅ Saved: {args.out} ({lut.nbytes:,} bytes {args.dtype} table, "
+          f"{time.perf_counter() - start:.2f}s)")
+    for i, name in enumerate(INPUT_NAMES):
+        print(f"   {name:<12} {lut.lo[i]:g} .. {lut.hi[i]:g}")
+
+    print("\n[2/3] Interpolation error vs full model...")
+    error = interpolation_error(lut, predictor, args.samples)
+    for name in OUTPUT_NAMES:
+        print(f"   {name}: max |Δ| = {error[f'max_abs_err_{name}']:.4f}, "
+              f"p99 = {error[f'p99_abs_err_{name}']:.4f}, "
+              f"mean = {error[f'mean_abs_err_{name}']:.4f} µg/m³ ({error['points']:,} points)")
+    X = (lut.lo + np.random.default_rng(1).random((1_000_000, 3)) * (lut.hi - lut.lo)).astype(np.float32)
+    print(f"   Throughput: LUT {_time_per_row(lut.predict, X):.1f} ns/row vs "
+          f"{predictor.kind} {_time_per_row(predictor.predict, X):.1f} ns/row")
+
+    if args.c_out:
+        print("\n[3/3] Exporting C header...")
+        header = generate_header(lut, source=args.out)
+        with open(args.c_out, 'w') as f:
+            f.write(header)
+        print(f"   ✅ Saved: {args.c_out}")
+        X_check = X[:100_000]
+        y_c = compile_and_run(header, X_check, main=CHECK_MAIN, header_name='pm_lut.h')
+        if y_c is None:
+            print("   ⚠️  No C compiler found, skipping C vs NumPy check")
+        else:
+            diff = float(np.max(np.abs(y_c - lut.predict(X_check))))
+            print(f"   C vs NumPy LUT: max |Δ| = {diff:.2e} µg/m³ ({len(X_check):,} samples)")
+    else:
+        print("\n[3/3] C header skipped (use --c-out)")
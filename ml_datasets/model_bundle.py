@@ -0,0 +1,336 @@
+"""
+Model bundle (.pmb): model + scaler + model_info dalam satu file berversi
+
+Pengganti scaler_X.pkl / scaler_y.pkl + weights terpisah. Load hanya butuh
+NumPy (tanpa scikit-learn / TensorFlow / pickle), array di-mmap langsung
+dari file, dan model + scaler tidak mungkin tertukar karena ada di file
+yang sama dengan checksum.
+
+Layout file (little-endian):
+    magic     b"PMB1"
+    uint32    panjang manifest (byte)
+    manifest  JSON utf-8, di-pad spasi sampai kelipatan ALIGN
+    data      array float32 berurutan, masing-masing aligned ALIGN byte
+
+Manifest:
+    format_version, created, input_features, output_targets, activations,
+    n_layers, model_info, sources, arrays {nama: {offset, shape}}, data_sha256
+
+sources = {path: sha256} file yang ditulis bersama bundle dalam run yang
+sama (pm_predictor.h5, scaler_X.pkl, scaler_y.pkl). load_scalers() hanya
+memakai scaler dari bundle kalau pickle di disk masih cocok dengan ini.
+
+Arrays: W{i}, b{i} (Dense layers), x_min, x_scale, y_min, y_scale
+(x_scaled = x * x_scale + x_min) dan x_data_min/max, y_data_min/max.
+
+Usage:
+    python model_bundle.py                          # models/ → models/pm_predictor.pmb
+    python model_bundle.py --inspect models/pm_predictor.pmb
+    bundle = load_bundle("models/pm_predictor.pmb")
+    bundle.predictor().predict([[28.0, 65.0, 1013.0]])
+"""
+
+import hashlib
+import json
+import os
+import struct
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from numpy_predictor import NumpyPredictor
+
+DEFAULT_BUNDLE = "models/pm_predictor.pmb"
+MAGIC = b"PMB1"
+FORMAT_VERSION = 1
+ALIGN = 64
+SCALER_ARRAYS = ('x_min', 'x_scale', 'y_min', 'y_scale',
+                 'x_data_min', 'x_data_max', 'y_data_min', 'y_data_max')
+
+
+class BundleError(ValueError):
+    """File bundle rusak, versi tidak didukung atau checksum tidak cocok"""
+
+
+# ==========================================
+# 1. Scaler tanpa scikit-learn
+# ==========================================
+class ArrayScaler:
+    """
+    MinMaxScaler(feature_range=(0, 1)) versi NumPy
+
+    Atribut sama dengan sklearn (min_, scale_, data_min_, data_max_)
+    supaya bisa dipakai di tempat scaler hasil pickle.
+    """
+
+    def __init__(self, data_min, data_max):
+        self.data_min_ = np.asarray(data_min, dtype=np.float64).copy()
+        self.data_max_ = np.asarray(data_max, dtype=np.float64).copy()
+        self._update()
+
+    def _update(self):
+        data_range = self.data_max_ - self.data_min_
+        # Sama seperti sklearn: range 0 → scale 1
+        self.scale_ = 1.0 / np.where(data_range == 0, 1.0, data_range)
+        self.min_ = -self.data_min_ * self.scale_
+        self.n_features_in_ = len(self.data_min_)
+
+    @classmethod
+    def from_scaler(cls, scaler):
+        return cls(scaler.data_min_, scaler.data_max_)
+
+    def to_sklearn(self):
+        """MinMaxScaler sklearn dengan state yang sama (untuk pickle legacy)"""
+        from sklearn.preprocessing import MinMaxScaler
+
+        scaler = MinMaxScaler()
+        scaler.fit(np.vstack([self.data_min_, self.data_max_]))
+        return scaler
+
+    def partial_fit(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        self.data_min_ = np.fmin(self.data_min_, np.nanmin(X, axis=0))
+        self.data_max_ = np.fmax(self.data_max_, np.nanmax(X, axis=0))
+        self._update()
+        return self
+
+    def transform(self, X):
+        return np.asarray(X, dtype=np.float64) * self.scale_ + self.min_
+
+    def inverse_transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.min_) / self.scale_
+
+
+# ==========================================
+# 2. Writer
+# ==========================================
+def _pad(n):
+    return (-n) % ALIGN
+
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def source_digests(paths):
+    """{path: sha256} untuk file yang ada (manifest `sources`)"""
+    return {path: file_sha256(path) for path in paths if os.path.exists(path)}
+
+
+def write_bundle(path, arrays, **manifest):
+    """
+    Tulis arrays (dict nama → array) + manifest ke satu file, atomic
+
+    Returns:
+        manifest yang ditulis (dengan offset dan checksum)
+    """
+    layout, offset, blobs = {}, 0, []
+    for name, array in arrays.items():
+        data = np.ascontiguousarray(array, dtype='<f4')
+        layout[name] = {'offset': offset, 'shape': list(data.shape)}
+        blob = data.tobytes()
+        blobs.append(blob + b"\0" * _pad(len(blob)))
+        offset += len(blobs[-1])
+    payload = b"".join(blobs)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        **manifest,
+        'arrays': layout,
+        'data_sha256': hashlib.sha256(payload).hexdigest(),
+    }
+    header = json.dumps(manifest, sort_keys=True).encode()
+    header += b" " * _pad(len(MAGIC) + 4 + len(header))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC + struct.pack('<I', len(header)) + header + payload)
+    os.replace(tmp, path)
+    return manifest
+
+
+def save_bundle(model, scaler_X, scaler_y, model_info=None, path=DEFAULT_BUNDLE, sources=None):
+    """
+    Bundle dari model Keras + scaler (sklearn atau ArrayScaler)
+
+    Args:
+        sources: {path: sha256} file dari run yang sama (lihat source_digests)
+    """
+    from export_numpy import export_arrays
+
+    exported = export_arrays(model, scaler_X, scaler_y)
+    n_layers = int(exported['n_layers'])
+    arrays = {}
+    for i in range(n_layers):
+        arrays[f'W{i}'] = exported[f'W{i}']
+        arrays[f'b{i}'] = exported[f'b{i}']
+    for name in ('x_min', 'x_scale', 'y_min', 'y_scale'):
+        arrays[name] = exported[name]
+    arrays['x_data_min'], arrays['x_data_max'] = scaler_X.data_min_, scaler_X.data_max_
+    arrays['y_data_min'], arrays['y_data_max'] = scaler_y.data_min_, scaler_y.data_max_
+
+    model_info = dict(model_info or {})
+    return write_bundle(
+        path, arrays,
+        n_layers=n_layers,
+        activations=[str(a) for a in exported['activations']],
+        input_features=model_info.get('input_features'),
+        output_targets=model_info.get('output_targets'),
+        model_info=model_info,
+        sources=dict(sources or {}),
+    )
+
+
+# ==========================================
+# 3. Loader (NumPy only, mmap)
+# ==========================================
+class ModelBundle:
+    """Bundle yang sudah di-load: manifest + array (view ke mmap)"""
+
+    def __init__(self, path, manifest, arrays):
+        self.path = path
+        self.manifest = manifest
+        self.arrays = arrays
+
+    @property
+    def model_info(self):
+        return self.manifest.get('model_info', {})
+
+    @property
+    def n_inputs(self):
+        return self.arrays['W0'].shape[0]
+
+    def scalers(self):
+        """(scaler_X, scaler_y) sebagai ArrayScaler"""
+        a = self.arrays
+        return (ArrayScaler(a['x_data_min'], a['x_data_max']),
+                ArrayScaler(a['y_data_min'], a['y_data_max']))
+
+    def predictor(self):
+        a = self.arrays
+        n_layers = self.manifest['n_layers']
+        return NumpyPredictor(
+            weights=[a[f'W{i}'] for i in range(n_layers)],
+            biases=[a[f'b{i}'] for i in range(n_layers)],
+            activations=self.manifest['activations'],
+            x_min=a['x_min'], x_scale=a['x_scale'],
+            y_min=a['y_min'], y_scale=a['y_scale'],
+        )
+
+
+def sources_match(bundle, paths):
+    """
+    True kalau setiap file di paths yang ada di disk tercatat di
+    bundle.manifest['sources'] dengan sha256 yang sama
+
+    File yang tidak ada dilewati (deploy yang hanya membawa .pmb).
+    """
+    sources = bundle.manifest.get('sources') or {}
+    for path in paths:
+        if os.path.exists(path) and sources.get(path) != file_sha256(path):
+            return False
+    return True
+
+
+def read_manifest(path):
+    """Baca header saja; return (manifest, offset awal data)"""
+    with open(path, 'rb') as f:
+        head = f.read(len(MAGIC) + 4)
+        if len(head) < len(MAGIC) + 4 or head[:len(MAGIC)] != MAGIC:
+            raise BundleError(f"Not a model bundle: {path}")
+        (length,) = struct.unpack('<I', head[len(MAGIC):])
+        try:
+            manifest = json.loads(f.read(length))
+        except ValueError as e:
+            raise BundleError(f"Corrupt bundle manifest: {path} ({e})") from None
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise BundleError(f"Unsupported bundle version {manifest.get('format_version')}: {path}")
+    return manifest, len(MAGIC) + 4 + length
+
+
+def load_bundle(path=DEFAULT_BUNDLE, verify=True):
+    """
+    Load bundle dengan np.memmap (read-only)
+
+    Args:
+        verify: cek sha256 data section (file kecil, murah)
+
+    Raises:
+        BundleError kalau format / checksum tidak cocok
+    """
+    manifest, data_offset = read_manifest(path)
+    data = np.memmap(path, dtype=np.uint8, mode='r', offset=data_offset)
+    if verify and hashlib.sha256(data).hexdigest() != manifest['data_sha256']:
+        raise BundleError(f"Checksum mismatch: {path}")
+
+    arrays = {}
+    for name, spec in manifest['arrays'].items():
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        end = spec['offset'] + count * 4
+        if end > len(data):
+            raise BundleError(f"Array {name} out of bounds: {path}")
+        arrays[name] = data[spec['offset']:end].view('<f4').reshape(spec['shape'])
+    missing = [n for n in SCALER_ARRAYS if n not in arrays]
+    if missing:
+        raise BundleError(f"Bundle missing arrays {missing}: {path}")
+    return ModelBundle(path, manifest, arrays)
+
+
+# ==========================================
+# Main Function
+# ==========================================
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Build or inspect a .pmb model bundle")
+    parser.add_argument('--inspect', default=None, help="Tampilkan manifest + verifikasi bundle")
+    parser.add_argument('--output', default=DEFAULT_BUNDLE)
+    args = parser.parse_args()
+
+    if args.inspect:
+        start = time.perf_counter()
+        try:
+            bundle = load_bundle(args.inspect)
+        except (OSError, BundleError) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        load_ms = (time.perf_counter() - start) * 1000
+        manifest = dict(bundle.manifest)
+        print(json.dumps({k: v for k, v in manifest.items() if k != 'arrays'}, indent=2))
+        for name, spec in manifest['arrays'].items():
+            print(f"   {name:<12} {str(tuple(spec['shape'])):<10} @ {spec['offset']}")
+        print(f"   ✅ Checksum OK, loaded in {load_ms:.2f} ms")
+        sys.exit(0)
+
+    print("="*60)
+    print("Building Model Bundle")
+    print("="*60)
+
+    model_path = "models/pm_predictor.h5"
+    if not os.path.exists(model_path):
+        print(f"❌ Model not found: {model_path}")
+        print("   Run train_model.py first!")
+        sys.exit(1)
+
+    import tensorflow as tf
+    from batch_inference import load_scalers
+
+    model = tf.keras.models.load_model(model_path, compile=False)
+    # Dari pickle lama (bukan dari bundle yang mau ditulis ulang)
+    scaler_X, scaler_y = load_scalers(bundle_path=None)
+    try:
+        with open('models/model_info.json') as f:
+            model_info = json.load(f)
+    except (OSError, ValueError):
+        model_info = {}
+    sources = source_digests([model_path, 'models/scaler_X.pkl', 'models/scaler_y.pkl'])
+    save_bundle(model, scaler_X, scaler_y, model_info, args.output, sources=sources)
+    print(f"   ✅ Saved: {args.output} ({os.path.getsize(args.output) / 1024:.1f} KB)")
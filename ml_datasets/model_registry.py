@@ -0,0 +1,509 @@
+"""
+Model registry per site / lokasi
+
+Satu model kecil per site (default: kolom `location`), masing-masing
+berupa model bundle .pmb berversi:
+
+    models/registry/
+        devices.json                 device → site (opsional)
+        <site>/v0001.pmb, v0002.pmb  versi model (tidak pernah ditimpa)
+        <site>/CURRENT               versi aktif (ditulis atomic)
+        <site>/history.jsonl         metrics setiap versi
+
+Training berjalan paralel (satu task per site), dan versi baru hanya
+di-promote kalau lebih baik dari versi aktif pada test split yang sama.
+Setiap publish menghapus .pmb lama di luar --keep versi terbaru (versi
+CURRENT tidak pernah dihapus); history.jsonl tetap lengkap.
+Untuk serving, ModelRegistry me-load model secara lazy, menyimpan
+maksimal max_loaded model (LRU), dan membaca ulang CURRENT setiap
+check_interval detik, jadi versi baru dipakai tanpa restart reader.
+
+Usage:
+    python model_registry.py                          # train per location
+    python model_registry.py --by station --min-rows 500 --workers 8
+    python model_registry.py --list
+    python model_registry.py --promote india=3        # rollback / pin versi
+    python model_registry.py --assign esp32-kiln-01=india
+    python model_registry.py --gc --keep 3              # buang versi lama semua site
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+
+from data_pipeline import FEATURES, TARGETS
+from model_bundle import ArrayScaler, load_bundle, save_bundle
+
+REGISTRY_DIR = "models/registry"
+DEVICES_FILE = "devices.json"
+DEFAULT_MAX_LOADED = 256
+DEFAULT_CHECK_INTERVAL = 5.0
+DEFAULT_MIN_ROWS = 200
+DEFAULT_KEEP_VERSIONS = 10
+
+# Diisi oleh _init_worker di setiap worker process
+_worker = {}
+
+
+def site_key(name):
+    """Nama site aman untuk direktori: 'New Delhi' → 'new_delhi'"""
+    key = re.sub(r'[^a-z0-9_.-]+', '_', str(name).strip().lower()).strip('._')
+    if not key:
+        raise ValueError(f"Invalid site name: {name!r}")
+    return key
+
+
+def _write_atomic(path, text):
+    tmp = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+# ==========================================
+# 1. Registry (storage + lazy serving)
+# ==========================================
+class ModelRegistry:
+    """
+    Registry model per site di filesystem
+
+    get() thread-safe: model di-load sekali per versi dan dibagi semua
+    thread; swap ke versi baru hanya mengganti entry di dict, jadi request
+    yang sedang memakai versi lama tetap selesai dengan versi lama.
+    """
+
+    def __init__(self, root=REGISTRY_DIR, max_loaded=DEFAULT_MAX_LOADED,
+                 check_interval=DEFAULT_CHECK_INTERVAL):
+        self.root = root
+        self.max_loaded = max_loaded
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.loaded = OrderedDict()      # site → [version, predictor, checked_at]
+        self.counters = {'hits': 0, 'loads': 0, 'reloads': 0, 'evictions': 0}
+        self._devices = {}
+        self._devices_mtime = None
+        self._devices_checked = float('-inf')
+
+    # ---------- storage ----------
+    def site_dir(self, site):
+        return os.path.join(self.root, site_key(site))
+
+    def bundle_path(self, site, version):
+        return os.path.join(self.site_dir(site), f"v{version:04d}.pmb")
+
+    def sites(self):
+        """Site yang punya versi aktif"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.exists(os.path.join(self.root, name, "CURRENT")))
+
+    def versions(self, site):
+        site_dir = self.site_dir(site)
+        if not os.path.isdir(site_dir):
+            return []
+        return sorted(int(m.group(1)) for m in
+                      (re.fullmatch(r'v(\d+)\.pmb', name) for name in os.listdir(site_dir)) if m)
+
+    def current_version(self, site):
+        try:
+            with open(os.path.join(self.site_dir(site), "CURRENT")) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def history(self, site):
+        path = os.path.join(self.site_dir(site), "history.jsonl")
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def publish(self, site, model, scaler_X, scaler_y, model_info, promote=True,
+                keep=DEFAULT_KEEP_VERSIONS):
+        """
+        Simpan model sebagai versi baru (v000N.pmb)
+
+        Args:
+            keep: jumlah versi terbaru yang disimpan (lihat prune); 0 = semua
+
+        Returns:
+            nomor versi
+        """
+        site_dir = self.site_dir(site)
+        os.makedirs(site_dir, exist_ok=True)
+        version = max(self.versions(site), default=0) + 1
+        model_info = {**model_info, 'site': site_key(site), 'version': version}
+        save_bundle(model, scaler_X, scaler_y, model_info, self.bundle_path(site, version))
+        with open(os.path.join(site_dir, "history.jsonl"), 'a') as f:
+            f.write(json.dumps({
+                'version': version,
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'promoted': bool(promote),
+                **{k: v for k, v in model_info.items() if k.startswith(('mse_', 'mae_', 'r2_', 'rows'))},
+            }) + "\n")
+        if promote:
+            self.promote(site, version)
+        if keep:
+            self.prune(site, keep)
+        return version
+
+    def prune(self, site, keep=DEFAULT_KEEP_VERSIONS):
+        """
+        Hapus .pmb di luar `keep` versi terbaru; versi CURRENT selalu disimpan
+
+        Versi terbaru tidak pernah dihapus, jadi nomor versi tidak dipakai ulang.
+
+        Returns:
+            list versi yang dihapus
+        """
+        if keep < 1:
+            raise ValueError("keep must be >= 1")
+        versions = self.versions(site)
+        retained = set(versions[-keep:]) | {self.current_version(site)}
+        removed = []
+        for version in versions:
+            if version not in retained:
+                try:
+                    os.remove(self.bundle_path(site, version))
+                except FileNotFoundError:
+                    continue
+                removed.append(version)
+        return removed
+
+    def promote(self, site, version):
+        """Jadikan versi aktif (CURRENT ditulis atomic)"""
+        if not os.path.exists(self.bundle_path(site, version)):
+            raise FileNotFoundError(f"No version {version} for site {site}")
+        _write_atomic(os.path.join(self.site_dir(site), "CURRENT"), f"{version}\n")
+
+    # ---------- device → site ----------
+    def assign(self, device, site):
+        devices = dict(self._read_devices())
+        devices[str(device)] = site_key(site)
+        os.makedirs(self.root, exist_ok=True)
+        _write_atomic(os.path.join(self.root, DEVICES_FILE), json.dumps(devices, indent=2, sort_keys=True))
+
+    def _read_devices(self):
+        path = os.path.join(self.root, DEVICES_FILE)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return {}
+        if mtime != self._devices_mtime:
+            try:
+                with open(path) as f:
+                    self._devices = json.load(f)
+                self._devices_mtime = mtime
+            except (OSError, ValueError):
+                pass
+        return self._devices
+
+    def resolve(self, device=None, site=None):
+        """
+        Site untuk request: site eksplisit, device map, atau nama device
+        yang sama dengan site. None kalau site tidak punya versi aktif
+        (request dilayani model global).
+        """
+        if site:
+            return self._existing(site)
+        if not device:
+            return None
+        now = time.monotonic()
+        if now - self._devices_checked >= self.check_interval:
+            self._devices_checked = now
+            self._read_devices()
+        mapped = self._devices.get(str(device))
+        return self._existing(mapped or device)
+
+    def _existing(self, name):
+        try:
+            key = site_key(name)
+        except ValueError:
+            return None
+        if key in self.loaded:
+            return key
+        return key if os.path.exists(os.path.join(self.root, key, "CURRENT")) else None
+
+    # ---------- serving ----------
+    def get(self, site):
+        """
+        (version, predictor) aktif untuk site; lazy load + LRU
+
+        Raises:
+            KeyError kalau site tidak punya versi aktif
+        """
+        key = site_key(site)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.loaded.get(key)
+            if entry is not None and now - entry[2] < self.check_interval:
+                self.loaded.move_to_end(key)
+                self.counters['hits'] += 1
+                return entry[0], entry[1]
+
+            version = self.current_version(key)
+            if version is None:
+                self.loaded.pop(key, None)
+                raise KeyError(f"No active model for site {key}")
+            if entry is not None and entry[0] == version:
+                entry[2] = now
+                self.loaded.move_to_end(key)
+                self.counters['hits'] += 1
+                return entry[0], entry[1]
+
+            predictor = load_bundle(self.bundle_path(key, version)).predictor()
+            self.counters['reloads' if entry is not None else 'loads'] += 1
+            self.loaded[key] = [version, predictor, now]
+            self.loaded.move_to_end(key)
+            while len(self.loaded) > self.max_loaded:
+                self.loaded.popitem(last=False)
+                self.counters['evictions'] += 1
+            return version, predictor
+
+    def stats(self):
+        with self.lock:
+            return {**self.counters, 'loaded': len(self.loaded), 'max_loaded': self.max_loaded}
+
+
+# ==========================================
+# 2. Training per Site (parallel)
+# ==========================================
+def site_groups(columns, meta, by='location', min_rows=DEFAULT_MIN_ROWS):
+    """
+    Index baris per site dari kolom `by` (kategori atau numerik)
+
+    Returns:
+        dict {site_key: index array}; site dengan baris < min_rows dilewati
+    """
+    codes = np.asarray(columns[by])
+    categories = meta['columns'][by].get('categories')
+    order = np.argsort(codes, kind='stable')
+    values, starts = np.unique(codes[order], return_index=True)
+    groups = {}
+    for value, rows in zip(values, np.split(order, starts[1:])):
+        if len(rows) < min_rows:
+            continue
+        name = categories[int(value)] if categories else f"{by}-{value}"
+        groups[site_key(name)] = rows
+    return groups
+
+
+def _init_worker(cache_dir, registry_root, threads):
+    """Batasi thread TensorFlow dan buka cache (mmap, read-only)"""
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    from dataset_cache import load_dir
+    columns, _ = load_dir(cache_dir, FEATURES + TARGETS)
+    _worker['columns'] = columns
+    _worker['registry'] = ModelRegistry(registry_root)
+
+
+def train_site(site, rows, config):
+    """
+    Train satu model site, publish, promote kalau lebih baik dari versi aktif
+
+    Returns:
+        dict ringkasan (site, version, metrics, promoted)
+    """
+    import tensorflow as tf
+    from sklearn.model_selection import train_test_split
+    from pm_model import build_model, evaluate, fit_model
+
+    columns, registry = _worker['columns'], _worker['registry']
+    rows = np.sort(rows)
+    X = np.column_stack([columns[c][rows] for c in FEATURES]).astype(np.float32)
+    y = np.column_stack([columns[c][rows] for c in TARGETS]).astype(np.float32)
+    valid = np.isfinite(X).all(axis=1) & np.isfinite(y).all(axis=1)
+    X, y = X[valid], y[valid]
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=config['seed']
+    )
+    scaler_X = ArrayScaler(X_train.min(axis=0), X_train.max(axis=0))
+    scaler_y = ArrayScaler(y_train.min(axis=0), y_train.max(axis=0))
+
+    tf.keras.utils.set_random_seed(config['seed'])
+    model = build_model(config['hidden'], config['dropout'])
+    start = time.perf_counter()
+    fit_model(model, scaler_X.transform(X_train), scaler_y.transform(y_train),
+              batch_size=config['batch_size'], epochs=config['epochs'], patience=config['patience'])
+    train_seconds = time.perf_counter() - start
+
+    y_pred = scaler_y.inverse_transform(model.predict(scaler_X.transform(X_test), batch_size=4096, verbose=0))
+    metrics = evaluate(y_test, y_pred)
+    score = float(np.mean([metrics[f'mse_{t}'] for t in TARGETS]))
+
+    # Versi aktif dievaluasi di test split yang sama
+    current = registry.current_version(site)
+    current_score = None
+    if current is not None:
+        current_pred = load_bundle(registry.bundle_path(site, current)).predictor().predict(X_test)
+        current_score = float(np.mean((current_pred - y_test) ** 2))
+    promote = config['force'] or current_score is None or score < current_score
+
+    model_info = {
+        'input_features': list(FEATURES),
+        'output_targets': list(TARGETS),
+        'hidden': list(config['hidden']),
+        'rows_train': int(len(X_train)),
+        'rows_test': int(len(X_test)),
+        **metrics,
+    }
+    version = registry.publish(site, model, scaler_X, scaler_y, model_info, promote=promote,
+                               keep=config['keep'])
+    return {
+        'site': site,
+        'version': version,
+        'promoted': promote,
+        'previous_version': current,
+        'mse': score,
+        'previous_mse': current_score,
+        'r2_pm25': metrics['r2_pm25'],
+        'rows': int(len(X)),
+        'train_seconds': round(train_seconds, 2),
+    }
+
+
+def train_sites(cache_dir, registry_root=REGISTRY_DIR, by='location', min_rows=DEFAULT_MIN_ROWS,
+                hidden=(16, 8, 4), dropout=0.2, batch_size=32, epochs=100, patience=10,
+                seed=42, force=False, workers=None, threads_per_worker=1,
+                keep=DEFAULT_KEEP_VERSIONS):
+    """
+    Train satu model per site di ProcessPoolExecutor
+
+    Returns:
+        list ringkasan per site (lihat train_site)
+    """
+    from dataset_cache import load_dir
+
+    columns, meta = load_dir(cache_dir, [by])
+    groups = site_groups(columns, meta, by, min_rows)
+    config = {'hidden': tuple(hidden), 'dropout': dropout, 'batch_size': batch_size,
+              'epochs': epochs, 'patience': patience, 'seed': seed, 'force': force, 'keep': keep}
+    workers = min(workers or os.cpu_count() or 1, max(len(groups), 1))
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(cache_dir, registry_root, threads_per_worker),
+    ) as executor:
+        futures = {executor.submit(train_site, site, rows, config): site
+                   for site, rows in groups.items()}
+        for i, future in enumerate(as_completed(futures), 1):
+            site = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"   [{i}/{len(groups)}] ❌ {site}: {e}")
+                continue
+            results.append(result)
+            previous = (f"v{result['previous_version']} MSE {result['previous_mse']:.1f}"
+                        if result['previous_version'] else "none")
+            mark = "✅ promoted" if result['promoted'] else "kept current"
+            print(f"   [{i}/{len(groups)}] {site:<16} v{result['version']} MSE {result['mse']:.1f} "
+                  f"(current: {previous}) {mark} [{result['train_seconds']:.1f}s]")
+    return sorted(results, key=lambda r: r['site'])
+
+
+# ==========================================
+# Main Function
+# ==========================================
+if __name__ == "__main__":
+    from pm_model import parse_hidden
+
+    parser = argparse.ArgumentParser(description="Per-site PM model registry")
+    parser.add_argument('--dataset', default="processed/sample_india_singapore_dataset.csv")
+    parser.add_argument('--reference', action='store_true',
+                        help="Pakai Beijing PRSA reference dataset")
+    parser.add_argument('--registry', default=REGISTRY_DIR)
+    parser.add_argument('--by', default='location', help="Kolom site / cluster")
+    parser.add_argument('--min-rows', type=int, default=DEFAULT_MIN_ROWS,
+                        help="Site dengan baris lebih sedikit pakai model global")
+    parser.add_argument('--hidden', default="16-8-4")
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--force', action='store_true', help="Promote walaupun tidak lebih baik")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--threads-per-worker', type=int, default=1)
+    parser.add_argument('--list', action='store_true', help="Tampilkan site dan versi aktif")
+    parser.add_argument('--promote', default=None, help="site=version (rollback / pin)")
+    parser.add_argument('--assign', default=None, help="device=site (devices.json)")
+    parser.add_argument('--keep', type=int, default=DEFAULT_KEEP_VERSIONS,
+                        help="Versi .pmb terbaru yang disimpan per site (+ CURRENT); 0 = semua")
+    parser.add_argument('--gc', action='store_true', help="Hapus versi lama semua site (--keep)")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+
+    if args.promote or args.assign:
+        name, _, value = (args.promote or args.assign).partition('=')
+        if not value:
+            parser.error("expected name=value")
+        if args.promote:
+            registry.promote(name, int(value))
+            print(f"   ✅ {site_key(name)} → v{int(value)}")
+        else:
+            registry.assign(name, value)
+            print(f"   ✅ {name} → {site_key(value)}")
+        raise SystemExit(0)
+
+    if args.gc:
+        if args.keep < 1:
+            parser.error("--gc needs --keep >= 1")
+        total = 0
+        for site in registry.sites():
+            removed = registry.prune(site, args.keep)
+            total += len(removed)
+            if removed:
+                print(f"   {site}: removed {', '.join(f'v{v}' for v in removed)}")
+        print(f"   ✅ {total} old version(s) removed, keeping {args.keep} per site + CURRENT")
+        raise SystemExit(0)
+
+    if args.list:
+        sites = registry.sites()
+        print(f"{'site':<20}{'current':>8}{'versions':>10}{'MSE':>10}{'R² PM2.5':>10}")
+        for site in sites:
+            current = registry.current_version(site)
+            entry = next((h for h in registry.history(site) if h['version'] == current), {})
+            mse = np.mean([entry.get(f'mse_{t}', np.nan) for t in TARGETS])
+            print(f"{site:<20}{current:>8}{len(registry.versions(site)):>10}"
+                  f"{mse:>10.1f}{entry.get('r2_pm25', float('nan')):>10.3f}")
+        print(f"\n{len(sites)} site(s) in {args.registry}")
+        raise SystemExit(0)
+
+    print("="*60)
+    print("Training Per-Site Models")
+    print("="*60)
+
+    from dataset_cache import build_cache
+    if args.reference:
+        from prepare_beijing import build_training_cache
+        cache_dir = build_training_cache()
+    else:
+        cache_dir = build_cache(args.dataset)
+
+    start = time.perf_counter()
+    results = train_sites(cache_dir, args.registry, args.by, args.min_rows,
+                          hidden=parse_hidden(args.hidden), batch_size=args.batch_size,
+                          epochs=args.epochs, force=args.force, workers=args.workers,
+                          threads_per_worker=args.threads_per_worker, keep=args.keep)
+    promoted = sum(r['promoted'] for r in results)
+    print(f"\n   ✅ {len(results)} site(s) trained, {promoted} promoted "
+          f"in {time.perf_counter() - start:.1f}s → {args.registry}")
@@ -0,0 +1,633 @@
+"""
+Prediction server PM2.5/PM10 dengan micro-batching
+
+Model (.tflite atau .npz) di-load sekali. Request yang datang bersamaan
+digabung jadi satu batch (maksimal --max-batch baris atau menunggu
+--max-wait-ms sejak request pertama), jadi interpreter dipanggil sekali
+per batch, bukan sekali per request. Model di-load ulang otomatis kalau
+file model / scaler berubah (misal checkpoint dari online_update.py).
+Di depan batcher ada cache prediksi (prediction_cache.py) dengan key input
+yang dibulatkan; cache dikosongkan setiap kali model di-load ulang.
+Dengan --registry, request yang membawa "device" / "site" dilayani model
+per site dari model_registry.py (fallback ke model global).
+
+Endpoints (HTTP di TCP atau Unix socket):
+    POST /predict   {"temperature": 28, "humidity": 65, "pressure": 1013}
+                    atau {"inputs": [[28, 65, 1013], ...]}
+                    + opsional "device" / "site" (dengan --registry)
+    GET  /metrics   counter, throughput, histogram latency / batch size, cache hit rate
+    GET  /health    status model
+
+Usage:
+    python model_server.py --model models/pm_predictor.pmb
+    python model_server.py --model models/pm_predictor.tflite --max-batch 256 --max-wait-ms 5
+    python model_server.py --unix /tmp/pm_model.sock
+    python model_server.py --registry models/registry
+"""
+
+import argparse
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from data_pipeline import FEATURES, TARGETS
+from batch_inference import (
+    DEFAULT_BUNDLE, DEFAULT_MODEL, DEFAULT_SCALER_X, DEFAULT_SCALER_Y, load_predictor,
+)
+from model_registry import DEFAULT_MAX_LOADED, ModelRegistry
+from prediction_cache import (
+    DEFAULT_MAX_ENTRIES, DEFAULT_RESOLUTIONS, DEFAULT_TTL,
+    PredictionCache, cached_predict, parse_resolutions,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 2.0
+DEFAULT_RELOAD_INTERVAL = 5.0
+REQUEST_TIMEOUT = 10.0
+MAX_BODY_BYTES = 8 << 20
+LISTEN_BACKLOG = 1024
+
+# Bucket histogram (upper bound)
+LATENCY_BUCKETS_MS = (0.25, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+
+# ==========================================
+# 1. Metrics
+# ==========================================
+class Histogram:
+    """Histogram bucket tetap (cumulative di snapshot, seperti Prometheus)"""
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.bounds) and value > self.bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q):
+        """Estimasi quantile = upper bound bucket (None kalau kosong)"""
+        if not self.count:
+            return None
+        target = q * self.count
+        running = 0
+        for bound, n in zip(self.bounds + (float('inf'),), self.counts):
+            running += n
+            if running >= target:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        cumulative, running = {}, 0
+        for bound, n in zip(self.bounds, self.counts):
+            running += n
+            cumulative[str(bound)] = running
+        cumulative['+Inf'] = self.count
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.quantile(0.50),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': cumulative,
+        }
+
+
+class ServerMetrics:
+    """
+    Counter + histogram, thread-safe
+
+    requests / rows / rows_per_sec* = semua request yang dilayani (termasuk
+    cache hit); batched_requests / batched_rows = yang sampai ke batcher.
+    """
+
+    def __init__(self, window=60.0):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.window = window
+        self.recent = deque()        # (time, rows dilayani) untuk throughput window
+        self.counters = {'requests': 0, 'rows': 0, 'batches': 0, 'batched_requests': 0,
+                         'batched_rows': 0, 'errors': 0, 'reloads': 0}
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.queue_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.batch_rows = Histogram(BATCH_BUCKETS)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] += n
+
+    def observe_request(self, rows):
+        now = time.time()
+        with self.lock:
+            self.counters['requests'] += 1
+            self.counters['rows'] += rows
+            self.recent.append((now, rows))
+            while self.recent and self.recent[0][0] < now - self.window:
+                self.recent.popleft()
+
+    def observe_batch(self, rows, requests, queue_ms):
+        with self.lock:
+            self.counters['batches'] += 1
+            self.counters['batched_rows'] += rows
+            self.counters['batched_requests'] += requests
+            self.batch_rows.observe(rows)
+            for ms in queue_ms:
+                self.queue_ms.observe(ms)
+
+    def observe_latency(self, ms):
+        with self.lock:
+            self.latency_ms.observe(ms)
+
+    def snapshot(self):
+        now = time.time()
+        with self.lock:
+            uptime = now - self.started
+            recent_rows = sum(rows for t, rows in self.recent if t >= now - self.window)
+            return {
+                'uptime_s': uptime,
+                **self.counters,
+                'rows_per_sec': self.counters['rows'] / uptime if uptime else 0.0,
+                f'rows_per_sec_{int(self.window)}s': recent_rows / min(self.window, uptime or 1),
+                'latency_ms': self.latency_ms.snapshot(),
+                'queue_ms': self.queue_ms.snapshot(),
+                'batch_rows': self.batch_rows.snapshot(),
+            }
+
+
+# ==========================================
+# 2. Model Handle (load sekali, reload kalau file berubah)
+# ==========================================
+class ModelHandle:
+    """
+    Predictor yang di-load ulang kalau mtime model / scaler berubah
+
+    get() bisa dipanggil dari thread mana saja (reload di bawah lock) dan
+    return (version, predictor) dari satu tuple yang diganti sekaligus,
+    jadi versi selalu milik predictor yang dikembalikan. Predictor sendiri
+    hanya dipakai oleh thread batcher.
+    """
+
+    def __init__(self, model_path=DEFAULT_MODEL, batch_size=DEFAULT_MAX_BATCH,
+                 num_threads=None, reload_interval=DEFAULT_RELOAD_INTERVAL, metrics=None):
+        self.model_path = model_path
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.reload_interval = reload_interval
+        self.metrics = metrics
+        self.current = (0, None)     # (version, predictor), diganti atomic
+        self.listeners = []          # callback(version) setelah reload
+        self._signature = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _files(self):
+        files = [self.model_path]
+        if self.model_path.endswith('.tflite'):
+            files += [DEFAULT_BUNDLE, DEFAULT_SCALER_X, DEFAULT_SCALER_Y]
+        return files
+
+    def _stat(self):
+        return tuple(os.stat(path).st_mtime_ns if os.path.exists(path) else None
+                     for path in self._files())
+
+    def _load(self):
+        signature = self._stat()
+        kwargs = {'num_threads': self.num_threads} if self.model_path.endswith('.tflite') else {}
+        predictor = load_predictor(self.model_path, self.batch_size, **kwargs)
+        self._signature = signature
+        self.current = (self.current[0] + 1, predictor)
+        for callback in self.listeners:
+            callback(self.current[0])
+
+    @property
+    def version(self):
+        return self.current[0]
+
+    @property
+    def predictor(self):
+        return self.current[1]
+
+    @property
+    def n_inputs(self):
+        predictor = self.predictor
+        if hasattr(predictor, 'n_inputs'):
+            return predictor.n_inputs
+        if hasattr(predictor, 'weights'):
+            return predictor.weights[0].shape[0]
+        return int(predictor.input_detail['shape'][-1])
+
+    def get(self):
+        """
+        (version, predictor) aktif; cek perubahan file maksimal sekali per
+        reload_interval
+        """
+        now = time.monotonic()
+        if not self.reload_interval or now - self._checked < self.reload_interval:
+            return self.current
+        with self._lock:
+            if now - self._checked < self.reload_interval:
+                return self.current
+            self._checked = now
+            if self._stat() != self._signature:
+                try:
+                    self._load()
+                    if self.metrics:
+                        self.metrics.count('reloads')
+                    print(f"   🔄 Reloaded {self.model_path} (version {self.version})")
+                except Exception as e:
+                    # File mungkin sedang ditulis; model lama tetap dipakai
+                    print(f"   ⚠️  Reload failed, keeping version {self.version}: {e}")
+            return self.current
+
+
+# ==========================================
+# 3. Micro-Batcher
+# ==========================================
+class _Pending:
+    __slots__ = ('X', 'site', 'enqueued', 'done', 'result', 'version', 'error')
+
+    def __init__(self, X, site=None):
+        self.X = X
+        self.site = site
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.version = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Satu thread worker menggabungkan request yang antri jadi satu batch
+
+    Batch dijalankan kalau sudah max_batch baris atau max_wait_ms lewat
+    sejak request pertama di batch. Request yang lebih besar dari max_batch
+    tetap dijalankan utuh sebagai satu batch. Dengan registry, batch
+    dipecah per site dan setiap site dijalankan dengan modelnya sendiri.
+    """
+
+    def __init__(self, model, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 metrics=None, registry=None):
+        self.model = model
+        self.registry = registry
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.metrics = metrics or ServerMetrics()
+        self.queue = queue.Queue()
+        self._stopped = False
+        self.thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self.thread.start()
+
+    def predict(self, X, site=None, timeout=REQUEST_TIMEOUT):
+        """
+        Blocking: enqueue X (n, n_inputs) dan tunggu hasil batch
+
+        Returns:
+            (y, versi model yang benar-benar dipakai batch ini)
+        """
+        pending = _Pending(X, site)
+        self.queue.put(pending)
+        if not pending.done.wait(timeout):
+            raise TimeoutError("Prediction timed out")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result, pending.version
+
+    def _collect(self):
+        first = self.queue.get()
+        if first is None:
+            return None
+        batch, rows = [first], len(first.X)
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopped = True
+                break
+            batch.append(item)
+            rows += len(item.X)
+        return batch
+
+    def _run(self):
+        while not self._stopped:
+            batch = self._collect()
+            if batch is None:
+                break
+            started = time.perf_counter()
+            groups = {}
+            for p in batch:
+                groups.setdefault(p.site, []).append(p)
+            for site, items in groups.items():
+                self._predict_group(site, items)
+            self.metrics.observe_batch(sum(len(p.X) for p in batch), len(batch),
+                                       [(started - p.enqueued) * 1000 for p in batch])
+            for p in batch:
+                p.done.set()
+
+    def _predict_group(self, site, items):
+        try:
+            if site is None:
+                version, predictor = self.model.get()
+            else:
+                version, predictor = self.registry.get(site)
+            X = items[0].X if len(items) == 1 else np.concatenate([p.X for p in items])
+            y = predictor.predict(X)
+            start = 0
+            for p in items:
+                p.result = y[start:start + len(p.X)]
+                p.version = version
+                start += len(p.X)
+        except Exception as e:
+            self.metrics.count('errors', len(items))
+            for p in items:
+                p.error = e
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+
+
+# ==========================================
+# 4. HTTP Handler
+# ==========================================
+def parse_inputs(payload, n_inputs):
+    """
+    JSON request → (X float32 (n, n_inputs), single)
+
+    Format: {"inputs": [[t, h, p], ...]} atau satu objek dengan key FEATURES.
+    """
+    if isinstance(payload, dict) and 'inputs' in payload:
+        X, single = np.asarray(payload['inputs'], dtype=np.float32), False
+        if X.ndim == 1:
+            X = X[None, :]
+    elif isinstance(payload, dict) and all(c in payload for c in FEATURES):
+        X, single = np.array([[payload[c] for c in FEATURES]], dtype=np.float32), True
+    else:
+        raise ValueError(f"Expected {{'inputs': [[...]]}} or an object with {FEATURES}")
+    if X.ndim != 2 or X.shape[1] != n_inputs or len(X) == 0:
+        raise ValueError(f"Expected rows of {n_inputs} inputs, got shape {list(X.shape)}")
+    if not np.isfinite(X).all():
+        raise ValueError("Inputs must be finite numbers")
+    return X, single
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """Handler HTTP; state server ada di self.server.app"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "PMModelServer/1.0"
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        app = self.server.app
+        if self.path == "/health":
+            self._send(200, app.health())
+        elif self.path == "/metrics":
+            metrics = app.metrics.snapshot()
+            if app.cache is not None:
+                metrics['cache'] = app.cache.snapshot()
+            if app.registry is not None:
+                metrics['registry'] = app.registry.stats()
+            self._send(200, metrics)
+        else:
+            self._send(404, {'error': f"Not found: {self.path}"})
+
+    def do_POST(self):
+        app = self.server.app
+        if self.path != "/predict":
+            self._send(404, {'error': f"Not found: {self.path}"})
+            return
+        started = time.perf_counter()
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            if length > MAX_BODY_BYTES:
+                raise ValueError(f"Body too large ({length} bytes)")
+            payload = json.loads(self.rfile.read(length) or b"null")
+            site = app.resolve_site(payload)
+            X, single = parse_inputs(payload, len(FEATURES) if site else app.model.n_inputs)
+        except (ValueError, TypeError) as e:
+            app.metrics.count('errors')
+            self._send(400, {'error': str(e)})
+            return
+
+        try:
+            y, version = app.predict(X, site)
+        except Exception as e:
+            self._send(503 if isinstance(e, TimeoutError) else 500, {'error': str(e)})
+            return
+        if single:
+            body = {t: float(v) for t, v in zip(TARGETS, y[0])}
+        else:
+            body = {'predictions': y.tolist()}
+        body['model_version'] = version
+        if site:
+            body['site'] = site
+        self._send(200, body)
+        app.metrics.observe_latency((time.perf_counter() - started) * 1000)
+
+    def log_message(self, format, *args):
+        if self.server.app.verbose:
+            super().log_message(format, *args)
+
+
+class PredictionHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer dengan backlog besar (banyak client connect bersamaan)"""
+
+    request_queue_size = LISTEN_BACKLOG
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """ThreadingHTTPServer versi Unix domain socket"""
+
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = "localhost", 0
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+
+class PredictionService:
+    """Model + batcher + metrics, dipakai bersama oleh semua thread handler"""
+
+    def __init__(self, model_path=DEFAULT_MODEL, max_batch=DEFAULT_MAX_BATCH,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS, reload_interval=DEFAULT_RELOAD_INTERVAL,
+                 num_threads=None, verbose=False, cache=None, registry=None):
+        self.metrics = ServerMetrics()
+        self.model = ModelHandle(model_path, max_batch, num_threads, reload_interval, self.metrics)
+        self.registry = registry
+        self.batcher = MicroBatcher(self.model, max_batch, max_wait_ms, self.metrics, registry)
+        self.verbose = verbose
+        self.cache = cache
+        if cache is not None:
+            if len(cache.resolutions) != self.model.n_inputs:
+                print(f"   ⚠️  Cache disabled: {len(cache.resolutions)} resolutions "
+                      f"for a {self.model.n_inputs}-input model")
+                self.cache = None
+            else:
+                self.model.listeners.append(cache.invalidate)
+
+    def resolve_site(self, payload):
+        """Site dari field "site" / "device" request (None = model global)"""
+        if self.registry is None or not isinstance(payload, dict):
+            return None
+        return self.registry.resolve(payload.get('device'), payload.get('site'))
+
+    def predict(self, X, site=None):
+        """
+        Returns:
+            (y, versi model yang dipakai)
+        """
+        if site is not None:
+            # Model per site tidak lewat cache (key cache tidak membawa site)
+            y, version = self.batcher.predict(X, site)
+        elif self.cache is None:
+            y, version = self.batcher.predict(X)
+        else:
+            # Cek file model dulu supaya cache tidak melayani hasil model lama
+            used = [self.model.get()[0]]
+
+            def predict_missing(X_missing):
+                # Versi dari batch yang menghitung baris miss
+                y_missing, used[0] = self.batcher.predict(X_missing)
+                return y_missing
+
+            y = cached_predict(self.cache, predict_missing, X)
+            version = used[0]
+        self.metrics.observe_request(len(X))
+        return y, version
+
+    def health(self):
+        return {
+            'status': 'ok',
+            'model': self.model.model_path,
+            'kind': self.model.predictor.kind,
+            'version': self.model.version,
+            'inputs': self.model.n_inputs,
+            'max_batch': self.batcher.max_batch,
+            'max_wait_ms': self.batcher.max_wait * 1000,
+            'cache': self.cache is not None,
+            'registry': self.registry.root if self.registry is not None else None,
+        }
+
+    def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        if unix_path:
+            server = UnixHTTPServer(unix_path, PredictionHandler)
+        else:
+            server = PredictionHTTPServer((host, port), PredictionHandler)
+            server.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        server.app = self
+        return server
+
+
+# ==========================================
+# Main Function
+# ==========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Persistent PM2.5/PM10 prediction server with micro-batching")
+    parser.add_argument('--model', default=DEFAULT_MODEL,
+                        help="Model .tflite (float32, dynamic-range atau int8), .npz / .pmb (NumPy) atau .lut (lookup table)")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', default=None, help="Listen di Unix socket (bukan TCP)")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH,
+                        help="Maksimal baris per batch inference")
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="Waktu tunggu maksimal untuk mengisi batch")
+    parser.add_argument('--reload-interval', type=float, default=DEFAULT_RELOAD_INTERVAL,
+                        help="Cek perubahan file model tiap N detik (0 = tidak reload)")
+    parser.add_argument('--threads', type=int, default=None, help="Interpreter threads (TFLite)")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="Jumlah entry cache prediksi (0 = tanpa cache)")
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_TTL,
+                        help="Umur entry cache dalam detik (0 = tanpa TTL)")
+    parser.add_argument('--cache-resolution', default=",".join(map(str, DEFAULT_RESOLUTIONS)),
+                        help="Resolusi key cache per input: temperature,humidity,pressure")
+    parser.add_argument('--registry', default=None,
+                        help="Direktori model registry per site (model_registry.py)")
+    parser.add_argument('--registry-max-loaded', type=int, default=DEFAULT_MAX_LOADED,
+                        help="Jumlah model site maksimal di memory (LRU)")
+    parser.add_argument('--verbose', action='store_true', help="Log setiap request")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("PM Model Server (micro-batching)")
+    print("="*60)
+
+    if not os.path.exists(args.model):
+        print(f"❌ Model not found: {args.model}")
+        print("   Run train_model.py + convert_to_tflite.py (atau export_numpy.py) first!")
+        sys.exit(1)
+
+    cache = None
+    if args.cache_size > 0:
+        cache = PredictionCache(parse_resolutions(args.cache_resolution),
+                                args.cache_size, args.cache_ttl)
+    registry = None
+    if args.registry:
+        registry = ModelRegistry(args.registry, args.registry_max_loaded,
+                                 args.reload_interval or float('inf'))
+    service = PredictionService(args.model, args.max_batch, args.max_wait_ms,
+                                args.reload_interval, args.threads, args.verbose, cache, registry)
+    server = service.serve(args.host, args.port, args.unix)
+    where = f"unix:{args.unix}" if args.unix else f"http://{args.host}:{args.port}"
+    print(f"   ✅ Model: {args.model} ({service.model.predictor.kind}, {service.model.n_inputs} inputs)")
+    print(f"   Batching: max {args.max_batch} rows / {args.max_wait_ms} ms")
+    if service.cache is not None:
+        print(f"   Cache: {args.cache_size:,} entries, TTL {args.cache_ttl:g}s, "
+              f"resolution {args.cache_resolution}")
+    if registry is not None:
+        print(f"   Registry: {args.registry} ({len(registry.sites())} sites, "
+              f"max {args.registry_max_loaded} loaded)")
+    print(f"   Listening: {where}  (POST /predict, GET /metrics, GET /health)")
+
+    def _terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _terminate)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[!] Shutting down...")
+    finally:
+        server.server_close()
+        service.batcher.stop()
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
@@ -0,0 +1,73 @@
+"""
+Pure-NumPy forward pass untuk PM predictor (tanpa TensorFlow)
+
+Load weights + scaler dari .npz hasil export_numpy.py dan jalankan MLP
+dengan matmul NumPy. Cold start dalam milidetik, dan batch besar langsung
+memakai BLAS.
+
+Usage:
+    from numpy_predictor import NumpyPredictor
+    predictor = NumpyPredictor()
+    predictor.predict([[28.0, 65.0, 1013.0]])   # → [[pm25, pm10]]
+"""
+
+import numpy as np
+
+DEFAULT_WEIGHTS = "models/pm_predictor_weights.npz"
+
+
+class NumpyPredictor:
+    """
+    MLP Dense + ReLU dengan scaling MinMax di input dan output
+
+    Input/output dalam satuan asli (°C, %, hPa → µg/m³).
+    """
+
+    kind = 'numpy'
+
+    def __init__(self, weights, biases, activations, x_min, x_scale, y_min, y_scale):
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.activations = [str(a) for a in activations]
+        self.x_min = np.asarray(x_min, dtype=np.float32)
+        self.x_scale = np.asarray(x_scale, dtype=np.float32)
+        self.y_min = np.asarray(y_min, dtype=np.float32)
+        self.y_scale = np.asarray(y_scale, dtype=np.float32)
+
+    @classmethod
+    def load(cls, path=DEFAULT_WEIGHTS):
+        """Load dari .npz (lihat export_numpy.py untuk format)"""
+        with np.load(path, allow_pickle=False) as data:
+            n_layers = int(data['n_layers'])
+            return cls(
+                weights=[data[f'W{i}'] for i in range(n_layers)],
+                biases=[data[f'b{i}'] for i in range(n_layers)],
+                activations=data['activations'],
+                x_min=data['x_min'],
+                x_scale=data['x_scale'],
+                y_min=data['y_min'],
+                y_scale=data['y_scale'],
+            )
+
+    def predict_scaled(self, X_scaled):
+        """Forward pass pada input yang sudah di-scale; output juga scaled"""
+        h = np.asarray(X_scaled, dtype=np.float32)
+        for W, b, activation in zip(self.weights, self.biases, self.activations):
+            h = h @ W
+            h += b
+            if activation == 'relu':
+                np.maximum(h, 0, out=h)
+        return h
+
+    def predict(self, X):
+        """
+        Prediksi PM2.5/PM10 dari array (n, 3) temperature, humidity, pressure
+
+        Returns:
+            array (n, 2) float32 [pm25, pm10]
+        """
+        X_scaled = np.asarray(X, dtype=np.float32) * self.x_scale + self.x_min
+        y = self.predict_scaled(X_scaled)
+        y -= self.y_min
+        y /= self.y_scale
+        return y
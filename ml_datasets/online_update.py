@@ -0,0 +1,534 @@
+"""
+Online / incremental update model PM dari stream sensor live
+
+server.js menulis setiap sensor_data dari ESP32 (hanya pembacaan sensor
+asli, bukan ML_Prediction) sebagai satu baris JSON ke spool file kalau
+ML_SPOOL_PATH di-set. Script ini:
+    - warm start dari models/pm_predictor.h5 + scaler yang ada
+    - membaca baris baru dari spool (offset disimpan di
+      models/online_state.json, jadi run berikutnya lanjut dari situ)
+    - per mini-batch: update scaler (partial_fit) lalu re-parametrize layer
+      input/output supaya prediksi model tidak berubah karena scaler
+      melebar, kemudian train beberapa epoch (batch baru + replay buffer)
+    - setiap 1 dari --val-every sample masuk validation window (data terbaru)
+    - checkpoint (.pmb, .h5, .npz, scaler, .tflite float + int8) hanya kalau model
+      baru lebih baik dari model yang sedang di-deploy pada validation window
+      yang sama
+
+Usage:
+    ML_SPOOL_PATH=ml_datasets/raw/live/sensor_spool.jsonl node server.js
+    python online_update.py --spool raw/live/sensor_spool.jsonl --follow
+    python online_update.py --spool raw/live/sensor_spool.jsonl   # sekali jalan (cron)
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from data_pipeline import FEATURES, TARGETS
+from batch_inference import DEFAULT_SCALER_X, DEFAULT_SCALER_Y, load_scalers
+from export_numpy import dense_layers, export_arrays, export_npz
+from model_bundle import DEFAULT_BUNDLE, ArrayScaler, file_sha256, save_bundle
+from numpy_predictor import DEFAULT_WEIGHTS, NumpyPredictor
+
+DEFAULT_SPOOL = "raw/live/sensor_spool.jsonl"
+STATE_PATH = "models/online_state.json"
+MODEL_PATH = "models/pm_predictor.h5"
+WEIGHTS_H5_PATH = "models/pm_predictor.weights.h5"
+MODEL_INFO_PATH = "models/model_info.json"
+TFLITE_PATH = "models/pm_predictor.tflite"
+TFLITE_QUANT_PATH = "models/pm_predictor_quantized.tflite"
+
+DEFAULT_BATCH_ROWS = 256
+DEFAULT_REPLAY = 20_000
+DEFAULT_VAL_WINDOW = 2_000
+DEFAULT_VAL_EVERY = 5
+
+
+# ==========================================
+# 1. Spool Reader
+# ==========================================
+def load_state(path=STATE_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def read_spool(path, offset=0, max_bytes=16 << 20):
+    """
+    Baca baris JSON lengkap dari spool mulai offset
+
+    Baris terakhir yang belum selesai ditulis (tanpa newline) ditunggu
+    sampai run berikutnya. Spool yang di-truncate / di-rotate (lebih kecil
+    dari offset) dibaca ulang dari awal.
+
+    Returns:
+        (list of (end_offset, record dict), jumlah baris rusak,
+         offset awal, offset setelah baris lengkap terakhir)
+    """
+    if not os.path.exists(path):
+        return [], 0, offset, offset
+    if os.path.getsize(path) < offset:
+        offset = 0
+    records, bad = [], 0
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(max_bytes)
+    position = offset
+    for line in data.splitlines(keepends=True):
+        if not line.endswith(b"\n"):
+            break
+        position += len(line)
+        if not line.strip():
+            continue
+        try:
+            records.append((position, json.loads(line)))
+        except ValueError:
+            bad += 1
+    return records, bad, offset, position
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class RecordParser:
+    """
+    Ubah record spool jadi (x, y) sesuai input_features model
+
+    Model 3 input memakai temperature/humidity/pressure langsung; model
+    dari train_model.py --features memakai OnlineFeatures per device.
+    """
+
+    def __init__(self, input_features):
+        self.input_features = list(input_features)
+        self.online = None
+        self.extra = ()
+        if self.input_features != list(FEATURES):
+            from features import feature_names
+            base = feature_names()
+            if self.input_features[:len(base)] != base:
+                raise ValueError(f"Unsupported input features: {self.input_features}")
+            self.extra = tuple(self.input_features[len(base):])
+            self.online = {}       # device → OnlineFeatures
+
+    def parse(self, record):
+        """(x float32, y float32) atau None kalau record tidak bisa dipakai"""
+        y = np.array([_to_float(record.get(t)) for t in TARGETS], dtype=np.float32)
+        raw = [_to_float(record.get(c)) for c in FEATURES]
+        if self.online is None:
+            x = np.asarray(raw, dtype=np.float32)
+        else:
+            device = record.get('device') or 'default'
+            if device not in self.online:
+                from features import OnlineFeatures
+                self.online[device] = OnlineFeatures(self.extra)
+            extra = {c: _to_float(record.get(c)) for c in self.extra}
+            timestamp = str(record.get('timestamp', '')).rstrip('Z')
+            try:
+                x = self.online[device].update(np.datetime64(timestamp), *raw, **extra)
+            except ValueError:
+                return None
+        if not (np.isfinite(x).all() and np.isfinite(y).all()) or (y <= 0).all():
+            return None
+        return x, y
+
+
+# ==========================================
+# 2. Scaler Update + Re-parametrization
+# ==========================================
+def expand_scalers(model, scaler_X, scaler_y, X, y):
+    """
+    partial_fit scaler dengan data baru tanpa mengubah output model
+
+    Kalau range data melebar, scaled input/output berubah. Layer Dense
+    pertama dan terakhir (linear) di-reparametrize sehingga
+    f_new(x * s_new + m_new) == f_old(x * s_old + m_old) untuk semua x.
+
+    Returns:
+        True kalau scaler berubah
+    """
+    old_x = (scaler_X.scale_.copy(), scaler_X.min_.copy())
+    old_y = (scaler_y.scale_.copy(), scaler_y.min_.copy())
+    scaler_X.partial_fit(X)
+    scaler_y.partial_fit(y)
+    changed_x = not (np.allclose(old_x[0], scaler_X.scale_) and np.allclose(old_x[1], scaler_X.min_))
+    changed_y = not (np.allclose(old_y[0], scaler_y.scale_) and np.allclose(old_y[1], scaler_y.min_))
+
+    layers = dense_layers(model)
+    if changed_x:
+        # x_old = x_new * a + c
+        a = old_x[0] / scaler_X.scale_
+        c = old_x[1] - scaler_X.min_ * a
+        kernel, bias = layers[0].get_weights()
+        layers[0].set_weights([kernel * a[:, None], bias + c @ kernel])
+    if changed_y:
+        # y_new = y_old * a + c (layer output linear)
+        a = scaler_y.scale_ / old_y[0]
+        c = scaler_y.min_ - old_y[1] * a
+        kernel, bias = layers[-1].get_weights()
+        layers[-1].set_weights([kernel * a[None, :], bias * a + c])
+    return changed_x or changed_y
+
+
+# ==========================================
+# 3. Checkpoint + Re-export
+# ==========================================
+def snapshot(model, scaler_X, scaler_y):
+    """NumpyPredictor dari model saat ini (untuk membandingkan dengan model deploy)"""
+    arrays = export_arrays(model, scaler_X, scaler_y)
+    n_layers = int(arrays['n_layers'])
+    return NumpyPredictor(
+        weights=[arrays[f'W{i}'] for i in range(n_layers)],
+        biases=[arrays[f'b{i}'] for i in range(n_layers)],
+        activations=arrays['activations'],
+        x_min=arrays['x_min'], x_scale=arrays['x_scale'],
+        y_min=arrays['y_min'], y_scale=arrays['y_scale'],
+    )
+
+
+def validation_mse(predictor, X, y):
+    """MSE rata-rata PM2.5/PM10 dalam µg/m³"""
+    return float(np.mean((predictor.predict(X) - y) ** 2))
+
+
+def _dump_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _staged(path):
+    """Path sementara di direktori yang sama; akhiran nama file tetap (.weights.h5, .npz)"""
+    head, tail = os.path.split(path)
+    return os.path.join(head, f".staged-{tail}")
+
+
+def export_tflite(model, X_calib):
+    """
+    Konversi ulang .tflite float32 dan int8 (kalibrasi dari replay buffer)
+
+    Returns:
+        dict path → bytes; int8 tidak ada kalau quantization gagal
+    """
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converted = {TFLITE_PATH: converter.convert()}
+
+    def representative_dataset():
+        for i in range(len(X_calib)):
+            yield [X_calib[i:i + 1]]
+
+    converter_quant = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter_quant.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter_quant.representative_dataset = representative_dataset
+    converter_quant.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter_quant.inference_input_type = tf.int8
+    converter_quant.inference_output_type = tf.int8
+    try:
+        converted[TFLITE_QUANT_PATH] = converter_quant.convert()
+    except Exception as e:
+        print(f"   ⚠️  Quantization failed: {e}")
+    return converted
+
+
+def checkpoint(model, scaler_X, scaler_y, X_calib, online_info):
+    """
+    Simpan model, scaler, .npz dan .tflite; update model_info.json
+
+    Semua file ditulis dulu ke path sementara, baru di-rename ke tempatnya
+    dengan .h5 paling akhir: kalau ada yang gagal di tengah, set file lama
+    (model + scaler yang cocok) tetap utuh.
+    """
+    staged = {}
+    try:
+        for path, scaler in ((DEFAULT_SCALER_X, scaler_X), (DEFAULT_SCALER_Y, scaler_y)):
+            # Pickle format lama tetap MinMaxScaler sklearn
+            legacy = scaler.to_sklearn() if isinstance(scaler, ArrayScaler) else scaler
+            staged[path] = _staged(path)
+            _dump_atomic(staged[path], pickle.dumps(legacy))
+        staged[DEFAULT_WEIGHTS] = export_npz(model, scaler_X, scaler_y, path=_staged(DEFAULT_WEIGHTS))
+        converted = export_tflite(model, X_calib)
+        for path, data in converted.items():
+            staged[path] = _staged(path)
+            _dump_atomic(staged[path], data)
+
+        try:
+            with open(MODEL_INFO_PATH) as f:
+                model_info = json.load(f)
+        except (OSError, ValueError):
+            model_info = {}
+        model_info['online'] = online_info
+        staged[MODEL_INFO_PATH] = _staged(MODEL_INFO_PATH)
+        _dump_atomic(staged[MODEL_INFO_PATH], json.dumps(model_info, indent=2).encode())
+        staged[WEIGHTS_H5_PATH] = _staged(WEIGHTS_H5_PATH)
+        model.save_weights(staged[WEIGHTS_H5_PATH])
+        staged[MODEL_PATH] = _staged(MODEL_PATH)
+        model.save(staged[MODEL_PATH])
+        # sha256 dicatat dengan path final (isi file staged = isi setelah rename)
+        sources = {path: file_sha256(staged[path])
+                   for path in (MODEL_PATH, DEFAULT_SCALER_X, DEFAULT_SCALER_Y)}
+        staged[DEFAULT_BUNDLE] = _staged(DEFAULT_BUNDLE)
+        save_bundle(model, scaler_X, scaler_y, model_info, path=staged[DEFAULT_BUNDLE],
+                    sources=sources)
+    except BaseException:
+        for tmp in staged.values():
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        raise
+
+    if TFLITE_QUANT_PATH not in converted and os.path.exists(TFLITE_QUANT_PATH):
+        # int8 lama dikalibrasi untuk scaler lama: jangan ditinggal
+        os.remove(TFLITE_QUANT_PATH)
+    for path, tmp in sorted(staged.items(), key=lambda item: item[0] == MODEL_PATH):
+        os.replace(tmp, path)
+    return [DEFAULT_BUNDLE] + list(converted)
+
+
+# ==========================================
+# 4. Online Updater
+# ==========================================
+class OnlineUpdater:
+    """
+    Warm-started model + replay buffer + validation window
+
+    update() memproses satu mini-batch sample baru; model yang di-deploy
+    hanya diganti kalau validation MSE turun lebih dari min_delta.
+    """
+
+    def __init__(self, model, scaler_X, scaler_y, epochs=5, replay=DEFAULT_REPLAY,
+                 val_window=DEFAULT_VAL_WINDOW, val_every=DEFAULT_VAL_EVERY,
+                 min_val=200, min_delta=0.01, seed=42):
+        self.model = model
+        self.scaler_X = scaler_X
+        self.scaler_y = scaler_y
+        self.epochs = epochs
+        self.val_every = val_every
+        self.min_val = min_val
+        self.min_delta = min_delta
+        self.rng = np.random.default_rng(seed)
+        self.replay = []          # reservoir sampling (x, y)
+        self.replay_size = replay
+        self.replay_seen = 0
+        self.val = deque(maxlen=val_window)
+        self.samples = 0
+        self.deployed = snapshot(model, scaler_X, scaler_y)
+        self.deployed_mse = None
+
+    def _add_replay(self, sample):
+        self.replay_seen += 1
+        if len(self.replay) < self.replay_size:
+            self.replay.append(sample)
+        else:
+            j = self.rng.integers(self.replay_seen)
+            if j < self.replay_size:
+                self.replay[j] = sample
+
+    def update(self, samples):
+        """
+        Train dengan satu mini-batch
+
+        Returns:
+            dict: train_rows, val_rows, candidate_mse, deployed_mse, improved
+        """
+        train = []
+        for sample in samples:
+            self.samples += 1
+            if self.samples % self.val_every == 0:
+                self.val.append(sample)
+            else:
+                train.append(sample)
+
+        result = {'train_rows': len(train), 'val_rows': len(self.val), 'improved': False}
+        if train:
+            X_new = np.stack([x for x, _ in train])
+            y_new = np.stack([y for _, y in train])
+            result['scaler_changed'] = expand_scalers(self.model, self.scaler_X, self.scaler_y,
+                                                      X_new, y_new)
+            # Batch baru + sample lama dengan jumlah sama (kurangi catastrophic forgetting)
+            if self.replay:
+                pick = self.rng.integers(len(self.replay), size=min(len(train), len(self.replay)))
+                X_fit = np.concatenate([X_new, np.stack([self.replay[i][0] for i in pick])])
+                y_fit = np.concatenate([y_new, np.stack([self.replay[i][1] for i in pick])])
+            else:
+                X_fit, y_fit = X_new, y_new
+            self.model.fit(
+                self.scaler_X.transform(X_fit), self.scaler_y.transform(y_fit),
+                epochs=self.epochs, batch_size=32, shuffle=True, verbose=0,
+            )
+            for sample in train:
+                self._add_replay(sample)
+
+        if len(self.val) < self.min_val:
+            return result
+        X_val = np.stack([x for x, _ in self.val])
+        y_val = np.stack([y for _, y in self.val])
+        candidate = snapshot(self.model, self.scaler_X, self.scaler_y)
+        candidate_mse = validation_mse(candidate, X_val, y_val)
+        # Model deploy dievaluasi ulang: validation window ikut bergeser
+        self.deployed_mse = validation_mse(self.deployed, X_val, y_val)
+        result.update(candidate_mse=candidate_mse, deployed_mse=self.deployed_mse)
+        if candidate_mse < self.deployed_mse * (1 - self.min_delta):
+            self.deployed = candidate
+            self.deployed_mse = candidate_mse
+            result['improved'] = True
+        return result
+
+    def calibration_inputs(self, n=500):
+        """Sample scaled input dari replay buffer untuk kalibrasi int8"""
+        pick = self.rng.permutation(len(self.replay))[:n]
+        X = np.stack([self.replay[i][0] for i in pick])
+        return self.scaler_X.transform(X).astype(np.float32)
+
+
+def load_warm_start(model_path=MODEL_PATH, learning_rate=1e-4):
+    """Load model + scaler + input_features hasil train_model.py"""
+    import tensorflow as tf
+    from tensorflow import keras
+
+    model = tf.keras.models.load_model(model_path, compile=False)
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate), loss='mse', metrics=['mae'])
+    scaler_X, scaler_y = load_scalers()
+    try:
+        with open(MODEL_INFO_PATH) as f:
+            input_features = json.load(f).get('input_features', list(FEATURES))
+    except (OSError, ValueError):
+        input_features = list(FEATURES)
+    if len(input_features) != model.input_shape[-1]:
+        raise ValueError(f"model_info.json lists {len(input_features)} inputs, "
+                         f"model has {model.input_shape[-1]}")
+    return model, scaler_X, scaler_y, input_features
+
+
+# ==========================================
+# Main Function
+# ==========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental PM model update from the live sensor spool")
+    parser.add_argument('--spool', default=os.environ.get('ML_SPOOL_PATH', DEFAULT_SPOOL),
+                        help="JSONL spool dari server.js (ML_SPOOL_PATH)")
+    parser.add_argument('--follow', action='store_true',
+                        help="Terus polling spool (default: proses yang ada lalu keluar)")
+    parser.add_argument('--poll', type=float, default=5.0, help="Interval polling --follow (detik)")
+    parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS,
+                        help="Jumlah sample baru per mini-batch update")
+    parser.add_argument('--epochs', type=int, default=5, help="Epoch per mini-batch")
+    parser.add_argument('--learning-rate', type=float, default=1e-4)
+    parser.add_argument('--replay', type=int, default=DEFAULT_REPLAY, help="Ukuran replay buffer")
+    parser.add_argument('--val-window', type=int, default=DEFAULT_VAL_WINDOW,
+                        help="Jumlah sample validasi terbaru")
+    parser.add_argument('--val-every', type=int, default=DEFAULT_VAL_EVERY,
+                        help="1 dari N sample masuk validasi")
+    parser.add_argument('--min-val', type=int, default=200,
+                        help="Minimal sample validasi sebelum checkpoint")
+    parser.add_argument('--min-delta', type=float, default=0.01,
+                        help="Perbaikan relatif minimal validation MSE untuk checkpoint")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("Online Model Update (live sensor stream)")
+    print("="*60)
+
+    if not os.path.exists(MODEL_PATH):
+        print(f"❌ Model not found: {MODEL_PATH}")
+        print("   Run train_model.py first!")
+        sys.exit(1)
+
+    model, scaler_X, scaler_y, input_features = load_warm_start(learning_rate=args.learning_rate)
+    record_parser = RecordParser(input_features)
+    updater = OnlineUpdater(model, scaler_X, scaler_y, epochs=args.epochs, replay=args.replay,
+                            val_window=args.val_window, val_every=args.val_every,
+                            min_val=args.min_val, min_delta=args.min_delta)
+    print(f"   ✅ Warm start: {MODEL_PATH} ({len(input_features)} inputs)")
+
+    state = load_state()
+    if state.get('spool') != os.path.abspath(args.spool):
+        state = {'spool': os.path.abspath(args.spool), 'offset': 0, 'rows': 0,
+                 'batches': 0, 'checkpoints': 0}
+    print(f"   Spool: {args.spool} (offset {state['offset']:,})")
+
+    pending = []          # (end_offset, (x, y)) yang belum masuk mini-batch
+    skipped = 0
+    read_offset = state['offset']
+    while True:
+        records, bad, start, end_offset = read_spool(args.spool, read_offset)
+        if start != read_offset:
+            print("   ⚠️  Spool truncated, reading from start")
+            pending, state['offset'] = [], 0
+        new_data = end_offset != start
+        read_offset = end_offset
+        skipped += bad
+        for end, record in records:
+            sample = record_parser.parse(record)
+            if sample is None:
+                skipped += 1
+            else:
+                pending.append((end, sample))
+
+        # Sekali jalan: sisa sample < batch_rows tetap dipakai di akhir
+        flush = not args.follow and not new_data
+        while len(pending) >= args.batch_rows or (flush and pending):
+            batch, pending = pending[:args.batch_rows], pending[args.batch_rows:]
+            started = time.perf_counter()
+            result = updater.update([sample for _, sample in batch])
+            state['offset'] = batch[-1][0]
+            state['rows'] += len(batch)
+            state['batches'] += 1
+
+            line = f"   batch {state['batches']}: {len(batch)} rows"
+            if 'candidate_mse' in result:
+                line += (f", val MSE {result['candidate_mse']:.2f} "
+                         f"(deployed {result['deployed_mse']:.2f})")
+            print(f"{line} [{time.perf_counter() - started:.1f}s]")
+
+            if result['improved']:
+                online_info = {
+                    'rows': state['rows'],
+                    'val_rows': result['val_rows'],
+                    'val_mse': result['candidate_mse'],
+                    'updated': datetime.now().isoformat(timespec='seconds'),
+                }
+                written = checkpoint(model, scaler_X, scaler_y,
+                                     updater.calibration_inputs(), online_info)
+                state['checkpoints'] += 1
+                state['val_mse'] = result['candidate_mse']
+                print(f"   ✅ Checkpoint {state['checkpoints']}: {', '.join(written)}")
+            save_state(state)
+
+        if not pending and read_offset != state['offset']:
+            # Record sampai read_offset sudah dipakai semua (atau di-skip)
+            state['offset'] = read_offset
+            save_state(state)
+
+        if flush:
+            break
+        if args.follow and not new_data:
+            time.sleep(args.poll)
+
+    print(f"\n   Rows: {state['rows']:,} (skipped {skipped:,}), "
+          f"batches: {state['batches']}, checkpoints: {state['checkpoints']}")
+    print("\n" + "="*60)
+    print("✅ Online Update Complete!")
+    print("="*60)
@@ -0,0 +1,127 @@
+"""
+Definisi model PM predictor dan estimasi biaya inference di ESP32
+
+Dipakai oleh train_model.py, convert_to_tflite.py dan sweep.py supaya
+arsitektur hanya didefinisikan di satu tempat.
+"""
+
+from data_pipeline import FEATURES, TARGETS
+
+# Arsitektur default (sama dengan model di models/pm_predictor.h5)
+DEFAULT_HIDDEN = (16, 8, 4)
+DEFAULT_DROPOUT = 0.2
+
+# Estimasi kasar ESP32-S3 @ 240 MHz, float32 dengan FPU.
+# Satu MAC ≈ load weight + load input + madd; satu unit ≈ bias + ReLU + store.
+ESP32_CPU_HZ = 240_000_000
+ESP32_CYCLES_PER_MAC = 4
+ESP32_CYCLES_PER_UNIT = 12
+
+
+# ==========================================
+# 1. Model Builder
+# ==========================================
+def build_model(hidden=DEFAULT_HIDDEN, dropout=DEFAULT_DROPOUT, learning_rate=None,
+                input_dim=len(FEATURES), output_dim=len(TARGETS)):
+    """
+    Buat MLP Dense(relu) dengan Dropout setelah layer pertama
+
+    Layer names mengikuti model asli ('input', 'hidden1', ..., 'output')
+    supaya weights lama tetap bisa di-load.
+
+    Args:
+        hidden: jumlah unit per hidden layer, misal (16, 8, 4)
+        dropout: dropout rate setelah layer pertama (0 = tanpa dropout)
+        learning_rate: learning rate Adam (None = default Keras)
+    """
+    from tensorflow import keras
+
+    layers = []
+    for i, units in enumerate(hidden):
+        kwargs = {'input_shape': (input_dim,)} if i == 0 else {}
+        name = 'input' if i == 0 else f'hidden{i}'
+        layers.append(keras.layers.Dense(units, activation='relu', name=name, **kwargs))
+        if i == 0 and dropout:
+            layers.append(keras.layers.Dropout(dropout))
+    layers.append(keras.layers.Dense(output_dim, activation='linear', name='output'))
+
+    model = keras.Sequential(layers)
+    optimizer = keras.optimizers.Adam(learning_rate) if learning_rate else 'adam'
+    model.compile(optimizer=optimizer, loss='mse', metrics=['mae'])
+    return model
+
+
+def fit_model(model, X_train, y_train, batch_size=32, epochs=100, patience=10,
+              validation_split=0.2, verbose=0):
+    """model.fit dengan early stopping seperti di train_model.py"""
+    from tensorflow import keras
+
+    early_stopping = keras.callbacks.EarlyStopping(
+        monitor='val_loss',
+        patience=patience,
+        restore_best_weights=True
+    )
+    return model.fit(
+        X_train, y_train,
+        validation_split=validation_split,
+        epochs=epochs,
+        batch_size=batch_size,
+        verbose=verbose,
+        callbacks=[early_stopping]
+    )
+
+
+def evaluate(y_true, y_pred):
+    """Metrics per target dengan key yang sama seperti models/model_info.json"""
+    from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
+
+    metrics = {}
+    for i, target in enumerate(TARGETS):
+        metrics[f'mse_{target}'] = float(mean_squared_error(y_true[:, i], y_pred[:, i]))
+        metrics[f'mae_{target}'] = float(mean_absolute_error(y_true[:, i], y_pred[:, i]))
+        metrics[f'r2_{target}'] = float(r2_score(y_true[:, i], y_pred[:, i]))
+    return metrics
+
+
+# ==========================================
+# 2. On-device Cost Estimation
+# ==========================================
+def layer_sizes(hidden=DEFAULT_HIDDEN, input_dim=len(FEATURES), output_dim=len(TARGETS)):
+    """[input_dim, *hidden, output_dim]"""
+    return [input_dim, *hidden, output_dim]
+
+
+def count_params(hidden=DEFAULT_HIDDEN, input_dim=len(FEATURES), output_dim=len(TARGETS)):
+    sizes = layer_sizes(hidden, input_dim, output_dim)
+    return sum(n_in * n_out + n_out for n_in, n_out in zip(sizes[:-1], sizes[1:]))
+
+
+def count_macs(hidden=DEFAULT_HIDDEN, input_dim=len(FEATURES), output_dim=len(TARGETS)):
+    sizes = layer_sizes(hidden, input_dim, output_dim)
+    return sum(n_in * n_out for n_in, n_out in zip(sizes[:-1], sizes[1:]))
+
+
+def esp32_cost(hidden=DEFAULT_HIDDEN, input_dim=len(FEATURES), output_dim=len(TARGETS)):
+    """
+    Estimasi biaya inference satu sample di ESP32-S3
+
+    Returns:
+        dict dengan params, macs, flash bytes (float32 / int8) dan latency (µs)
+    """
+    params = count_params(hidden, input_dim, output_dim)
+    macs = count_macs(hidden, input_dim, output_dim)
+    units = sum(hidden) + output_dim
+    cycles = macs * ESP32_CYCLES_PER_MAC + units * ESP32_CYCLES_PER_UNIT
+    return {
+        'params': params,
+        'macs': macs,
+        'flash_bytes_float32': params * 4,
+        'flash_bytes_int8': macs + units * 4,   # int8 weights + int32 bias
+        'est_latency_us': round(cycles / ESP32_CPU_HZ * 1e6, 3),
+    }
+
+
+def parse_hidden(spec):
+    """'16-8-4' → (16, 8, 4)"""
+    return tuple(int(units) for units in spec.split('-') if units)
+
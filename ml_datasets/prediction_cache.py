@@ -0,0 +1,159 @@
+"""
+Cache prediksi PM dengan key input yang dikuantisasi
+
+Sensor ESP32 mengirim data dengan interval tetap dan nilainya berubah
+pelan, jadi banyak request berisi input yang sama sampai presisi display.
+Input dibulatkan ke resolusi per sensor (default 0.1°C, 0.5%RH, 0.1hPa)
+dan dipakai sebagai key LRU + TTL. Semua prediksi di dalam satu sel
+resolusi memakai hasil yang sama.
+
+Cache di-invalidate (generation naik) setiap kali model / scaler baru
+di-load; hasil batch yang dihitung dengan model lama dan selesai setelah
+invalidate tidak disimpan.
+
+Untuk backfill batch besar (batch_inference.py) cache tidak dipakai:
+forward pass NumPy/TFLite per baris lebih murah dari lookup dict Python.
+
+Usage:
+    cache = PredictionCache(resolutions=(0.1, 0.5, 0.1), max_entries=100_000, ttl=300)
+    y, missing, keys, generation = cache.lookup(X)
+    y[missing] = predictor.predict(X[missing])
+    cache.store([keys[i] for i in np.flatnonzero(missing)], y[missing], generation)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from data_pipeline import TARGETS
+
+# Resolusi default: temperature (°C), humidity (%RH), pressure (hPa)
+DEFAULT_RESOLUTIONS = (0.1, 0.5, 0.1)
+DEFAULT_MAX_ENTRIES = 100_000
+DEFAULT_TTL = 300.0
+
+
+def parse_resolutions(text):
+    """'0.1,0.5,0.1' → (0.1, 0.5, 0.1)"""
+    values = tuple(float(v) for v in text.split(',') if v.strip())
+    if not values or any(v <= 0 for v in values):
+        raise ValueError(f"Resolutions must be positive numbers: {text!r}")
+    return values
+
+
+class PredictionCache:
+    """
+    LRU + TTL cache, thread-safe
+
+    Args:
+        resolutions: resolusi kuantisasi per input (satuan asli)
+        max_entries: jumlah entry maksimal (LRU eviction)
+        ttl: umur entry dalam detik (0 = tanpa TTL)
+    """
+
+    def __init__(self, resolutions=DEFAULT_RESOLUTIONS, max_entries=DEFAULT_MAX_ENTRIES,
+                 ttl=DEFAULT_TTL, clock=time.monotonic):
+        self.resolutions = np.asarray(resolutions, dtype=np.float64)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()       # key → (expires, prediction)
+        self.generation = 0
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0,
+                         'expirations': 0, 'invalidations': 0}
+
+    def keys(self, X):
+        """Key per baris: tuple index sel kuantisasi"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.shape[1] != len(self.resolutions):
+            raise ValueError(f"Expected {len(self.resolutions)} inputs, got {X.shape[1]}")
+        q = np.round(X / self.resolutions).astype(np.int64)
+        return [tuple(row) for row in q.tolist()]
+
+    def lookup(self, X):
+        """
+        Cari prediksi untuk setiap baris X
+
+        Returns:
+            (y float32 (n, targets) dengan NaN untuk miss, mask miss, keys,
+             generation untuk store())
+        """
+        keys = self.keys(X)
+        y = np.full((len(keys), len(TARGETS)), np.nan, dtype=np.float32)
+        missing = np.ones(len(keys), dtype=bool)
+        now = self.clock()
+        with self.lock:
+            for i, key in enumerate(keys):
+                entry = self.entries.get(key)
+                if entry is None:
+                    continue
+                expires, prediction = entry
+                if self.ttl and expires <= now:
+                    del self.entries[key]
+                    self.counters['expirations'] += 1
+                    continue
+                self.entries.move_to_end(key)
+                y[i] = prediction
+                missing[i] = False
+            hits = int((~missing).sum())
+            self.counters['hits'] += hits
+            self.counters['misses'] += len(keys) - hits
+            return y, missing, keys, self.generation
+
+    def store(self, keys, predictions, generation):
+        """Simpan hasil; diabaikan kalau cache sudah di-invalidate sejak lookup"""
+        expires = self.clock() + self.ttl
+        with self.lock:
+            if generation != self.generation:
+                return
+            for key, prediction in zip(keys, np.asarray(predictions, dtype=np.float32)):
+                self.entries[key] = (expires, prediction.copy())
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.counters['evictions'] += 1
+
+    def invalidate(self, *_):
+        """Hapus semua entry (dipanggil saat model / scaler baru di-load)"""
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
+            self.counters['invalidations'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            lookups = self.counters['hits'] + self.counters['misses']
+            return {
+                **self.counters,
+                'size': len(self.entries),
+                'max_entries': self.max_entries,
+                'ttl_s': self.ttl,
+                'resolutions': self.resolutions.tolist(),
+                'hit_rate': self.counters['hits'] / lookups if lookups else None,
+                'generation': self.generation,
+            }
+
+
+def cached_predict(cache, predict, X):
+    """
+    Prediksi dengan cache: hanya baris miss (unik per key) yang dihitung
+
+    Args:
+        predict: callable X → y (satuan asli)
+    """
+    y, missing, keys, generation = cache.lookup(X)
+    if missing.any():
+        # Baris dengan key sama dalam satu request cukup dihitung sekali
+        first = {}
+        for i in np.flatnonzero(missing):
+            first.setdefault(keys[i], i)
+        rows = np.fromiter(first.values(), dtype=np.int64, count=len(first))
+        y_rows = predict(np.asarray(X)[rows])
+        computed = dict(zip(first, y_rows))
+        for i in np.flatnonzero(missing):
+            y[i] = computed[keys[i]]
+        cache.store(list(first), y_rows, generation)
+    return y
@@ -0,0 +1,282 @@
+"""
+Parallel hyperparameter / architecture sweep untuk PM predictor
+
+Data di-load dan di-scale sekali, disimpan sebagai .npy, lalu setiap worker
+process membukanya dengan mmap (tanpa copy). Setiap worker menjalankan
+satu model.fit dengan jumlah thread TensorFlow yang dibatasi, sehingga
+semua core terpakai tanpa oversubscription.
+
+Usage:
+    python sweep.py
+    python sweep.py --archs 16-8-4,32-16,64-32-16 --batch-sizes 32,128 --lrs 0.001,0.003
+    python sweep.py --reference --workers 8 --threads-per-worker 2
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+
+from data_pipeline import load_xy
+from dataset_cache import CACHE_DIR, build_cache, synthetic_targets, synthetic_warning
+from pm_model import build_model, esp32_cost, evaluate, fit_model, parse_hidden
+
+LEADERBOARD_PATH = "models/sweep_leaderboard.json"
+
+SHARED_ARRAYS = ('X_train', 'y_train', 'X_test', 'y_test', 'y_min', 'y_scale',
+                 'x_data_min', 'x_data_max', 'y_data_min', 'y_data_max')
+
+# Diisi oleh _init_worker di setiap worker process
+_shared = {}
+
+
+# ==========================================
+# 1. Shared Data (load once, mmap everywhere)
+# ==========================================
+def prepare_shared_data(cache_dir, out_root=CACHE_DIR, test_size=0.2, seed=42):
+    """
+    Split + scale dataset sekali dan simpan sebagai .npy untuk worker
+
+    Split dan scaling sama dengan train_model.py (train_test_split
+    random_state=42, MinMaxScaler fit di train). y_test disimpan dalam
+    satuan asli supaya metrics bisa langsung dihitung.
+
+    Returns:
+        path ke direktori shared arrays
+    """
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import MinMaxScaler
+
+    shared_dir = os.path.join(out_root, f"sweep-{os.path.basename(cache_dir)}-{seed}")
+    if all(os.path.exists(os.path.join(shared_dir, f"{name}.npy")) for name in SHARED_ARRAYS):
+        return shared_dir
+
+    X, y = load_xy(cache_dir)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=seed
+    )
+    scaler_X = MinMaxScaler().fit(X_train)
+    scaler_y = MinMaxScaler().fit(y_train)
+
+    arrays = {
+        'X_train': scaler_X.transform(X_train),
+        'y_train': scaler_y.transform(y_train),
+        'X_test': scaler_X.transform(X_test),
+        'y_test': y_test,
+        'y_min': scaler_y.min_,
+        'y_scale': scaler_y.scale_,
+        # Untuk rebuild scaler (model bundle) dari shared arrays
+        'x_data_min': scaler_X.data_min_,
+        'x_data_max': scaler_X.data_max_,
+        'y_data_min': scaler_y.data_min_,
+        'y_data_max': scaler_y.data_max_,
+    }
+
+    os.makedirs(out_root, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".build-", dir=out_root)
+    for name, values in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(values, dtype=np.float32))
+    shutil.rmtree(shared_dir, ignore_errors=True)
+    os.replace(tmp_dir, shared_dir)
+    return shared_dir
+
+
+# ==========================================
+# 2. Worker Process
+# ==========================================
+def _init_worker(shared_dir, threads):
+    """Batasi thread TensorFlow dan buka shared arrays (mmap, read-only)"""
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    for name in SHARED_ARRAYS:
+        _shared[name] = np.load(os.path.join(shared_dir, f"{name}.npy"), mmap_mode='r')
+
+
+def run_candidate(config):
+    """
+    Train dan evaluasi satu kandidat (dijalankan di worker process)
+
+    Args:
+        config: dict dengan hidden, dropout, batch_size, learning_rate,
+            epochs, patience, seed
+
+    Returns:
+        dict hasil: config + metrics + biaya ESP32
+    """
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(config['seed'])
+    model = build_model(config['hidden'], config['dropout'], config['learning_rate'])
+
+    start = time.perf_counter()
+    history = fit_model(
+        model, _shared['X_train'], _shared['y_train'],
+        batch_size=config['batch_size'],
+        epochs=config['epochs'],
+        patience=config['patience'],
+    )
+    train_seconds = time.perf_counter() - start
+
+    y_pred_scaled = model.predict(_shared['X_test'], batch_size=4096, verbose=0)
+    y_pred = (y_pred_scaled - _shared['y_min']) / _shared['y_scale']
+
+    return {
+        **config,
+        'hidden': list(config['hidden']),
+        **esp32_cost(config['hidden']),
+        **evaluate(np.asarray(_shared['y_test']), y_pred),
+        'best_val_loss': float(min(history.history['val_loss'])),
+        'epochs_run': len(history.history['loss']),
+        'train_seconds': round(train_seconds, 2),
+        'pid': os.getpid(),
+    }
+
+
+# ==========================================
+# 3. Sweep Runner
+# ==========================================
+def make_grid(archs, batch_sizes, learning_rates, dropouts, epochs=100, patience=10, seed=42):
+    """Semua kombinasi kandidat (cartesian product)"""
+    return [
+        {
+            'hidden': hidden,
+            'dropout': dropout,
+            'batch_size': batch_size,
+            'learning_rate': learning_rate,
+            'epochs': epochs,
+            'patience': patience,
+            'seed': seed,
+        }
+        for hidden, batch_size, learning_rate, dropout
+        in itertools.product(archs, batch_sizes, learning_rates, dropouts)
+    ]
+
+
+def run_sweep(grid, shared_dir, workers, threads_per_worker=1):
+    """
+    Jalankan semua kandidat di ProcessPoolExecutor
+
+    Returns:
+        list hasil, diurutkan dari best_val_loss terkecil
+    """
+    results = []
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(shared_dir, threads_per_worker),
+    ) as executor:
+        futures = {executor.submit(run_candidate, config): config for config in grid}
+        for i, future in enumerate(as_completed(futures), 1):
+            config = futures[future]
+            label = '-'.join(map(str, config['hidden']))
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"   [{i}/{len(grid)}] ❌ {label}: {e}")
+                continue
+            results.append(result)
+            print(f"   [{i}/{len(grid)}] {label:>12} bs={result['batch_size']:<4} "
+                  f"lr={result['learning_rate']:<7g} val_loss={result['best_val_loss']:.5f} "
+                  f"R²={result['r2_pm25']:.3f}/{result['r2_pm10']:.3f} "
+                  f"({result['train_seconds']:.1f}s)")
+
+    results.sort(key=lambda r: r['best_val_loss'])
+    for rank, result in enumerate(results, 1):
+        result['rank'] = rank
+    return results
+
+
+def _csv(values, cast):
+    return [cast(v) for v in values.split(',') if v]
+
+
+# ==========================================
+# Main Function
+# ==========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel architecture / hyperparameter sweep")
+    parser.add_argument('--dataset', default="processed/sample_india_singapore_dataset.csv")
+    parser.add_argument('--reference', action='store_true',
+                        help="Pakai Beijing PRSA reference dataset")
+    parser.add_argument('--archs', default="16-8-4,8-4,16-8,32-16,32-16-8,64-32-16",
+                        help="Hidden layers, dipisah koma (misal 16-8-4,32-16)")
+    parser.add_argument('--batch-sizes', default="32,128")
+    parser.add_argument('--lrs', default="0.001,0.003")
+    parser.add_argument('--dropouts', default="0.2")
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--patience', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--threads-per-worker', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Default: cpu_count / threads-per-worker")
+    parser.add_argument('--output', default=LEADERBOARD_PATH)
+    args = parser.parse_args()
+
+    workers = args.workers or max(1, (os.cpu_count() or 1) // args.threads_per_worker)
+
+    print("="*60)
+    print("PM Predictor Architecture Sweep")
+    print("="*60)
+
+    print("\n[1/3] Preparing shared data...")
+    if args.reference:
+        from prepare_beijing import SOURCE_PATH, build_training_cache
+        dataset, cache_dir = SOURCE_PATH, build_training_cache()
+    else:
+        dataset, cache_dir = args.dataset, build_cache(args.dataset)
+    shared_dir = prepare_shared_data(cache_dir, seed=args.seed)
+    n_train = len(np.load(os.path.join(shared_dir, "X_train.npy"), mmap_mode='r'))
+    print(f"   ✅ Shared arrays: {shared_dir} ({n_train} train rows)")
+
+    grid = make_grid(
+        [parse_hidden(a) for a in args.archs.split(',')],
+        _csv(args.batch_sizes, int),
+        _csv(args.lrs, float),
+        _csv(args.dropouts, float),
+        epochs=args.epochs, patience=args.patience, seed=args.seed,
+    )
+    print(f"\n[2/3] Training {len(grid)} candidates on {workers} workers "
+          f"× {args.threads_per_worker} thread(s)...")
+    start = time.perf_counter()
+    results = run_sweep(grid, shared_dir, workers, args.threads_per_worker)
+    elapsed = time.perf_counter() - start
+    print(f"   ✅ Sweep complete in {elapsed:.1f}s")
+    synthetic = synthetic_targets(cache_dir)
+    if synthetic:
+        print(f"   {synthetic_warning(synthetic)}")
+
+    print("\n[3/3] Saving leaderboard...")
+    leaderboard = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'dataset': dataset,
+        'workers': workers,
+        'threads_per_worker': args.threads_per_worker,
+        'elapsed_seconds': round(elapsed, 2),
+        'synthetic_targets': synthetic,
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(leaderboard, f, indent=2)
+    print(f"   ✅ Saved: {args.output}")
+
+    print("\n   Top 5:")
+    for r in results[:5]:
+        print(f"   #{r['rank']} {'-'.join(map(str, r['hidden']))} bs={r['batch_size']} "
+              f"lr={r['learning_rate']:g}: MAE PM2.5={r['mae_pm25']:.2f} R²={r['r2_pm25']:.3f}, "
+              f"{r['params']} params, ~{r['est_latency_us']} µs on ESP32")
@@ -0,0 +1,329 @@
+"""
+Synthetic air quality generator (vectorized, chunked, parallel)
+
+Setiap lokasi punya profil iklim/polusi (PROFILES atau file JSON). Baris
+setiap lokasi dibagi menjadi station-station virtual dengan time series per
+jam sepanjang STATION_HOURS (5 tahun), supaya timestamp tetap valid untuk
+100M+ rows. Temperature, humidity dan PM saling berkorelasi lewat siklus
+diurnal + musiman dan noise AR(1), bukan noise independen:
+    - temperature: rata-rata + musim + siang/malam + AR(1)
+    - humidity: turun saat panas, naik di musim hujan
+    - pressure: variasi musiman + AR(1)
+    - pm25: log-normal, tinggi di musim dingin/kering, puncak jam sibuk
+      pagi/malam, naik saat humidity dan pressure tinggi (stagnan)
+    - pm10: pm25 × rasio lokasi × noise log-normal (selalu >= pm25)
+
+Setiap chunk memakai np.random.default_rng([seed, chunk]) sehingga hasil
+identik berapa pun jumlah worker. Worker menulis chunk langsung ke .npy
+memmap dalam format dataset_cache (load_dir / load_xy bisa langsung
+dipakai), jadi memory tetap ~ satu chunk per worker untuk 100M+ rows.
+
+Usage:
+    python synthetic_data.py --rows 100000000 --workers 8
+    python synthetic_data.py --rows 1000000 --profiles my_profiles.json --locations India
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.signal import lfilter
+
+from dataset_cache import CACHE_DIR, CACHE_VERSION, _publish, _write_meta
+
+GENERATOR_VERSION = 1
+DEFAULT_CHUNK_ROWS = 1_000_000
+START = np.datetime64('2024-01-01T00:00', 'ns')
+HOUR_NS = np.int64(3_600_000_000_000)
+STATION_HOURS = 24 * 365 * 5
+
+NUMERIC_COLUMNS = ('temperature', 'humidity', 'pressure', 'pm25', 'pm10', 'voc', 'eco2')
+
+# Profil per lokasi. *_doy = hari puncak (day of year), *_ar = koefisien AR(1) per jam
+PROFILES = {
+    'India': {
+        'weight': 1.0,
+        'temp_mean': 27.0, 'temp_seasonal': 6.0, 'hot_doy': 140, 'temp_diurnal': 5.0,
+        'temp_noise': 1.5, 'temp_ar': 0.9,
+        'hum_mean': 60.0, 'hum_seasonal': 15.0, 'wet_doy': 210, 'hum_per_degree': -2.0,
+        'hum_noise': 6.0, 'hum_ar': 0.85,
+        'pres_mean': 1008.0, 'pres_seasonal': 6.0, 'pres_noise': 2.5, 'pres_ar': 0.97,
+        'pm25_median': 45.0, 'pm25_seasonal': 0.6, 'pm25_diurnal': 0.25,
+        'pm25_per_humidity': 0.008, 'pm25_per_hpa': 0.03, 'pm25_noise': 0.45, 'pm25_ar': 0.95,
+        'pm10_ratio': 1.8, 'pm10_noise': 0.15,
+        'voc_mean': 150.0, 'voc_std': 50.0, 'eco2_mean': 450.0, 'eco2_std': 50.0,
+    },
+    'Singapore': {
+        'weight': 1.0,
+        'temp_mean': 28.0, 'temp_seasonal': 1.0, 'hot_doy': 150, 'temp_diurnal': 3.0,
+        'temp_noise': 0.8, 'temp_ar': 0.9,
+        'hum_mean': 80.0, 'hum_seasonal': 5.0, 'wet_doy': 340, 'hum_per_degree': -3.0,
+        'hum_noise': 5.0, 'hum_ar': 0.85,
+        'pres_mean': 1010.0, 'pres_seasonal': 1.5, 'pres_noise': 1.5, 'pres_ar': 0.97,
+        'pm25_median': 14.0, 'pm25_seasonal': 0.3, 'pm25_diurnal': 0.15,
+        'pm25_per_humidity': 0.006, 'pm25_per_hpa': 0.04, 'pm25_noise': 0.35, 'pm25_ar': 0.95,
+        'pm10_ratio': 1.6, 'pm10_noise': 0.12,
+        'voc_mean': 100.0, 'voc_std': 30.0, 'eco2_mean': 400.0, 'eco2_std': 30.0,
+    },
+}
+
+
+def load_profiles(path=None, locations=None):
+    """
+    Profil lokasi dari JSON (override per key di atas default) atau default
+
+    Returns:
+        dict {lokasi: profil}, urutan = urutan kode kategori 'location'
+    """
+    profiles = {name: dict(p) for name, p in PROFILES.items()}
+    if path:
+        with open(path) as f:
+            for name, overrides in json.load(f).items():
+                base = profiles.get(name, PROFILES['India'])
+                profiles[name] = {**base, **overrides}
+    if locations:
+        missing = [name for name in locations if name not in profiles]
+        if missing:
+            raise KeyError(f"No profile for locations: {missing}")
+        profiles = {name: profiles[name] for name in locations}
+    return profiles
+
+
+def location_starts(rows, profiles):
+    """Baris awal setiap lokasi (dibagi sesuai 'weight'), plus total di akhir"""
+    weights = np.array([p['weight'] for p in profiles.values()], dtype=np.float64)
+    counts = np.floor(rows * weights / weights.sum()).astype(np.int64)
+    counts[-1] += rows - counts.sum()
+    return np.concatenate([[0], np.cumsum(counts)])
+
+
+# ==========================================
+# 1. Chunk Generation
+# ==========================================
+def _ar1(rng, n, phi):
+    """Noise AR(1) unit variance, mulai dari distribusi stasioner"""
+    white = rng.standard_normal(n) * np.sqrt(1 - phi * phi)
+    return lfilter([1.0], [1.0, -phi], white, zi=[phi * rng.standard_normal()])[0]
+
+
+def _cycle(position, period, peak):
+    return np.cos(2 * np.pi * (position - peak) / period)
+
+
+def _generate_location(rng, p, t):
+    """Semua kolom numerik untuk satu lokasi, t = index jam (int64)"""
+    n = len(t)
+    hour = (t % 24).astype(np.float64)
+    doy = ((t // 24) % 365).astype(np.float64)
+
+    season = _cycle(doy, 365.0, p['hot_doy'])
+    temperature = (p['temp_mean'] + p['temp_seasonal'] * season
+                   + p['temp_diurnal'] * _cycle(hour, 24.0, 15.0)
+                   + p['temp_noise'] * _ar1(rng, n, p['temp_ar']))
+
+    expected_temp = p['temp_mean'] + p['temp_seasonal'] * season
+    humidity = (p['hum_mean'] + p['hum_seasonal'] * _cycle(doy, 365.0, p['wet_doy'])
+                + p['hum_per_degree'] * (temperature - expected_temp)
+                + p['hum_noise'] * _ar1(rng, n, p['hum_ar']))
+    humidity = np.clip(humidity, 5.0, 100.0)
+
+    pressure = (p['pres_mean'] - p['pres_seasonal'] * season
+                + p['pres_noise'] * _ar1(rng, n, p['pres_ar']))
+
+    # Puncak jam sibuk ~08:00 dan ~20:00, tinggi di musim dingin
+    log_pm25 = (np.log(p['pm25_median']) - p['pm25_seasonal'] * season
+                + p['pm25_diurnal'] * _cycle(hour, 12.0, 8.0)
+                + p['pm25_per_humidity'] * (humidity - p['hum_mean'])
+                + p['pm25_per_hpa'] * (pressure - p['pres_mean'])
+                + p['pm25_noise'] * _ar1(rng, n, p['pm25_ar']))
+    pm25 = np.exp(log_pm25)
+    pm10 = pm25 * np.maximum(p['pm10_ratio'] * np.exp(p['pm10_noise'] * rng.standard_normal(n)), 1.0)
+
+    return {
+        'temperature': temperature,
+        'humidity': humidity,
+        'pressure': pressure,
+        'pm25': pm25,
+        'pm10': pm10,
+        'voc': rng.normal(p['voc_mean'], p['voc_std'], n),
+        'eco2': rng.normal(p['eco2_mean'], p['eco2_std'], n),
+    }
+
+
+def generate_chunk(start, n, starts, profiles, seed=42, chunk_index=0):
+    """
+    Generate baris [start, start + n) dari dataset global
+
+    Args:
+        starts: hasil location_starts(rows, profiles)
+        chunk_index: bagian dari seed, jadi setiap chunk deterministik
+
+    Returns:
+        dict kolom: timestamp (M8[ns]), location + station (int32), kolom
+        numerik (float32)
+    """
+    rng = np.random.default_rng([seed, chunk_index])
+    rows = np.arange(start, start + n, dtype=np.int64)
+    location = (np.searchsorted(starts, rows, side='right') - 1).astype(np.int32)
+    station, t = np.divmod(rows - starts[location], STATION_HOURS)
+
+    out = {name: np.empty(n, dtype=np.float32) for name in NUMERIC_COLUMNS}
+    for code, profile in enumerate(profiles.values()):
+        mask = location == code
+        if not mask.any():
+            continue
+        for name, values in _generate_location(rng, profile, t[mask]).items():
+            out[name][mask] = values
+    out['timestamp'] = START + t * HOUR_NS
+    out['location'] = location
+    out['station'] = station.astype(np.int32)
+    return out
+
+
+def generate_frame(rows, seed=42, profiles=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Dataset kecil sebagai DataFrame (single process), misal untuk sample CSV
+
+    Returns:
+        DataFrame: timestamp, temperature, humidity, pressure, pm25, pm10,
+        voc, eco2, location (nama lokasi)
+    """
+    import pandas as pd
+
+    profiles = profiles or load_profiles()
+    starts = location_starts(rows, profiles)
+    names = np.array(list(profiles))
+    frames = []
+    for chunk_index, start in enumerate(range(0, rows, chunk_rows)):
+        columns = generate_chunk(start, min(chunk_rows, rows - start), starts, profiles,
+                                 seed, chunk_index)
+        columns['location'] = names[columns['location']]
+        del columns['station']
+        frames.append(pd.DataFrame(columns)[['timestamp', *NUMERIC_COLUMNS, 'location']])
+    return pd.concat(frames, ignore_index=True)
+
+
+# ==========================================
+# 2. Parallel Columnar Writer
+# ==========================================
+_worker = {}
+
+
+def _init_worker(tmp_dir, rows, profiles, seed, chunk_rows):
+    _worker['starts'] = location_starts(rows, profiles)
+    _worker.update(tmp_dir=tmp_dir, rows=rows, profiles=profiles, seed=seed, chunk_rows=chunk_rows)
+
+
+def _write_chunk(chunk_index):
+    """Generate satu chunk dan tulis ke slice-nya di setiap kolom .npy"""
+    start = chunk_index * _worker['chunk_rows']
+    n = min(_worker['chunk_rows'], _worker['rows'] - start)
+    columns = generate_chunk(start, n, _worker['starts'], _worker['profiles'],
+                             _worker['seed'], chunk_index)
+    for name, values in columns.items():
+        # Memmap dibuka per chunk supaya page yang sudah ditulis tidak
+        # menumpuk di RSS worker (memory tetap ~ satu chunk)
+        out = np.load(os.path.join(_worker['tmp_dir'], f"{name}.npy"), mmap_mode='r+')
+        out[start:start + n] = values
+        out.flush()
+        del out
+    return n
+
+
+def cache_key(rows, seed, chunk_rows, profiles):
+    params = {'version': GENERATOR_VERSION, 'rows': rows, 'seed': seed,
+              'chunk_rows': chunk_rows, 'profiles': profiles}
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def generate_cache(rows, cache_root=CACHE_DIR, seed=42, chunk_rows=DEFAULT_CHUNK_ROWS,
+                   workers=None, profiles=None, force=False, progress=False):
+    """
+    Generate dataset sintetis langsung ke cache columnar
+
+    Hasil identik untuk parameter yang sama, jadi cache yang sudah ada
+    dipakai ulang (kecuali force=True).
+
+    Returns:
+        path cache/synthetic-<key> (bisa dibuka dengan load_dir / load_xy)
+    """
+    profiles = profiles or load_profiles()
+    key = cache_key(rows, seed, chunk_rows, profiles)
+    cache_dir = os.path.join(cache_root, f"synthetic-{key[:16]}")
+    if not force and os.path.exists(os.path.join(cache_dir, "meta.json")):
+        return cache_dir
+
+    os.makedirs(cache_root, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".build-", dir=cache_root)
+    try:
+        dtypes = {'timestamp': np.dtype('M8[ns]'), 'location': np.dtype(np.int32),
+                  'station': np.dtype(np.int32),
+                  **{name: np.dtype(np.float32) for name in NUMERIC_COLUMNS}}
+        for name, dtype in dtypes.items():
+            np.lib.format.open_memmap(os.path.join(tmp_dir, f"{name}.npy"), mode='w+',
+                                      dtype=dtype, shape=(rows,)).flush()
+
+        n_chunks = -(-rows // chunk_rows)
+        workers = max(1, min(workers or os.cpu_count() or 1, n_chunks))
+        done = 0
+        start = time.perf_counter()
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(tmp_dir, rows, profiles, seed, chunk_rows)) as pool:
+            for n in pool.map(_write_chunk, range(n_chunks)):
+                done += n
+                if progress:
+                    elapsed = time.perf_counter() - start
+                    print(f"   {done:,}/{rows:,} rows ({done / elapsed:,.0f} rows/sec)", end="\r")
+        if progress:
+            print()
+
+        columns = {name: {'dtype': dtype.str} for name, dtype in dtypes.items()}
+        columns['location']['categories'] = list(profiles)
+        meta = {
+            'version': CACHE_VERSION,
+            'rows': rows,
+            'columns': columns,
+            'source': {'generator': 'synthetic_data', 'sha256': key},
+            'generator': {'version': GENERATOR_VERSION, 'seed': seed,
+                          'chunk_rows': chunk_rows, 'profiles': profiles},
+        }
+        _write_meta(tmp_dir, meta)
+        _publish(tmp_dir, cache_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return cache_dir
+
+
+# ==========================================
+# Main Function
+# ==========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic air quality data (columnar cache)")
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument('--workers', type=int, default=None, help="Default: cpu_count")
+    parser.add_argument('--profiles', default=None, help="JSON override profil lokasi")
+    parser.add_argument('--locations', default=None, help="Subset lokasi, dipisah koma")
+    parser.add_argument('--cache-root', default=CACHE_DIR)
+    parser.add_argument('--force', action='store_true')
+    args = parser.parse_args()
+
+    print("="*60)
+    print(f"Generating Synthetic Dataset ({args.rows:,} rows)")
+    print("="*60)
+
+    profiles = load_profiles(args.profiles, args.locations.split(',') if args.locations else None)
+    start = time.perf_counter()
+    cache_dir = generate_cache(args.rows, args.cache_root, args.seed, args.chunk_rows,
+                               args.workers, profiles, args.force, progress=True)
+    elapsed = time.perf_counter() - start
+    print(f"   ✅ {cache_dir} ({elapsed:.1f}s, {args.rows / elapsed:,.0f} rows/sec)")
+    print(f"   Locations: {', '.join(profiles)}")
@@ -3,7 +3,6 @@ Train Machine Learning Model untuk ESP32 Offline Mode
 Memprediksi PM2.5 dan PM10 berdasarkan Temperature, Humidity, Pressure
 """
 
-import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import MinMaxScaler
@@ -12,6 +11,45 @@ import tensorflow as tf
 from tensorflow import keras
 import pickle
 import os
+import argparse
+
+from data_pipeline import (
+    FEATURES, TARGETS, TRAIN, VAL, DEFAULT_CHUNKSIZE,
+    fit_scalers, make_dataset, evaluate_streaming,
+)
+from dataset_cache import build_cache, load_dir, synthetic_targets, synthetic_warning
+from prepare_beijing import SOURCE_PATH, build_training_cache
+from pm_model import build_model
+from export_numpy import export_npz
+from model_bundle import DEFAULT_BUNDLE, save_bundle, source_digests
+from features import build_features
+from history_store import DEFAULT_ROOT as HISTORY_ROOT, HistoryStore
+from instrumentation import RunReport
+
+parser = argparse.ArgumentParser(description="Train PM2.5/PM10 predictor for ESP32 offline mode")
+parser.add_argument('--dataset', default="processed/sample_india_singapore_dataset.csv",
+                    help="Path ke CSV dataset")
+parser.add_argument('--stream', action='store_true',
+                    help="Streaming ingestion per chunk (memory tetap kecil untuk dataset besar)")
+parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                    help="Jumlah baris per chunk untuk --stream")
+parser.add_argument('--reference', action='store_true',
+                    help="Train dengan Beijing PRSA reference dataset (prepare_beijing.py)")
+parser.add_argument('--features', action='store_true',
+                    help="Tambah lag/rolling/time features per lokasi (features.py)")
+parser.add_argument('--history-site', default=None,
+                    help="Train dari history store (history_store.py) untuk site ini")
+parser.add_argument('--days', type=int, default=90,
+                    help="Window --history-site: N hari terakhir data site")
+parser.add_argument('--history-root', default=HISTORY_ROOT)
+args = parser.parse_args()
+if args.history_site and (args.stream or args.reference):
+    parser.error("--history-site exports a columnar cache; not combinable with --stream/--reference")
+if args.reference and args.stream:
+    parser.error("--reference uses the prepared columnar cache, not --stream")
+if args.features and args.stream:
+    parser.error("--features needs the columnar cache (timestamp order), not --stream")
+report = RunReport("train_model")
 
 print("="*60)
 print("Training ML Model for ESP32 Offline Mode")
@@ -20,180 +58,263 @@ print("="*60)
 # ==========================================
 # 1. Load Dataset
 # ==========================================
-print("\n[1/5] Loading dataset...")
-dataset_path = "processed/sample_india_singapore_dataset.csv"
-
-if not os.path.exists(dataset_path):
-    print(f"❌ Dataset not found: {dataset_path}")
-    print("   Run download_datasets.py first!")
-    exit(1)
-
-df = pd.read_csv(dataset_path)
-print(f"   ✅ Loaded: {len(df)} records")
-print(f"   Columns: {list(df.columns)}")
+with report.stage("load"):
+    print("\n[1/5] Loading dataset...")
+    dataset_path = SOURCE_PATH if args.reference else args.dataset
+
+    if args.history_site:
+        history = HistoryStore(args.history_root)
+        window = history.window(args.history_site, args.days)
+        if window is None:
+            print(f"❌ No history for site: {args.history_site} ({args.history_root})")
+            print("   Run waqi_fetcher.py or history_store.py --import-csv first!")
+            exit(1)
+        print(f"   History window: {args.history_site} {window[0]} → {window[1]}")
+    elif not os.path.exists(dataset_path):
+        print(f"❌ Dataset not found: {dataset_path}")
+        print("   Run download_datasets.py first!")
+        exit(1)
+
+    synthetic = {}
+    if args.stream:
+        print(f"   Streaming mode: {args.chunksize:,} rows/chunk, float32, columns {FEATURES + TARGETS}")
+    else:
+        # Columnar cache (memmap .npy), dibuat ulang hanya kalau CSV berubah
+        if args.history_site:
+            cache_dir = history.export_cache(args.history_site, *window)
+        else:
+            cache_dir = build_training_cache() if args.reference else build_cache(dataset_path)
+        # --features butuh timestamp/location/voc/eco2 juga
+        columns, cache_meta = load_dir(cache_dir, None if args.features else FEATURES + TARGETS)
+        print(f"   ✅ Loaded: {cache_meta['rows']} records (cache: {cache_dir})")
+        print(f"   Columns: {list(cache_meta['columns'])}")
+        # Target yang dibuat dari target lain (pm10 Beijing = pm25 / 0.6)
+        synthetic = synthetic_targets(cache_dir)
 
 # ==========================================
 # 2. Preprocess Data
 # ==========================================
-print("\n[2/5] Preprocessing data...")
-
-# Select features (input)
-X = df[['temperature', 'humidity', 'pressure']].values
-print(f"   Input features: temperature, humidity, pressure")
-print(f"   Input shape: {X.shape}")
-
-# Select targets (output)
-y = df[['pm25', 'pm10']].values
-print(f"   Output targets: pm25, pm10")
-print(f"   Output shape: {y.shape}")
-
-# Remove any NaN or infinite values
-mask = ~(np.isnan(X).any(axis=1) | np.isnan(y).any(axis=1) | 
-         np.isinf(X).any(axis=1) | np.isinf(y).any(axis=1))
-X = X[mask]
-y = y[mask]
-print(f"   After cleaning: {len(X)} records")
-
-# Split train/test
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42
-)
-print(f"   Train: {len(X_train)} samples")
-print(f"   Test: {len(X_test)} samples")
-
-# Scale features (0-1 normalization)
-scaler_X = MinMaxScaler()
-scaler_y = MinMaxScaler()
-
-X_train_scaled = scaler_X.fit_transform(X_train)
-X_test_scaled = scaler_X.transform(X_test)
-y_train_scaled = scaler_y.fit_transform(y_train)
-y_test_scaled = scaler_y.transform(y_test)
-
-print("   ✅ Data scaled (0-1 normalization)")
-
-# Save scalers for ESP32
-os.makedirs("models", exist_ok=True)
-with open('models/scaler_X.pkl', 'wb') as f:
-    pickle.dump(scaler_X, f)
-with open('models/scaler_y.pkl', 'wb') as f:
-    pickle.dump(scaler_y, f)
-print("   ✅ Scalers saved: models/scaler_X.pkl, models/scaler_y.pkl")
+with report.stage("preprocess"):
+    print("\n[2/5] Preprocessing data...")
+
+    input_features = list(FEATURES)
+    if args.stream:
+        # First pass: fit scalers incrementally, count rows per split
+        scaler_X, scaler_y, split_counts = fit_scalers(dataset_path, args.chunksize)
+        print(f"   Input features: {', '.join(FEATURES)}")
+        print(f"   Output targets: {', '.join(TARGETS)}")
+        print(f"   Train: {split_counts['train']} samples (validation: {split_counts['val']})")
+        print(f"   Test: {split_counts['test']} samples")
+        print("   ✅ Scalers fitted incrementally (partial_fit)")
+    else:
+        # Select features (input)
+        if args.features:
+            # Lag/rolling/time features, grouped per lokasi, satu pass vectorized
+            X, input_features = build_features(columns)
+            print(f"   Input features: {len(input_features)} (lag, rolling, tendency, time)")
+        else:
+            X = np.column_stack([columns[c] for c in FEATURES])
+            print(f"   Input features: temperature, humidity, pressure")
+        print(f"   Input shape: {X.shape}")
+
+        # Select targets (output)
+        y = np.column_stack([columns[c] for c in TARGETS])
+        print(f"   Output targets: pm25, pm10")
+        print(f"   Output shape: {y.shape}")
+
+        # Remove any NaN or infinite values
+        mask = ~(np.isnan(X).any(axis=1) | np.isnan(y).any(axis=1) | 
+                 np.isinf(X).any(axis=1) | np.isinf(y).any(axis=1))
+        X = X[mask]
+        y = y[mask]
+        print(f"   After cleaning: {len(X)} records")
+
+        # Split train/test
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=42
+        )
+        print(f"   Train: {len(X_train)} samples")
+        print(f"   Test: {len(X_test)} samples")
+
+        # Scale features (0-1 normalization)
+        scaler_X = MinMaxScaler()
+        scaler_y = MinMaxScaler()
+
+        X_train_scaled = scaler_X.fit_transform(X_train)
+        X_test_scaled = scaler_X.transform(X_test)
+        y_train_scaled = scaler_y.fit_transform(y_train)
+        y_test_scaled = scaler_y.transform(y_test)
+
+        print("   ✅ Data scaled (0-1 normalization)")
+
+    # Save scalers (pickle, format lama; inference memakai model bundle .pmb)
+    os.makedirs("models", exist_ok=True)
+    with open('models/scaler_X.pkl', 'wb') as f:
+        pickle.dump(scaler_X, f)
+    with open('models/scaler_y.pkl', 'wb') as f:
+        pickle.dump(scaler_y, f)
+    print("   ✅ Scalers saved: models/scaler_X.pkl, models/scaler_y.pkl")
 
 # ==========================================
 # 3. Build Neural Network Model
 # ==========================================
-print("\n[3/5] Building neural network model...")
-
-# Simple model untuk ESP32 (lightweight)
-model = keras.Sequential([
-    keras.layers.Dense(16, activation='relu', input_shape=(3,), name='input'),
-    keras.layers.Dropout(0.2),
-    keras.layers.Dense(8, activation='relu', name='hidden1'),
-    keras.layers.Dense(4, activation='relu', name='hidden2'),
-    keras.layers.Dense(2, activation='linear', name='output')  # PM2.5, PM10
-])
-
-model.compile(
-    optimizer='adam',
-    loss='mse',
-    metrics=['mae']
-)
+with report.stage("build"):
+    print("\n[3/5] Building neural network model...")
 
-print("   Model architecture:")
-model.summary()
+    # Simple model untuk ESP32 (lightweight): Dense 16-8-4-2 (PM2.5, PM10)
+    model = build_model(input_dim=len(input_features))
 
-# Calculate model size
-model_size = sum([tf.keras.backend.count_params(w) for w in model.trainable_weights])
-print(f"   Total parameters: {model_size:,}")
+    print("   Model architecture:")
+    model.summary()
+
+    # Calculate model size
+    model_size = sum([tf.keras.backend.count_params(w) for w in model.trainable_weights])
+    print(f"   Total parameters: {model_size:,}")
 
 # ==========================================
 # 4. Train Model
 # ==========================================
-print("\n[4/5] Training model...")
-
-# Training with early stopping
-early_stopping = keras.callbacks.EarlyStopping(
-    monitor='val_loss',
-    patience=10,
-    restore_best_weights=True
-)
-
-history = model.fit(
-    X_train_scaled, y_train_scaled,
-    validation_split=0.2,
-    epochs=100,
-    batch_size=32,
-    verbose=1,
-    callbacks=[early_stopping]
-)
-
-print("   ✅ Training complete!")
+with report.stage("train"):
+    print("\n[4/5] Training model...")
+
+    # Training with early stopping
+    early_stopping = keras.callbacks.EarlyStopping(
+        monitor='val_loss',
+        patience=10,
+        restore_best_weights=True
+    )
+
+    if args.stream:
+        # Second pass onwards: tf.data re-reads the CSV chunk by chunk every epoch
+        train_ds = make_dataset(dataset_path, TRAIN, scaler_X, scaler_y,
+                                batch_size=32, chunksize=args.chunksize)
+        val_ds = make_dataset(dataset_path, VAL, scaler_X, scaler_y,
+                              batch_size=32, chunksize=args.chunksize)
+        history = model.fit(
+            train_ds,
+            validation_data=val_ds,
+            epochs=100,
+            verbose=1,
+            callbacks=[early_stopping]
+        )
+    else:
+        history = model.fit(
+            X_train_scaled, y_train_scaled,
+            validation_split=0.2,
+            epochs=100,
+            batch_size=32,
+            verbose=1,
+            callbacks=[early_stopping]
+        )
+
+    print("   ✅ Training complete!")
 
 # ==========================================
 # 5. Evaluate Model
 # ==========================================
-print("\n[5/5] Evaluating model...")
-
-# Predictions
-y_pred_scaled = model.predict(X_test_scaled)
-y_pred = scaler_y.inverse_transform(y_pred_scaled)
-y_test_actual = scaler_y.inverse_transform(y_test_scaled)
-
-# Metrics
-mse_pm25 = mean_squared_error(y_test_actual[:, 0], y_pred[:, 0])
-mse_pm10 = mean_squared_error(y_test_actual[:, 1], y_pred[:, 1])
-mae_pm25 = mean_absolute_error(y_test_actual[:, 0], y_pred[:, 0])
-mae_pm10 = mean_absolute_error(y_test_actual[:, 1], y_pred[:, 1])
-r2_pm25 = r2_score(y_test_actual[:, 0], y_pred[:, 0])
-r2_pm10 = r2_score(y_test_actual[:, 1], y_pred[:, 1])
-
-print("\n   Model Performance:")
-print(f"   PM2.5:")
-print(f"     - MSE: {mse_pm25:.2f}")
-print(f"     - MAE: {mae_pm25:.2f} µg/m³")
-print(f"     - R²:  {r2_pm25:.3f}")
-print(f"   PM10:")
-print(f"     - MSE: {mse_pm10:.2f}")
-print(f"     - MAE: {mae_pm10:.2f} µg/m³")
-print(f"     - R²:  {r2_pm10:.3f}")
-
-# Sample predictions
-print("\n   Sample Predictions:")
-for i in range(5):
-    print(f"   Test {i+1}:")
-    print(f"     Input: T={X_test[i][0]:.1f}°C, H={X_test[i][1]:.1f}%, P={X_test[i][2]:.1f}hPa")
-    print(f"     Actual: PM2.5={y_test_actual[i][0]:.1f}, PM10={y_test_actual[i][1]:.1f}")
-    print(f"     Predicted: PM2.5={y_pred[i][0]:.1f}, PM10={y_pred[i][1]:.1f}")
+with report.stage("evaluate"):
+    print("\n[5/5] Evaluating model...")
+
+    if args.stream:
+        metrics, (X_test, y_test_actual, y_pred) = evaluate_streaming(
+            model, dataset_path, scaler_X, scaler_y, chunksize=args.chunksize
+        )
+        mse_pm25, mse_pm10 = metrics['mse']
+        mae_pm25, mae_pm10 = metrics['mae']
+        r2_pm25, r2_pm10 = metrics['r2']
+    else:
+        # Predictions
+        y_pred_scaled = model.predict(X_test_scaled)
+        y_pred = scaler_y.inverse_transform(y_pred_scaled)
+        y_test_actual = scaler_y.inverse_transform(y_test_scaled)
+
+        # Metrics
+        mse_pm25 = mean_squared_error(y_test_actual[:, 0], y_pred[:, 0])
+        mse_pm10 = mean_squared_error(y_test_actual[:, 1], y_pred[:, 1])
+        mae_pm25 = mean_absolute_error(y_test_actual[:, 0], y_pred[:, 0])
+        mae_pm10 = mean_absolute_error(y_test_actual[:, 1], y_pred[:, 1])
+        r2_pm25 = r2_score(y_test_actual[:, 0], y_pred[:, 0])
+        r2_pm10 = r2_score(y_test_actual[:, 1], y_pred[:, 1])
+
+    print("\n   Model Performance:")
+    print(f"   PM2.5:")
+    print(f"     - MSE: {mse_pm25:.2f}")
+    print(f"     - MAE: {mae_pm25:.2f} µg/m³")
+    print(f"     - R²:  {r2_pm25:.3f}")
+    print(f"   PM10{' (synthetic)' if 'pm10' in synthetic else ''}:")
+    print(f"     - MSE: {mse_pm10:.2f}")
+    print(f"     - MAE: {mae_pm10:.2f} µg/m³")
+    print(f"     - R²:  {r2_pm10:.3f}")
+    if synthetic:
+        print(f"   {synthetic_warning(synthetic)}")
+
+    # Sample predictions
+    print("\n   Sample Predictions:")
+    for i in range(min(5, len(X_test))):
+        print(f"   Test {i+1}:")
+        print(f"     Input: T={X_test[i][0]:.1f}°C, H={X_test[i][1]:.1f}%, P={X_test[i][2]:.1f}hPa")
+        print(f"     Actual: PM2.5={y_test_actual[i][0]:.1f}, PM10={y_test_actual[i][1]:.1f}")
+        print(f"     Predicted: PM2.5={y_pred[i][0]:.1f}, PM10={y_pred[i][1]:.1f}")
 
 # ==========================================
 # 6. Save Model
 # ==========================================
-print("\n[6/6] Saving model...")
-
-# Save Keras model (both formats for compatibility)
-model.save('models/pm_predictor.h5')
-model.save_weights('models/pm_predictor_weights.h5')
-print("   ✅ Saved: models/pm_predictor.h5")
-print("   ✅ Saved: models/pm_predictor_weights.h5")
-
-# Save model info
-model_info = {
-    'input_features': ['temperature', 'humidity', 'pressure'],
-    'output_targets': ['pm25', 'pm10'],
-    'model_size': int(model_size),
-    'mse_pm25': float(mse_pm25),
-    'mse_pm10': float(mse_pm10),
-    'mae_pm25': float(mae_pm25),
-    'mae_pm10': float(mae_pm10),
-    'r2_pm25': float(r2_pm25),
-    'r2_pm10': float(r2_pm10),
-}
-
-import json
-with open('models/model_info.json', 'w') as f:
-    json.dump(model_info, f, indent=2)
-print("   ✅ Saved: models/model_info.json")
+with report.stage("save"):
+    print("\n[6/6] Saving model...")
+
+    # Save Keras model (.weights.h5 ditulis paling akhir, lihat bawah)
+    model.save('models/pm_predictor.h5')
+    print("   ✅ Saved: models/pm_predictor.h5")
+
+    # NumPy weights + scalers (inference tanpa TensorFlow)
+    export_npz(model, scaler_X, scaler_y)
+    print("   ✅ Saved: models/pm_predictor_weights.npz")
+
+    # Save model info
+    model_info = {
+        'input_features': input_features,
+        'output_targets': ['pm25', 'pm10'],
+        'model_size': int(model_size),
+        'mse_pm25': float(mse_pm25),
+        'mse_pm10': float(mse_pm10),
+        'mae_pm25': float(mae_pm25),
+        'mae_pm10': float(mae_pm10),
+        'r2_pm25': float(r2_pm25),
+        'r2_pm10': float(r2_pm10),
+    }
+    if synthetic:
+        model_info['synthetic_targets'] = synthetic
+
+    # Hasil cross_validation.py / online_update.py tidak ditimpa
+    import json
+    try:
+        with open('models/model_info.json') as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+    for key in ('cross_validation', 'online'):
+        if key in previous:
+            model_info[key] = previous[key]
+
+    with open('models/model_info.json', 'w') as f:
+        json.dump(model_info, f, indent=2)
+    print("   ✅ Saved: models/model_info.json")
+
+    # Satu file berversi: weights + scaler + model_info (load tanpa sklearn);
+    # sha256 .h5 + pickle run ini dicatat supaya bundle lama tidak dipakai
+    sources = source_digests(['models/pm_predictor.h5', 'models/scaler_X.pkl', 'models/scaler_y.pkl'])
+    save_bundle(model, scaler_X, scaler_y, model_info, sources=sources)
+    print(f"   ✅ Saved: {DEFAULT_BUNDLE}")
+
+    # Weights saja (Keras 3 mewajibkan akhiran .weights.h5)
+    model.save_weights('models/pm_predictor.weights.h5')
+    print("   ✅ Saved: models/pm_predictor.weights.h5")
+
+report.extra['model_info'] = model_info
+run_report_path = report.write()
+print("\n   Stage timing:")
+print(report.summary())
+print(f"   ✅ Saved: {run_report_path}")
 
 print("\n" + "="*60)
 print("✅ Training Complete!")
@@ -0,0 +1,378 @@
+"""
+Concurrent async WAQI fetcher (aiohttp)
+
+Satu ClientSession dengan connection pool dipakai untuk semua request;
+concurrency dibatasi semaphore dan request rate dibatasi token bucket.
+Request yang gagal (timeout, HTTP 429/5xx, "Over quota") di-retry dengan
+exponential backoff + jitter. Hasil setiap station langsung di-append ke
+store begitu selesai, tanpa menunggu station lain, dan juga ke history
+store per station/hari (history_store.py) untuk training per window waktu.
+
+Historis: WAQI tidak punya endpoint history publik; feed setiap station
+berisi `forecast.daily` (avg/min/max per hari, beberapa hari ke belakang +
+forecast). Record harian dengan tanggal dalam `days` terakhir ikut disimpan.
+Daftar station bisa di-page per tile lewat /map/bounds (--bounds).
+
+Usage:
+    export WAQI_TOKEN=...
+    python waqi_fetcher.py --stations delhi,mumbai,bangalore,singapore --days 7
+    python waqi_fetcher.py --bounds 8,68,37,97 --tile 4 --rate 20 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import aiohttp
+
+from history_store import DEFAULT_ROOT as DEFAULT_HISTORY_ROOT, HistoryStore
+
+WAQI_BASE_URL = "https://api.waqi.info"
+DEFAULT_STORE = "raw/waqi/waqi_observations.csv"
+DEFAULT_RATE = 10.0          # request/detik
+DEFAULT_CONCURRENCY = 32
+DEFAULT_RETRIES = 4
+DEFAULT_TIMEOUT = 15.0
+
+STORE_COLUMNS = ['fetched_at', 'timestamp', 'kind', 'station', 'uid', 'city',
+                 'lat', 'lon', 'aqi', 'pm25', 'pm10', 'temperature', 'humidity', 'pressure']
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class WaqiError(Exception):
+    """Error dari API WAQI yang tidak perlu di-retry (misal invalid token)"""
+
+
+# ==========================================
+# 1. Rate Limiting
+# ==========================================
+class TokenBucket:
+    """
+    Token bucket async: rata-rata `rate` request/detik, burst sampai `burst`
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# ==========================================
+# 2. Client
+# ==========================================
+class WaqiClient:
+    """
+    Async client WAQI dengan pooled session, rate limit dan retry
+
+    Usage:
+        async with WaqiClient(token) as client:
+            data = await client.feed('delhi')
+    """
+
+    def __init__(self, token, base_url=WAQI_BASE_URL, rate=DEFAULT_RATE,
+                 concurrency=DEFAULT_CONCURRENCY, retries=DEFAULT_RETRIES,
+                 timeout=DEFAULT_TIMEOUT):
+        self.token = token
+        self.base_url = base_url.rstrip('/')
+        self.retries = retries
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.limiter = TokenBucket(rate)
+        self.stats = {'requests': 0, 'retries': 0, 'errors': 0}
+        self._semaphore = None
+        self._session = None
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+        self._session = aiohttp.ClientSession(
+            connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+    async def get(self, path, **params):
+        """
+        GET satu endpoint, return field `data` dari response
+
+        Raises:
+            WaqiError: status 'error' yang bukan quota, atau retry habis
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        params['token'] = self.token
+        for attempt in range(self.retries + 1):
+            delay = None
+            async with self._semaphore:
+                await self.limiter.acquire()
+                self.stats['requests'] += 1
+                try:
+                    async with self._session.get(url, params=params) as response:
+                        if response.status in RETRY_STATUS:
+                            retry_after = response.headers.get('Retry-After')
+                            delay = float(retry_after) if retry_after and retry_after.isdigit() else None
+                            error = f"HTTP {response.status}"
+                        elif response.status >= 400:
+                            self.stats['errors'] += 1
+                            raise WaqiError(f"{path}: HTTP {response.status}")
+                        else:
+                            body = await response.json(content_type=None)
+                            if not isinstance(body, dict):
+                                # Body terpotong / bukan object JSON: anggap transient
+                                error = f"Unexpected response body ({type(body).__name__})"
+                            elif body.get('status') == 'ok':
+                                return body.get('data')
+                            else:
+                                error = str(body.get('data') or body.get('message') or 'Unknown error')
+                                if 'quota' not in error.lower():
+                                    self.stats['errors'] += 1
+                                    raise WaqiError(f"{path}: {error}")
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    # ValueError: json.JSONDecodeError / UnicodeDecodeError dari response.json()
+                    error = f"{type(e).__name__}: {e}"
+            if attempt == self.retries:
+                break
+            self.stats['retries'] += 1
+            # Backoff di luar semaphore supaya slot dipakai request lain
+            await asyncio.sleep(delay if delay is not None else
+                                (2 ** attempt) * 0.5 * (1 + random.random()))
+        self.stats['errors'] += 1
+        raise WaqiError(f"{path}: {error} (after {self.retries + 1} attempts)")
+
+    async def feed(self, station):
+        """Feed station: nama kota ('delhi'), '@<uid>' atau 'geo:lat;lng'"""
+        return await self.get(f"feed/{station}/")
+
+    async def stations_in_bounds(self, lat1, lng1, lat2, lng2):
+        """List station di dalam bounding box (endpoint /map/bounds)"""
+        return await self.get("map/bounds/", latlng=f"{lat1},{lng1},{lat2},{lng2}") or []
+
+
+async def discover_stations(client, bounds, tile=5.0):
+    """
+    Page /map/bounds per tile supaya area besar tidak terpotong limit API
+
+    Returns:
+        list station id '@<uid>' (unik, urut)
+    """
+    lat1, lng1, lat2, lng2 = bounds
+    tiles = []
+    lat = min(lat1, lat2)
+    while lat < max(lat1, lat2):
+        lng = min(lng1, lng2)
+        while lng < max(lng1, lng2):
+            tiles.append((lat, lng, min(lat + tile, max(lat1, lat2)), min(lng + tile, max(lng1, lng2))))
+            lng += tile
+        lat += tile
+    pages = await asyncio.gather(*(client.stations_in_bounds(*t) for t in tiles),
+                                 return_exceptions=True)
+    uids = set()
+    for page in pages:
+        if isinstance(page, Exception):
+            print(f"   ⚠️  {page}")
+            continue
+        uids.update(int(s['uid']) for s in page if 'uid' in s)
+    return [f"@{uid}" for uid in sorted(uids)]
+
+
+# ==========================================
+# 3. Parsing + Append-only Store
+# ==========================================
+def _iaqi(data, key):
+    return data.get('iaqi', {}).get(key, {}).get('v')
+
+
+def parse_feed(station, data, days=0, now=None):
+    """
+    Ubah response feed menjadi record untuk store
+
+    Returns:
+        list of dict: satu record 'realtime' + record 'daily' untuk tanggal
+        dalam `days` hari terakhir (dari forecast.daily pm25/pm10)
+    """
+    now = now or datetime.now()
+    city = data.get('city', {})
+    geo = city.get('geo') or [None, None]
+    base = {
+        'fetched_at': now.isoformat(timespec='seconds'),
+        'station': station,
+        'uid': data.get('idx'),
+        'city': city.get('name'),
+        'lat': geo[0],
+        'lon': geo[1],
+    }
+    aqi = data.get('aqi')
+    records = [{
+        **base,
+        'timestamp': data.get('time', {}).get('iso') or base['fetched_at'],
+        'kind': 'realtime',
+        'aqi': aqi if isinstance(aqi, (int, float)) else None,
+        'pm25': _iaqi(data, 'pm25'),
+        'pm10': _iaqi(data, 'pm10'),
+        'temperature': _iaqi(data, 't'),
+        'humidity': _iaqi(data, 'h'),
+        'pressure': _iaqi(data, 'p'),
+    }]
+
+    if days > 0:
+        start = (now - timedelta(days=days)).date().isoformat()
+        today = now.date().isoformat()
+        daily = {}
+        for pollutant in ('pm25', 'pm10'):
+            for entry in data.get('forecast', {}).get('daily', {}).get(pollutant, []):
+                day = entry.get('day')
+                if day and start <= day <= today:
+                    daily.setdefault(day, {})[pollutant] = entry.get('avg')
+        for day in sorted(daily):
+            records.append({**base, 'timestamp': day, 'kind': 'daily',
+                            'pm25': daily[day].get('pm25'), 'pm10': daily[day].get('pm10')})
+    return records
+
+
+class CsvStore:
+    """Append-only CSV store (header ditulis sekali saat file baru)"""
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = path
+        self.rows = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def append(self, records):
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=STORE_COLUMNS, extrasaction='ignore')
+            if new_file:
+                writer.writeheader()
+            writer.writerows(records)
+        self.rows += len(records)
+
+
+# ==========================================
+# 4. Concurrent Fetch
+# ==========================================
+async def fetch_stations(token, stations=(), days=0, store=None, bounds=None, tile=5.0,
+                         base_url=WAQI_BASE_URL, rate=DEFAULT_RATE,
+                         concurrency=DEFAULT_CONCURRENCY, retries=DEFAULT_RETRIES,
+                         history=None):
+    """
+    Fetch semua station secara concurrent dan stream hasilnya ke store
+
+    Args:
+        token: WAQI API token
+        stations: nama kota / '@uid' / 'geo:lat;lng'
+        days: simpan juga record harian dalam N hari terakhir
+        store: object dengan .append(records) (default CsvStore)
+        bounds: (lat1, lng1, lat2, lng2) untuk discover station via /map/bounds
+        history: HistoryStore (history_store.py) opsional, partisi per station/hari
+
+    Returns:
+        dict statistik: stations, ok, failed, records, seconds + stats client
+    """
+    store = store or CsvStore()
+    start = time.perf_counter()
+    ok, failed, records = 0, [], 0
+    async with WaqiClient(token, base_url, rate, concurrency, retries) as client:
+        stations = list(stations)
+        if bounds:
+            stations += await discover_stations(client, bounds, tile)
+        stations = list(dict.fromkeys(stations))
+
+        async def one(station):
+            try:
+                return station, parse_feed(station, await client.feed(station), days)
+            except WaqiError:
+                raise
+            except Exception as e:
+                raise WaqiError(f"{station}: {type(e).__name__}: {e}") from e
+
+        tasks = [asyncio.create_task(one(s)) for s in stations]
+        for future in asyncio.as_completed(tasks):
+            try:
+                station, rows = await future
+            except Exception as e:
+                # Satu station gagal tidak menghentikan station lain
+                failed.append(str(e))
+                continue
+            store.append(rows)
+            if history is not None:
+                # Segment .npy + rollup ditulis di thread supaya event loop tidak block;
+                # tetap di-await satu per satu (history store satu writer)
+                await asyncio.to_thread(history.append_waqi, rows)
+            ok += 1
+            records += len(rows)
+        stats = dict(client.stats)
+    return {'stations': len(stations), 'ok': ok, 'failed': failed, 'records': records,
+            'seconds': time.perf_counter() - start, **stats}
+
+
+def download_waqi_data(token, city='delhi', days=30, **kwargs):
+    """Wrapper sync untuk satu kota (kompatibel dengan download_india_singapore.py)"""
+    return asyncio.run(fetch_stations(token, [city], days, **kwargs))
+
+
+# ==========================================
+# Main Function
+# ==========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent WAQI station fetcher")
+    parser.add_argument('--token', default=os.environ.get('WAQI_TOKEN'),
+                        help="WAQI API token (default: env WAQI_TOKEN)")
+    parser.add_argument('--stations', default="delhi,mumbai,bangalore,singapore",
+                        help="Nama kota / @uid, dipisah koma")
+    parser.add_argument('--bounds', default=None,
+                        help="lat1,lng1,lat2,lng2: tambah semua station di area ini")
+    parser.add_argument('--tile', type=float, default=5.0, help="Ukuran tile (derajat) untuk --bounds")
+    parser.add_argument('--days', type=int, default=7, help="Record harian N hari terakhir")
+    parser.add_argument('--store', default=DEFAULT_STORE)
+    parser.add_argument('--history', default=DEFAULT_HISTORY_ROOT,
+                        help="History store (partisi station/hari); '' = nonaktif")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="Request per detik")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES)
+    parser.add_argument('--base-url', default=WAQI_BASE_URL)
+    args = parser.parse_args()
+
+    print("="*60)
+    print("WAQI Concurrent Fetcher")
+    print("="*60)
+
+    if not args.token:
+        print("❌ WAQI token belum di-set (--token atau env WAQI_TOKEN)")
+        print("   Dapatkan token gratis di: https://aqicn.org/api/")
+        sys.exit(1)
+
+    bounds = tuple(float(v) for v in args.bounds.split(',')) if args.bounds else None
+    stations = [s for s in args.stations.split(',') if s]
+    history = HistoryStore(args.history) if args.history else None
+    stats = asyncio.run(fetch_stations(
+        args.token, stations, args.days, CsvStore(args.store), bounds, args.tile,
+        args.base_url, args.rate, args.concurrency, args.retries, history,
+    ))
+
+    print(f"   ✅ {stats['ok']}/{stats['stations']} stations, {stats['records']} records "
+          f"in {stats['seconds']:.1f}s → {args.store}")
+    print(f"   Requests: {stats['requests']} ({stats['retries']} retries)")
+    for error in stats['failed'][:10]:
+        print(f"   ❌ {error}")
+    if len(stats['failed']) > 10:
+        print(f"   ... {len(stats['failed']) - 10} more failures")
@@ -0,0 +1,373 @@
+// Auto-generated by ml_datasets/export_c_header.py - DO NOT EDIT
+// Source: models/pm_predictor_weights.npz
+// Architecture: 3-16-8-4-2 (float32 weights)
+#ifndef PM_MODEL_H
+#define PM_MODEL_H
+
+#include <stdint.h>
+
+// Training range (MinMaxScaler data_min_ / data_max_)
+#define PM_MODEL_TEMPERATURE_MIN 11.793663f
+#define PM_MODEL_TEMPERATURE_MAX 47.263657f
+#define PM_MODEL_HUMIDITY_MIN 15.894171f
+#define PM_MODEL_HUMIDITY_MAX 113.773834f
+#define PM_MODEL_PRESSURE_MIN 982.80493f
+#define PM_MODEL_PRESSURE_MAX 1052.2625f
+#define PM_MODEL_PM25_MIN 1.7514791f
+#define PM_MODEL_PM25_MAX 443.40088f
+#define PM_MODEL_PM10_MIN 2.6502461f
+#define PM_MODEL_PM10_MAX 658.7395f
+
+static const float PM_MODEL_X_SCALE[3] = {
+  0.028192844f, 0.010216627f, 0.014397293f
+};
+static const float PM_MODEL_X_MIN[3] = {
+  -0.3324969f, -0.16238482f, -14.149731f
+};
+static const float PM_MODEL_Y_SCALE[2] = {
+  0.0022642394f, 0.0015241829f
+};
+static const float PM_MODEL_Y_MIN[2] = {
+  -0.003965768f, -0.00403946f
+};
+
+static const float PM_MODEL_W0[3][16] = {
+  0.28564802f, 0.17160782f, 0.094791785f, -0.27626336f, -0.6183475f, 0.17788842f, -0.037001014f, 0.22526443f,
+  -0.24799263f, 0.22150818f, 0.17846224f, 0.22242078f, 0.40890038f, 0.3417253f, 0.41666615f, 0.47099057f,
+  -0.43796733f, -0.36164236f, 0.37079728f, -0.568992f, 0.25511783f, 0.46753186f, 0.014843583f, -0.46143442f,
+  -0.38011414f, -0.5536522f, 0.38711333f, -0.5135197f, 0.28189602f, 0.042681757f, -0.2893622f, 0.58633554f,
+  0.26539394f, 0.13443218f, -0.21257305f, 0.3359489f, -0.019092387f, 0.017535716f, -0.08688462f, -0.41678423f,
+  0.45477912f, -0.021795861f, 0.32077527f, 0.39036074f, -0.26302668f, -0.014247604f, 0.05934454f, -0.022602102f
+};
+static const float PM_MODEL_B0[16] = {
+  0.044197723f, 0.089312255f, -0.10720446f, -0.010112642f, 0.103847384f, -0.051295727f, 0.0f, 0.0f,
+  -0.03419691f, 0.055930343f, -0.08032267f, 0.073696055f, 0.0059180944f, -0.10745487f, -0.03147704f, -0.053442f
+};
+static const float PM_MODEL_W1[16][8] = {
+  0.4525956f, -0.21635859f, -0.4413808f, 0.25801495f, 0.23459361f, -0.049709186f, 0.3463869f, -0.008002939f,
+  0.3947386f, 0.008791707f, 0.16713426f, 0.47303814f, -0.15335663f, -0.13461296f, -0.17780335f, -0.30524623f,
+  0.16628575f, -0.068743676f, 0.013162897f, -0.34991667f, 0.40449387f, 0.1494244f, 0.23672856f, -0.2317073f,
+  -0.094536826f, 0.022612149f, 0.3259007f, -0.20755868f, 0.29739225f, -0.113027446f, -0.2761898f, 0.26811013f,
+  -0.157816f, -0.23730463f, -0.31482837f, 0.45771977f, -0.43680546f, -0.15644856f, -0.3638764f, -0.40811127f,
+  -0.042367365f, -0.45477062f, 0.010759526f, -0.013118858f, -0.37787068f, -0.32868308f, -0.08854217f, 0.020211542f,
+  0.087690234f, -0.26024425f, -0.28740668f, 0.23699892f, -0.18542254f, -0.21502805f, 0.22755706f, 0.2549708f,
+  0.40597272f, -0.46040285f, 0.38077974f, 0.38970435f, -0.44711268f, 0.10929477f, 0.24453974f, -0.14831352f,
+  0.19521093f, 0.30132237f, -0.34676382f, -0.289949f, 0.16346695f, -0.3921048f, 0.40785167f, -0.522879f,
+  -0.15451162f, -0.27812007f, 0.3091472f, -0.36182952f, 0.5343439f, -0.33088425f, -0.10023662f, -0.2571282f,
+  0.027985467f, -0.4549329f, -0.3330193f, 0.063383274f, 0.30762982f, 0.31877747f, 0.0010703774f, 0.32601106f,
+  -0.035942543f, -0.36360535f, -0.12792753f, 0.19076769f, -0.4828875f, -0.05109786f, -0.14408559f, -0.31112128f,
+  0.18924527f, 0.29159445f, -0.42690536f, 0.061393086f, -0.38097733f, -0.16847925f, -0.11983817f, 0.12146136f,
+  0.4154813f, -0.070634015f, -0.010923053f, -0.23695111f, 0.0369258f, -0.3263261f, -0.2639802f, -0.31978038f,
+  0.46040252f, 0.11173883f, -0.09180019f, 0.21461603f, 0.08189934f, -0.081921615f, 0.1965192f, 0.30154735f,
+  -0.48545977f, -0.010738042f, 0.39145002f, -0.13205007f, -0.4391761f, -0.4961331f, -0.2364136f, -0.4649309f
+};
+static const float PM_MODEL_B1[8] = {
+  0.021092594f, -0.039535522f, 0.015962835f, 0.09878213f, -0.028854435f, -0.0403941f, -0.053882435f, -0.061041012f
+};
+static const float PM_MODEL_W2[8][4] = {
+  -0.6040559f, -0.080104984f, 0.14038004f, -0.41804785f, 0.42145094f, 0.59421986f, -0.67486453f, 0.5194675f,
+  0.52679706f, 0.524989f, 0.2611815f, -0.05872615f, 0.273758f, 0.26804054f, 0.43103692f, 0.43202016f,
+  0.6088966f, -0.00883788f, 0.3421036f, -0.43206584f, -0.24165268f, -0.58606726f, -0.44368514f, 0.48315912f,
+  -0.64327204f, -0.09273279f, -0.29693976f, -0.4733944f, 0.44611657f, 0.10325694f, -0.5727924f, -0.35962814f
+};
+static const float PM_MODEL_B2[4] = {
+  -0.059534915f, -0.060567357f, 0.021522172f, 0.0096159605f
+};
+static const float PM_MODEL_W3[4][2] = {
+  0.25366876f, -0.6401261f, -0.418751f, 0.35988542f, 0.3383173f, 0.4009357f, 0.48121682f, 0.31361267f
+};
+static const float PM_MODEL_B3[2] = {
+  0.019719308f, 0.029285485f
+};
+
+// Prediksi PM2.5/PM10 (µg/m³) dari temperature (°C), humidity (%), pressure (hPa)
+static inline void pm_model_predict(float temperature, float humidity, float pressure, float *pm25, float *pm10) {
+  float x0 = temperature * PM_MODEL_X_SCALE[0];
+  x0 = x0 + PM_MODEL_X_MIN[0];
+  float x1 = humidity * PM_MODEL_X_SCALE[1];
+  x1 = x1 + PM_MODEL_X_MIN[1];
+  float x2 = pressure * PM_MODEL_X_SCALE[2];
+  x2 = x2 + PM_MODEL_X_MIN[2];
+  // Layer 0: 3 → 16 (relu)
+  float l0_0 = PM_MODEL_B0[0];
+  l0_0 = l0_0 + x0 * PM_MODEL_W0[0][0];
+  l0_0 = l0_0 + x1 * PM_MODEL_W0[1][0];
+  l0_0 = l0_0 + x2 * PM_MODEL_W0[2][0];
+  l0_0 = l0_0 > 0.0f ? l0_0 : 0.0f;
+  float l0_1 = PM_MODEL_B0[1];
+  l0_1 = l0_1 + x0 * PM_MODEL_W0[0][1];
+  l0_1 = l0_1 + x1 * PM_MODEL_W0[1][1];
+  l0_1 = l0_1 + x2 * PM_MODEL_W0[2][1];
+  l0_1 = l0_1 > 0.0f ? l0_1 : 0.0f;
+  float l0_2 = PM_MODEL_B0[2];
+  l0_2 = l0_2 + x0 * PM_MODEL_W0[0][2];
+  l0_2 = l0_2 + x1 * PM_MODEL_W0[1][2];
+  l0_2 = l0_2 + x2 * PM_MODEL_W0[2][2];
+  l0_2 = l0_2 > 0.0f ? l0_2 : 0.0f;
+  float l0_3 = PM_MODEL_B0[3];
+  l0_3 = l0_3 + x0 * PM_MODEL_W0[0][3];
+  l0_3 = l0_3 + x1 * PM_MODEL_W0[1][3];
+  l0_3 = l0_3 + x2 * PM_MODEL_W0[2][3];
+  l0_3 = l0_3 > 0.0f ? l0_3 : 0.0f;
+  float l0_4 = PM_MODEL_B0[4];
+  l0_4 = l0_4 + x0 * PM_MODEL_W0[0][4];
+  l0_4 = l0_4 + x1 * PM_MODEL_W0[1][4];
+  l0_4 = l0_4 + x2 * PM_MODEL_W0[2][4];
+  l0_4 = l0_4 > 0.0f ? l0_4 : 0.0f;
+  float l0_5 = PM_MODEL_B0[5];
+  l0_5 = l0_5 + x0 * PM_MODEL_W0[0][5];
+  l0_5 = l0_5 + x1 * PM_MODEL_W0[1][5];
+  l0_5 = l0_5 + x2 * PM_MODEL_W0[2][5];
+  l0_5 = l0_5 > 0.0f ? l0_5 : 0.0f;
+  float l0_6 = PM_MODEL_B0[6];
+  l0_6 = l0_6 + x0 * PM_MODEL_W0[0][6];
+  l0_6 = l0_6 + x1 * PM_MODEL_W0[1][6];
+  l0_6 = l0_6 + x2 * PM_MODEL_W0[2][6];
+  l0_6 = l0_6 > 0.0f ? l0_6 : 0.0f;
+  float l0_7 = PM_MODEL_B0[7];
+  l0_7 = l0_7 + x0 * PM_MODEL_W0[0][7];
+  l0_7 = l0_7 + x1 * PM_MODEL_W0[1][7];
+  l0_7 = l0_7 + x2 * PM_MODEL_W0[2][7];
+  l0_7 = l0_7 > 0.0f ? l0_7 : 0.0f;
+  float l0_8 = PM_MODEL_B0[8];
+  l0_8 = l0_8 + x0 * PM_MODEL_W0[0][8];
+  l0_8 = l0_8 + x1 * PM_MODEL_W0[1][8];
+  l0_8 = l0_8 + x2 * PM_MODEL_W0[2][8];
+  l0_8 = l0_8 > 0.0f ? l0_8 : 0.0f;
+  float l0_9 = PM_MODEL_B0[9];
+  l0_9 = l0_9 + x0 * PM_MODEL_W0[0][9];
+  l0_9 = l0_9 + x1 * PM_MODEL_W0[1][9];
+  l0_9 = l0_9 + x2 * PM_MODEL_W0[2][9];
+  l0_9 = l0_9 > 0.0f ? l0_9 : 0.0f;
+  float l0_10 = PM_MODEL_B0[10];
+  l0_10 = l0_10 + x0 * PM_MODEL_W0[0][10];
+  l0_10 = l0_10 + x1 * PM_MODEL_W0[1][10];
+  l0_10 = l0_10 + x2 * PM_MODEL_W0[2][10];
+  l0_10 = l0_10 > 0.0f ? l0_10 : 0.0f;
+  float l0_11 = PM_MODEL_B0[11];
+  l0_11 = l0_11 + x0 * PM_MODEL_W0[0][11];
+  l0_11 = l0_11 + x1 * PM_MODEL_W0[1][11];
+  l0_11 = l0_11 + x2 * PM_MODEL_W0[2][11];
+  l0_11 = l0_11 > 0.0f ? l0_11 : 0.0f;
+  float l0_12 = PM_MODEL_B0[12];
+  l0_12 = l0_12 + x0 * PM_MODEL_W0[0][12];
+  l0_12 = l0_12 + x1 * PM_MODEL_W0[1][12];
+  l0_12 = l0_12 + x2 * PM_MODEL_W0[2][12];
+  l0_12 = l0_12 > 0.0f ? l0_12 : 0.0f;
+  float l0_13 = PM_MODEL_B0[13];
+  l0_13 = l0_13 + x0 * PM_MODEL_W0[0][13];
+  l0_13 = l0_13 + x1 * PM_MODEL_W0[1][13];
+  l0_13 = l0_13 + x2 * PM_MODEL_W0[2][13];
+  l0_13 = l0_13 > 0.0f ? l0_13 : 0.0f;
+  float l0_14 = PM_MODEL_B0[14];
+  l0_14 = l0_14 + x0 * PM_MODEL_W0[0][14];
+  l0_14 = l0_14 + x1 * PM_MODEL_W0[1][14];
+  l0_14 = l0_14 + x2 * PM_MODEL_W0[2][14];
+  l0_14 = l0_14 > 0.0f ? l0_14 : 0.0f;
+  float l0_15 = PM_MODEL_B0[15];
+  l0_15 = l0_15 + x0 * PM_MODEL_W0[0][15];
+  l0_15 = l0_15 + x1 * PM_MODEL_W0[1][15];
+  l0_15 = l0_15 + x2 * PM_MODEL_W0[2][15];
+  l0_15 = l0_15 > 0.0f ? l0_15 : 0.0f;
+  // Layer 1: 16 → 8 (relu)
+  float l1_0 = PM_MODEL_B1[0];
+  l1_0 = l1_0 + l0_0 * PM_MODEL_W1[0][0];
+  l1_0 = l1_0 + l0_1 * PM_MODEL_W1[1][0];
+  l1_0 = l1_0 + l0_2 * PM_MODEL_W1[2][0];
+  l1_0 = l1_0 + l0_3 * PM_MODEL_W1[3][0];
+  l1_0 = l1_0 + l0_4 * PM_MODEL_W1[4][0];
+  l1_0 = l1_0 + l0_5 * PM_MODEL_W1[5][0];
+  l1_0 = l1_0 + l0_6 * PM_MODEL_W1[6][0];
+  l1_0 = l1_0 + l0_7 * PM_MODEL_W1[7][0];
+  l1_0 = l1_0 + l0_8 * PM_MODEL_W1[8][0];
+  l1_0 = l1_0 + l0_9 * PM_MODEL_W1[9][0];
+  l1_0 = l1_0 + l0_10 * PM_MODEL_W1[10][0];
+  l1_0 = l1_0 + l0_11 * PM_MODEL_W1[11][0];
+  l1_0 = l1_0 + l0_12 * PM_MODEL_W1[12][0];
+  l1_0 = l1_0 + l0_13 * PM_MODEL_W1[13][0];
+  l1_0 = l1_0 + l0_14 * PM_MODEL_W1[14][0];
+  l1_0 = l1_0 + l0_15 * PM_MODEL_W1[15][0];
+  l1_0 = l1_0 > 0.0f ? l1_0 : 0.0f;
+  float l1_1 = PM_MODEL_B1[1];
+  l1_1 = l1_1 + l0_0 * PM_MODEL_W1[0][1];
+  l1_1 = l1_1 + l0_1 * PM_MODEL_W1[1][1];
+  l1_1 = l1_1 + l0_2 * PM_MODEL_W1[2][1];
+  l1_1 = l1_1 + l0_3 * PM_MODEL_W1[3][1];
+  l1_1 = l1_1 + l0_4 * PM_MODEL_W1[4][1];
+  l1_1 = l1_1 + l0_5 * PM_MODEL_W1[5][1];
+  l1_1 = l1_1 + l0_6 * PM_MODEL_W1[6][1];
+  l1_1 = l1_1 + l0_7 * PM_MODEL_W1[7][1];
+  l1_1 = l1_1 + l0_8 * PM_MODEL_W1[8][1];
+  l1_1 = l1_1 + l0_9 * PM_MODEL_W1[9][1];
+  l1_1 = l1_1 + l0_10 * PM_MODEL_W1[10][1];
+  l1_1 = l1_1 + l0_11 * PM_MODEL_W1[11][1];
+  l1_1 = l1_1 + l0_12 * PM_MODEL_W1[12][1];
+  l1_1 = l1_1 + l0_13 * PM_MODEL_W1[13][1];
+  l1_1 = l1_1 + l0_14 * PM_MODEL_W1[14][1];
+  l1_1 = l1_1 + l0_15 * PM_MODEL_W1[15][1];
+  l1_1 = l1_1 > 0.0f ? l1_1 : 0.0f;
+  float l1_2 = PM_MODEL_B1[2];
+  l1_2 = l1_2 + l0_0 * PM_MODEL_W1[0][2];
+  l1_2 = l1_2 + l0_1 * PM_MODEL_W1[1][2];
+  l1_2 = l1_2 + l0_2 * PM_MODEL_W1[2][2];
+  l1_2 = l1_2 + l0_3 * PM_MODEL_W1[3][2];
+  l1_2 = l1_2 + l0_4 * PM_MODEL_W1[4][2];
+  l1_2 = l1_2 + l0_5 * PM_MODEL_W1[5][2];
+  l1_2 = l1_2 + l0_6 * PM_MODEL_W1[6][2];
+  l1_2 = l1_2 + l0_7 * PM_MODEL_W1[7][2];
+  l1_2 = l1_2 + l0_8 * PM_MODEL_W1[8][2];
+  l1_2 = l1_2 + l0_9 * PM_MODEL_W1[9][2];
+  l1_2 = l1_2 + l0_10 * PM_MODEL_W1[10][2];
+  l1_2 = l1_2 + l0_11 * PM_MODEL_W1[11][2];
+  l1_2 = l1_2 + l0_12 * PM_MODEL_W1[12][2];
+  l1_2 = l1_2 + l0_13 * PM_MODEL_W1[13][2];
+  l1_2 = l1_2 + l0_14 * PM_MODEL_W1[14][2];
+  l1_2 = l1_2 + l0_15 * PM_MODEL_W1[15][2];
+  l1_2 = l1_2 > 0.0f ? l1_2 : 0.0f;
+  float l1_3 = PM_MODEL_B1[3];
+  l1_3 = l1_3 + l0_0 * PM_MODEL_W1[0][3];
+  l1_3 = l1_3 + l0_1 * PM_MODEL_W1[1][3];
+  l1_3 = l1_3 + l0_2 * PM_MODEL_W1[2][3];
+  l1_3 = l1_3 + l0_3 * PM_MODEL_W1[3][3];
+  l1_3 = l1_3 + l0_4 * PM_MODEL_W1[4][3];
+  l1_3 = l1_3 + l0_5 * PM_MODEL_W1[5][3];
+  l1_3 = l1_3 + l0_6 * PM_MODEL_W1[6][3];
+  l1_3 = l1_3 + l0_7 * PM_MODEL_W1[7][3];
+  l1_3 = l1_3 + l0_8 * PM_MODEL_W1[8][3];
+  l1_3 = l1_3 + l0_9 * PM_MODEL_W1[9][3];
+  l1_3 = l1_3 + l0_10 * PM_MODEL_W1[10][3];
+  l1_3 = l1_3 + l0_11 * PM_MODEL_W1[11][3];
+  l1_3 = l1_3 + l0_12 * PM_MODEL_W1[12][3];
+  l1_3 = l1_3 + l0_13 * PM_MODEL_W1[13][3];
+  l1_3 = l1_3 + l0_14 * PM_MODEL_W1[14][3];
+  l1_3 = l1_3 + l0_15 * PM_MODEL_W1[15][3];
+  l1_3 = l1_3 > 0.0f ? l1_3 : 0.0f;
+  float l1_4 = PM_MODEL_B1[4];
+  l1_4 = l1_4 + l0_0 * PM_MODEL_W1[0][4];
+  l1_4 = l1_4 + l0_1 * PM_MODEL_W1[1][4];
+  l1_4 = l1_4 + l0_2 * PM_MODEL_W1[2][4];
+  l1_4 = l1_4 + l0_3 * PM_MODEL_W1[3][4];
+  l1_4 = l1_4 + l0_4 * PM_MODEL_W1[4][4];
+  l1_4 = l1_4 + l0_5 * PM_MODEL_W1[5][4];
+  l1_4 = l1_4 + l0_6 * PM_MODEL_W1[6][4];
+  l1_4 = l1_4 + l0_7 * PM_MODEL_W1[7][4];
+  l1_4 = l1_4 + l0_8 * PM_MODEL_W1[8][4];
+  l1_4 = l1_4 + l0_9 * PM_MODEL_W1[9][4];
+  l1_4 = l1_4 + l0_10 * PM_MODEL_W1[10][4];
+  l1_4 = l1_4 + l0_11 * PM_MODEL_W1[11][4];
+  l1_4 = l1_4 + l0_12 * PM_MODEL_W1[12][4];
+  l1_4 = l1_4 + l0_13 * PM_MODEL_W1[13][4];
+  l1_4 = l1_4 + l0_14 * PM_MODEL_W1[14][4];
+  l1_4 = l1_4 + l0_15 * PM_MODEL_W1[15][4];
+  l1_4 = l1_4 > 0.0f ? l1_4 : 0.0f;
+  float l1_5 = PM_MODEL_B1[5];
+  l1_5 = l1_5 + l0_0 * PM_MODEL_W1[0][5];
+  l1_5 = l1_5 + l0_1 * PM_MODEL_W1[1][5];
+  l1_5 = l1_5 + l0_2 * PM_MODEL_W1[2][5];
+  l1_5 = l1_5 + l0_3 * PM_MODEL_W1[3][5];
+  l1_5 = l1_5 + l0_4 * PM_MODEL_W1[4][5];
+  l1_5 = l1_5 + l0_5 * PM_MODEL_W1[5][5];
+  l1_5 = l1_5 + l0_6 * PM_MODEL_W1[6][5];
+  l1_5 = l1_5 + l0_7 * PM_MODEL_W1[7][5];
+  l1_5 = l1_5 + l0_8 * PM_MODEL_W1[8][5];
+  l1_5 = l1_5 + l0_9 * PM_MODEL_W1[9][5];
+  l1_5 = l1_5 + l0_10 * PM_MODEL_W1[10][5];
+  l1_5 = l1_5 + l0_11 * PM_MODEL_W1[11][5];
+  l1_5 = l1_5 + l0_12 * PM_MODEL_W1[12][5];
+  l1_5 = l1_5 + l0_13 * PM_MODEL_W1[13][5];
+  l1_5 = l1_5 + l0_14 * PM_MODEL_W1[14][5];
+  l1_5 = l1_5 + l0_15 * PM_MODEL_W1[15][5];
+  l1_5 = l1_5 > 0.0f ? l1_5 : 0.0f;
+  float l1_6 = PM_MODEL_B1[6];
+  l1_6 = l1_6 + l0_0 * PM_MODEL_W1[0][6];
+  l1_6 = l1_6 + l0_1 * PM_MODEL_W1[1][6];
+  l1_6 = l1_6 + l0_2 * PM_MODEL_W1[2][6];
+  l1_6 = l1_6 + l0_3 * PM_MODEL_W1[3][6];
+  l1_6 = l1_6 + l0_4 * PM_MODEL_W1[4][6];
+  l1_6 = l1_6 + l0_5 * PM_MODEL_W1[5][6];
+  l1_6 = l1_6 + l0_6 * PM_MODEL_W1[6][6];
+  l1_6 = l1_6 + l0_7 * PM_MODEL_W1[7][6];
+  l1_6 = l1_6 + l0_8 * PM_MODEL_W1[8][6];
+  l1_6 = l1_6 + l0_9 * PM_MODEL_W1[9][6];
+  l1_6 = l1_6 + l0_10 * PM_MODEL_W1[10][6];
+  l1_6 = l1_6 + l0_11 * PM_MODEL_W1[11][6];
+  l1_6 = l1_6 + l0_12 * PM_MODEL_W1[12][6];
+  l1_6 = l1_6 + l0_13 * PM_MODEL_W1[13][6];
+  l1_6 = l1_6 + l0_14 * PM_MODEL_W1[14][6];
+  l1_6 = l1_6 + l0_15 * PM_MODEL_W1[15][6];
+  l1_6 = l1_6 > 0.0f ? l1_6 : 0.0f;
+  float l1_7 = PM_MODEL_B1[7];
+  l1_7 = l1_7 + l0_0 * PM_MODEL_W1[0][7];
+  l1_7 = l1_7 + l0_1 * PM_MODEL_W1[1][7];
+  l1_7 = l1_7 + l0_2 * PM_MODEL_W1[2][7];
+  l1_7 = l1_7 + l0_3 * PM_MODEL_W1[3][7];
+  l1_7 = l1_7 + l0_4 * PM_MODEL_W1[4][7];
+  l1_7 = l1_7 + l0_5 * PM_MODEL_W1[5][7];
+  l1_7 = l1_7 + l0_6 * PM_MODEL_W1[6][7];
+  l1_7 = l1_7 + l0_7 * PM_MODEL_W1[7][7];
+  l1_7 = l1_7 + l0_8 * PM_MODEL_W1[8][7];
+  l1_7 = l1_7 + l0_9 * PM_MODEL_W1[9][7];
+  l1_7 = l1_7 + l0_10 * PM_MODEL_W1[10][7];
+  l1_7 = l1_7 + l0_11 * PM_MODEL_W1[11][7];
+  l1_7 = l1_7 + l0_12 * PM_MODEL_W1[12][7];
+  l1_7 = l1_7 + l0_13 * PM_MODEL_W1[13][7];
+  l1_7 = l1_7 + l0_14 * PM_MODEL_W1[14][7];
+  l1_7 = l1_7 + l0_15 * PM_MODEL_W1[15][7];
+  l1_7 = l1_7 > 0.0f ? l1_7 : 0.0f;
+  // Layer 2: 8 → 4 (relu)
+  float l2_0 = PM_MODEL_B2[0];
+  l2_0 = l2_0 + l1_0 * PM_MODEL_W2[0][0];
+  l2_0 = l2_0 + l1_1 * PM_MODEL_W2[1][0];
+  l2_0 = l2_0 + l1_2 * PM_MODEL_W2[2][0];
+  l2_0 = l2_0 + l1_3 * PM_MODEL_W2[3][0];
+  l2_0 = l2_0 + l1_4 * PM_MODEL_W2[4][0];
+  l2_0 = l2_0 + l1_5 * PM_MODEL_W2[5][0];
+  l2_0 = l2_0 + l1_6 * PM_MODEL_W2[6][0];
+  l2_0 = l2_0 + l1_7 * PM_MODEL_W2[7][0];
+  l2_0 = l2_0 > 0.0f ? l2_0 : 0.0f;
+  float l2_1 = PM_MODEL_B2[1];
+  l2_1 = l2_1 + l1_0 * PM_MODEL_W2[0][1];
+  l2_1 = l2_1 + l1_1 * PM_MODEL_W2[1][1];
+  l2_1 = l2_1 + l1_2 * PM_MODEL_W2[2][1];
+  l2_1 = l2_1 + l1_3 * PM_MODEL_W2[3][1];
+  l2_1 = l2_1 + l1_4 * PM_MODEL_W2[4][1];
+  l2_1 = l2_1 + l1_5 * PM_MODEL_W2[5][1];
+  l2_1 = l2_1 + l1_6 * PM_MODEL_W2[6][1];
+  l2_1 = l2_1 + l1_7 * PM_MODEL_W2[7][1];
+  l2_1 = l2_1 > 0.0f ? l2_1 : 0.0f;
+  float l2_2 = PM_MODEL_B2[2];
+  l2_2 = l2_2 + l1_0 * PM_MODEL_W2[0][2];
+  l2_2 = l2_2 + l1_1 * PM_MODEL_W2[1][2];
+  l2_2 = l2_2 + l1_2 * PM_MODEL_W2[2][2];
+  l2_2 = l2_2 + l1_3 * PM_MODEL_W2[3][2];
+  l2_2 = l2_2 + l1_4 * PM_MODEL_W2[4][2];
+  l2_2 = l2_2 + l1_5 * PM_MODEL_W2[5][2];
+  l2_2 = l2_2 + l1_6 * PM_MODEL_W2[6][2];
+  l2_2 = l2_2 + l1_7 * PM_MODEL_W2[7][2];
+  l2_2 = l2_2 > 0.0f ? l2_2 : 0.0f;
+  float l2_3 = PM_MODEL_B2[3];
+  l2_3 = l2_3 + l1_0 * PM_MODEL_W2[0][3];
+  l2_3 = l2_3 + l1_1 * PM_MODEL_W2[1][3];
+  l2_3 = l2_3 + l1_2 * PM_MODEL_W2[2][3];
+  l2_3 = l2_3 + l1_3 * PM_MODEL_W2[3][3];
+  l2_3 = l2_3 + l1_4 * PM_MODEL_W2[4][3];
+  l2_3 = l2_3 + l1_5 * PM_MODEL_W2[5][3];
+  l2_3 = l2_3 + l1_6 * PM_MODEL_W2[6][3];
+  l2_3 = l2_3 + l1_7 * PM_MODEL_W2[7][3];
+  l2_3 = l2_3 > 0.0f ? l2_3 : 0.0f;
+  // Layer 3: 4 → 2 (linear)
+  float l3_0 = PM_MODEL_B3[0];
+  l3_0 = l3_0 + l2_0 * PM_MODEL_W3[0][0];
+  l3_0 = l3_0 + l2_1 * PM_MODEL_W3[1][0];
+  l3_0 = l3_0 + l2_2 * PM_MODEL_W3[2][0];
+  l3_0 = l3_0 + l2_3 * PM_MODEL_W3[3][0];
+  float l3_1 = PM_MODEL_B3[1];
+  l3_1 = l3_1 + l2_0 * PM_MODEL_W3[0][1];
+  l3_1 = l3_1 + l2_1 * PM_MODEL_W3[1][1];
+  l3_1 = l3_1 + l2_2 * PM_MODEL_W3[2][1];
+  l3_1 = l3_1 + l2_3 * PM_MODEL_W3[3][1];
+  *pm25 = (l3_0 - PM_MODEL_Y_MIN[0]) / PM_MODEL_Y_SCALE[0];
+  *pm10 = (l3_1 - PM_MODEL_Y_MIN[1]) / PM_MODEL_Y_SCALE[1];
+}
+
+#endif  // PM_MODEL_H
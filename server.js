@@ -3,6 +3,7 @@ const WebSocket = require("ws");
 const express = require("express");
 const http = require("http");
 const path = require("path");
+const fs = require("fs");
 const Groq = require("groq-sdk");
 const Database = require("better-sqlite3");
 const bcrypt = require("bcryptjs");
@@ -12,6 +13,15 @@ const app = express();
 const port = 3000;
 const JWT_SECRET = process.env.JWT_SECRET || "cleankiln-dt-secret-key-2026";
 
+// Spool JSONL untuk online training (ml_datasets/online_update.py), opsional
+const ML_SPOOL_PATH = process.env.ML_SPOOL_PATH || "";
+if (ML_SPOOL_PATH) {
+  fs.mkdirSync(path.dirname(path.resolve(ML_SPOOL_PATH)), { recursive: true });
+}
+
+// Prediction server (ml_datasets/model_server.py)
+const ML_SERVER_URL = process.env.ML_SERVER_URL || "http://127.0.0.1:8765";
+
 // API Key Groq
 const groq = new Groq({
   apiKey: process.env.GROQ_API_KEY || "",
@@ -368,6 +378,24 @@ wss.on("connection", (ws, req) => {
           clientId: clientId,
         };
 
+        // Spool hanya pembacaan sensor asli (bukan hasil prediksi ML)
+        if (ML_SPOOL_PATH && !mlMode && pm25 > 0) {
+          const spoolRecord = {
+            timestamp: latestSensorData.timestamp.toISOString(),
+            device: data.device,
+            temperature: temp,
+            humidity: humidity,
+            pressure: pressure,
+            pm25: pm25,
+            pm10: pm10,
+            voc: voc,
+            eco2: eco2,
+          };
+          fs.appendFile(ML_SPOOL_PATH, JSON.stringify(spoolRecord) + "\n", (err) => {
+            if (err) console.error(`[ML Spool] ❌ ${err.message}`);
+          });
+        }
+
         // 1. Kirim ACK ke ESP32
         const ackResponse = {
           type: "sensor_ack",
@@ -623,6 +651,22 @@ app.post("/api/control", (req, res) => {
   });
 });
 
+// ML prediction proxy → ml_datasets/model_server.py (micro-batching)
+app.post("/api/ml/predict", async (req, res) => {
+  try {
+    const response = await fetch(`${ML_SERVER_URL}/predict`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(req.body),
+      signal: AbortSignal.timeout(5000),
+    });
+    res.status(response.status).json(await response.json());
+  } catch (error) {
+    console.error(`[ML] ❌ Model server unavailable: ${error.message}`);
+    res.status(503).json({ success: false, message: "ML model server unavailable" });
+  }
+});
+
 app.get("/health", (req, res) => {
   res.json({
     status: "ok",